@@ -0,0 +1,210 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timezone
+from typing import Optional
+import json
+import logging
+
+from app.core.cache import etag_matches, make_etag
+from app.core.concurrency import run_in_render_pool
+from app.core.dates import parse_date
+from app.core.instrumentation import span
+from app.db.series import PriceSeries
+from app.db.session import get_async_db
+from app.services.animation import get_animation
+from app.services.chart_generator import create_spiral_data, create_spiral_delta, encode_spiral_binary, encode_spiral_json
+from app.services.downsampling import downsample_series, point_budget
+from app.services.indicators import get_indicators, overlays_at, parse_overlays
+from app.services.price_store import price_store
+
+router = APIRouter(prefix="/api")
+logger = logging.getLogger(__name__)
+
+# Beyond this many new points, clients refetch the downsampled chart
+MAX_DELTA_POINTS = 1000
+
+def _build_payload(series: PriceSeries, max_points: int, overlays: Optional[str], payload_format: str) -> bytes:
+    stats = price_store.get_statistics(series)
+    indicators = get_indicators(series, price_store.version)
+    with span("downsample"):
+        plotted = downsample_series(series, max_points, stats, price_store.pyramid)
+    with span("spiral_data"):
+        data = create_spiral_data(
+            plotted,
+            {**indicators["latest"], **stats},
+            overlays_at(indicators, series, plotted, parse_overlays(overlays)),
+        )
+        data["version"] = series.version_token()
+    with span("encode"):
+        return encode_spiral_binary(data) if payload_format == "binary" else encode_spiral_json(data)
+
+@router.get("/spiral")
+async def spiral_data(
+    request: Request,
+    days: Optional[int] = None,
+    points: Optional[int] = None,
+    width: Optional[int] = None,
+    overlays: Optional[str] = None,
+    payload_format: str = Query("json", alias="format", pattern="^(json|binary)$"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Returns the spiral trace data for the last `days` days, as compact JSON
+    or as the float32 little-endian binary layout of `encode_spiral_binary`.
+
+    Long series are downsampled to `points` points, or to a budget derived
+    from the viewport `width`. `overlays` is a comma-separated list of
+    indicators to plot along the price.
+
+    Responses carry an ETag of the data version and parameters, and
+    revalidations of unchanged data get a 304 without building the payload.
+    """
+    try:
+        series = await price_store.get_series_async(db, days=days)
+        if len(series) < 2:
+            raise HTTPException(status_code=404, detail="No Bitcoin price data available")
+
+        max_points = point_budget(points, width)
+        data_key = series.version_token()
+        headers = {
+            "Cache-Control": "no-cache",
+            "ETag": make_etag(("spiral", days or None, max_points, parse_overlays(overlays), payload_format, data_key)),
+        }
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+
+        content = await run_in_render_pool(_build_payload, series, max_points, overlays, payload_format)
+        media_type = "application/octet-stream" if payload_format == "binary" else "application/json"
+        return Response(content=content, media_type=media_type, headers=headers)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error on spiral data endpoint: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+def _build_delta(series: PriceSeries, start: int, overlays: Optional[str]) -> bytes:
+    stats = price_store.get_statistics(series)
+    indicators = get_indicators(series, price_store.version)
+    new = PriceSeries(series.dates[start:], series.prices[start:])
+    with span("spiral_data"):
+        data = create_spiral_delta(
+            series,
+            start,
+            {**indicators["latest"], **stats},
+            overlays_at(indicators, series, new, parse_overlays(overlays)),
+        )
+        data["version"] = series.version_token()
+    with span("encode"):
+        return encode_spiral_json(data)
+
+def _delta_start(series: PriceSeries, version: Optional[str], since: Optional[str], days: Optional[int]) -> Optional[int]:
+    """
+    Returns the index of the first point newer than the client's chart, or
+    None if the chart cannot be brought up to date by appending points.
+    """
+    if version:
+        try:
+            last = datetime.fromtimestamp(int(version.split("-", 1)[0]), timezone.utc).replace(tzinfo=None)
+        except (ValueError, OverflowError, OSError):
+            raise HTTPException(status_code=400, detail="Invalid version")
+        # Changed prices or a moved window start change the digest of the chart's points
+        if series.until(last).version_token() != version:
+            return None
+    elif since and not days:
+        try:
+            last = parse_date(since)
+        except (TypeError, ValueError, OverflowError, OSError):
+            raise HTTPException(status_code=400, detail="Invalid since date")
+    else:
+        # The start of a window moves with new points, which only the version tells
+        return None
+    start = len(series.until(last))
+    if not start or len(series) - start > MAX_DELTA_POINTS:
+        return None
+    return start
+
+@router.get("/spiral/delta")
+async def spiral_delta(
+    request: Request,
+    version: Optional[str] = None,
+    since: Optional[str] = None,
+    days: Optional[int] = None,
+    overlays: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Returns the points newer than a chart of /api/spiral data, to append to
+    it, with the updated statistics, as JSON in the layout of
+    `create_spiral_delta`.
+
+    The chart is identified by the `version` of its payload or, for all
+    time charts only, by the date `since` of its last point. When the chart
+    cannot be brought up to date by appending points, because its data
+    changed, its window moved or too many points are new, the response is
+    `{"full": true}` and the client refetches /api/spiral.
+    """
+    try:
+        series = await price_store.get_series_async(db, days=days)
+        if len(series) < 2:
+            raise HTTPException(status_code=404, detail="No Bitcoin price data available")
+
+        current = series.version_token()
+        headers = {
+            "Cache-Control": "no-cache",
+            "ETag": make_etag(("spiral_delta", current, version, since, days or None, parse_overlays(overlays))),
+        }
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+
+        start = _delta_start(series, version, since, days)
+        if start is None:
+            content = json.dumps({"full": True, "version": current}).encode("utf-8")
+        else:
+            content = await run_in_render_pool(_build_delta, series, start, overlays)
+        return Response(content=content, media_type="application/json", headers=headers)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error on spiral delta endpoint: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.get("/spiral/animation")
+async def spiral_animation(
+    request: Request,
+    days: Optional[int] = None,
+    points: Optional[int] = None,
+    width: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Returns the Plotly figure of the spiral growing one month per frame,
+    with play controls and a month slider, as built by
+    `create_spiral_animation`: `data`, `layout`, `frames`, `config`, and
+    the price, all-time high and days since it at the end of each month in
+    `stats`. Pass it to `Plotly.newPlot`.
+
+    Downsampled like /api/spiral, cached until the data changes, and
+    carrying an ETag.
+    """
+    try:
+        series = await price_store.get_series_async(db, days=days)
+        if len(series) < 2:
+            raise HTTPException(status_code=404, detail="No Bitcoin price data available")
+
+        max_points = point_budget(points, width)
+        data_key = series.version_token()
+        headers = {
+            "Cache-Control": "no-cache",
+            "ETag": make_etag(("spiral_animation", days or None, max_points, data_key)),
+        }
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+
+        content = await run_in_render_pool(get_animation, series, max_points, "json")
+        return Response(content=content, media_type="application/json", headers=headers)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error on spiral animation endpoint: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal server error")
@@ -1,66 +1,110 @@
 from fastapi import APIRouter, Depends, Request, HTTPException
+from fastapi.responses import Response, StreamingResponse
 from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
-from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import timezone
+from email.utils import format_datetime
+from pathlib import Path
+from markupsafe import Markup
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import hashlib
 import logging
 import json
 
-from app.db.session import get_db
-from app.db.crud import get_prices
-from app.services.chart_generator import create_logarithmic_spiral_chart
-from app.services.statistics import calculate_statistics
+from app.db.session import get_async_db
+from app.services.animation import get_animation
+from app.services.downsampling import point_budget
+from app.services.indicators import parse_overlays
+from app.services.prerender import fragment_renderer
+from app.services.price_store import price_store
 from app.core.config import settings
+from app.core.assets import STATIC_DIR, asset_manifest, asset_url, plotly_bundle
+from app.core.cache import etag_matches, make_etag, page_cache
+from app.core.concurrency import run_in_render_pool
+from app.core.instrumentation import span
+from app.db.series import PriceSeries
 
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
+templates.env.globals["asset_url"] = asset_url
 logger = logging.getLogger(__name__)
 
+# Invalidates cached pages and ETags when the page or chart templates change
+_TEMPLATE_VERSION = hashlib.sha256(
+    Path("app/templates/index.html").read_bytes() + (STATIC_DIR / "js" / "spiral-layout.json").read_bytes()
+).hexdigest()[:12]
+_SW_TEMPLATE_VERSION = hashlib.sha256(Path("app/templates/sw.js").read_bytes()).hexdigest()[:12]
+_ANIMATION_TEMPLATE_VERSION = hashlib.sha256(
+    Path("app/templates/animation.html").read_bytes() + (STATIC_DIR / "js" / "spiral-layout.json").read_bytes()
+).hexdigest()[:12]
+
+# Rendered in place of the fragments of a streamed page, which is split where they appear
+_STATS_SLOT = Markup("<!-- stats -->")
+_CHART_SLOT = Markup("<!-- chart -->")
+# Characters of chart HTML per streamed chunk, each one compressed and flushed on its own
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_NO_DATA_CHART = "<div style='width:100%;height:100%;display:flex;align-items:center;justify-content:center;'><h2>No Bitcoin price data available</h2></div>"
+_UNAVAILABLE_CHART = "<div style='width:100%;height:100%;display:flex;align-items:center;justify-content:center;'><h2>The chart could not be rendered, please reload the page</h2></div>"
+
+def compile_templates() -> None:
+    """Compiles the templates, which Jinja otherwise does on their first render."""
+    for name in ("index.html", "animation.html", "sw.js"):
+        templates.get_template(name)
+
 @router.get("/")
-async def root(request: Request, days: Optional[int] = None, db: Session = Depends(get_db)):
+async def root(
+    request: Request,
+    days: Optional[int] = None,
+    points: Optional[int] = None,
+    width: Optional[int] = None,
+    overlays: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
     try:
-        prices = get_prices(db, days=days)
+        client_render = settings.CHART_RENDER_MODE == "client"
         chart_html_content = ""
         stats_html_content = ""
+        # Lets main.js append new points to the server-rendered chart
+        chart_version = ""
+        
+        # In client mode the page is a static shell and main.js fetches the chart data
+        prices = await price_store.get_series_async(db, days=days) if not client_render else None
+        
+        # The page only depends on the window of data shown and the host it links to
+        days = days or None
+        max_points = point_budget(points, width)
+        overlay_names = parse_overlays(overlays)
+        data_key = None
+        validators = {"Cache-Control": "no-cache"}
+        if prices is not None:
+            high_water_mark = price_store.high_water_mark
+            data_key = prices.version_token()
+            if high_water_mark:
+                validators["Last-Modified"] = format_datetime(high_water_mark.replace(tzinfo=timezone.utc), usegmt=True)
+        cache_key = (_TEMPLATE_VERSION, asset_manifest()["version"], days, max_points, overlay_names, client_render, data_key, str(request.base_url))
+        validators["ETag"] = make_etag(cache_key)
+        
+        if etag_matches(request.headers.get("if-none-match"), validators["ETag"]):
+            return Response(status_code=304, headers=validators)
+        
+        cached_body = page_cache.get(cache_key)
+        if cached_body is not None:
+            return Response(content=cached_body, media_type="text/html", headers=validators)
         
-        if not prices:
-            chart_html_content = "<div style='width:100%;height:100%;display:flex;align-items:center;justify-content:center;'><h2>No Bitcoin price data available</h2></div>"
+        stream = False
+        if client_render:
+            stats_html_content = "<p>Loading statistics...</p>"
+        elif not len(prices):
+            chart_html_content = _NO_DATA_CHART
             stats_html_content = "<p>No data to compute statistics.</p>"
+        elif settings.PAGE_STREAMING:
+            stream = True
+            chart_html_content, stats_html_content = _CHART_SLOT, _STATS_SLOT
+            chart_version = prices.version_token()
         else:
-            chart_html_content = create_logarithmic_spiral_chart(prices)
-            stats = calculate_statistics(prices)
-            
-            stats_html_content = f"""
-                <div class="stat-item">
-                    <span>Current Price</span>
-                    <strong>${stats.get('latest_price', 0):,.2f}</strong>
-                </div>
-                <div class="stat-item">
-                    <span>All-Time High</span>
-                    <strong>${stats.get('ath_price', 0):,.2f}</strong>
-                </div>
-                <div class="stat-item">
-                    <span>Days Since ATH</span>
-                    <strong>{stats.get('days_since_ath', 'N/A')}</strong>
-                </div>
-                <div class="stat-item">
-                    <span>Change from ATH</span>
-                    <strong style="color: {'#ff4d4d' if stats.get('change_from_ath_percent', 0) < 0 else '#4caf50'};">{stats.get('change_from_ath_percent', 0):.2f}%</strong>
-                </div>
-                <div class="stat-item">
-                    <span>Performance (1Y)</span>
-                    <strong style="color: {'#ff4d4d' if stats.get('performance_365d', 0) < 0 else '#4caf50'};">
-                        {f"{stats['performance_365d']:.2f}%" if stats.get('performance_365d') is not None else 'N/A'}
-                    </strong>
-                </div>
-                <div class="stat-item">
-                    <span>SMA 50D</span>
-                    <strong>{f"${stats['sma_50']:,.2f}" if stats.get('sma_50') is not None else 'N/A'}</strong>
-                </div>
-                <div class="stat-item">
-                    <span>SMA 200D</span>
-                    <strong>{f"${stats['sma_200']:,.2f}" if stats.get('sma_200') is not None else 'N/A'}</strong>
-                </div>
-            """
+            chart_html_content, stats_html_content = await fragment_renderer.get_fragments(prices, max_points, overlay_names)
+            chart_version = prices.version_token()
 
         base_url = str(request.base_url).rstrip('/')
         page_url = f"{base_url}?days={days}" if days else base_url
@@ -97,12 +141,136 @@ async def root(request: Request, days: Optional[int] = None, db: Session = Depen
             "page_url": page_url,
             "og_image_url": og_image_url,
             "json_ld_data": json.dumps(json_ld_data, indent=2),
+            "client_render": client_render,
             "chart_html_content": chart_html_content,
+            "chart_version": chart_version,
             "stats_html_content": stats_html_content,
             "google_analytics_id": settings.GOOGLE_ANALYTICS_ID,
+            "plotly_bundle": plotly_bundle(),
         }
         
-        return templates.TemplateResponse("index.html", context)
+        if stream:
+            with span("template"):
+                parts = _render_parts(context)
+            # No validators until the page is complete: a fragment that fails
+            # once the headers are sent leaves a placeholder, which must not be
+            # revalidated or kept. The next request is served from page_cache.
+            return StreamingResponse(
+                _stream_page(parts, prices, max_points, overlay_names, cache_key),
+                media_type="text/html",
+                # Stops proxies such as nginx from buffering the page until it is complete
+                headers={"Cache-Control": validators["Cache-Control"], "X-Accel-Buffering": "no"},
+            )
+
+        with span("template"):
+            response = templates.TemplateResponse(request, "index.html", context, headers=validators)
+        page_cache.set(cache_key, response.body)
+        return response
     except Exception as e:
         logger.error(f"Error on root endpoint: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail="Internal server error") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+def _render_parts(context: Dict) -> List[str]:
+    """Renders index.html with fragment slots, and splits it at each slot."""
+    parts: List[str] = []
+    chunks: List[str] = []
+    for chunk in templates.get_template("index.html").generate(context):
+        if chunk in (_STATS_SLOT, _CHART_SLOT):
+            parts.append("".join(chunks))
+            chunks = []
+        else:
+            chunks.append(chunk)
+    parts.append("".join(chunks))
+    return parts
+
+async def _stream_page(
+    parts: List[str], prices: PriceSeries, max_points: int, overlay_names: Tuple[str, ...], cache_key: Tuple,
+) -> AsyncIterator[str]:
+    """
+    Sends the page up to the statistics panel at once, then the panel and
+    the page up to the chart once the statistics are computed, then the
+    chart and the rest of the page once it is rendered.
+
+    Errors past the first chunk can no longer change the response status:
+    the failed fragment is replaced by a message, and the page not cached.
+    """
+    head, middle, tail = parts
+    yield head
+
+    try:
+        stats_html = await fragment_renderer.get_stats_fragment(prices, max_points, overlay_names)
+    except Exception as e:
+        logger.error(f"Error rendering the statistics of the root page: {e}", exc_info=True)
+        stats_html = None
+    yield (stats_html or "<p>Statistics unavailable.</p>") + middle
+
+    try:
+        chart_html, _ = await fragment_renderer.get_fragments(prices, max_points, overlay_names)
+    except Exception as e:
+        logger.error(f"Error rendering the chart of the root page: {e}", exc_info=True)
+        chart_html = None
+    chart = chart_html or _UNAVAILABLE_CHART
+    for offset in range(0, len(chart), STREAM_CHUNK_SIZE):
+        yield chart[offset:offset + STREAM_CHUNK_SIZE]
+    yield tail
+
+    if stats_html is not None and chart_html is not None:
+        page_cache.set(cache_key, "".join((head, stats_html, middle, chart_html, tail)).encode("utf-8"))
+
+@router.get("/animation")
+async def animation(
+    request: Request,
+    days: Optional[int] = None,
+    points: Optional[int] = None,
+    width: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    A page of the spiral growing one month per frame, with play controls
+    and a month slider, for sharing. /api/spiral/animation serves the same
+    figure as JSON.
+    """
+    try:
+        prices = await price_store.get_series_async(db, days=days)
+        if len(prices) < 2:
+            raise HTTPException(status_code=404, detail="No Bitcoin price data available")
+
+        days = days or None
+        max_points = point_budget(points, width)
+        data_key = prices.version_token()
+        cache_key = ("animation", _ANIMATION_TEMPLATE_VERSION, asset_manifest()["version"], days, max_points, data_key, str(request.base_url))
+        validators = {"Cache-Control": "no-cache", "ETag": make_etag(cache_key)}
+        if etag_matches(request.headers.get("if-none-match"), validators["ETag"]):
+            return Response(status_code=304, headers=validators)
+
+        base_url = str(request.base_url)
+        context = {
+            "request": request,
+            "title": "Bitcoin Logarithmic Spiral - Price History Time-Lapse",
+            "description": "Bitcoin's price history drawn month by month on a logarithmic spiral, with its all-time high and the days since.",
+            "page_url": f"{base_url}animation?days={days}" if days else f"{base_url}animation",
+            "og_image_url": f"{base_url}static/og-image.png",
+            "chart_html_content": await run_in_render_pool(get_animation, prices, max_points, "html"),
+            "plotly_bundle": plotly_bundle(),
+        }
+        with span("template"):
+            return templates.TemplateResponse(request, "animation.html", context, headers=validators)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error on animation endpoint: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.get("/sw.js")
+async def service_worker(request: Request):
+    """
+    The service worker, served from the root so that its scope covers the
+    whole site, with the asset manifest filled in.
+    """
+    manifest = asset_manifest()
+    headers = {"Cache-Control": "no-cache", "ETag": make_etag((_SW_TEMPLATE_VERSION, manifest["version"]))}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return templates.TemplateResponse(
+        request, "sw.js", {"manifest": manifest}, headers=headers, media_type="application/javascript",
+    ) 
\ No newline at end of file
@@ -1,12 +1,64 @@
-from fastapi import APIRouter, Request
-from fastapi.responses import PlainTextResponse, Response
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from datetime import datetime
+from typing import Dict
+
+from app.core.cache import page_cache
+from app.core.instrumentation import render_metrics
+from app.services.prerender import fragment_renderer
+from app.services.price_store import price_store
+from app.services.warmup import warmup
 
 router = APIRouter()
 
 @router.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": "bitcoin-logarithmic-spiral-api"}
+    """
+    Healthy once the worker has warmed up, with the duration of each
+    warm-up step, and its render worker pool, if any, is ready; 503 before.
+    While a pool that failed restarts, renders run in-process, and the
+    worker stays healthy, flagged as degraded.
+    """
+    body = {
+        "status": "healthy",
+        "service": "bitcoin-logarithmic-spiral-api",
+        "warmup": warmup.stats(),
+        "renderer": fragment_renderer.status,
+        "degraded": fragment_renderer.degraded,
+    }
+    if not warmup.ready or (fragment_renderer.status == "starting" and not fragment_renderer.degraded):
+        return JSONResponse({**body, "status": "starting"}, status_code=503)
+    if fragment_renderer.degraded:
+        return {**body, "status": "degraded"}
+    return body
+
+@router.get("/metrics")
+async def metrics(output_format: str = Query("prometheus", alias="format", pattern="^(prometheus|json)$")):
+    """
+    Stage latency, response size and query row histograms, plus the cache
+    and price store counters, in the Prometheus text format. `format=json`
+    returns the counters only, as JSON.
+    """
+    stats = {
+        "price_store": price_store.stats(),
+        "page_cache": page_cache.stats(),
+        "renderer": fragment_renderer.stats(),
+        "warmup": warmup.stats(),
+    }
+    if output_format == "json":
+        return JSONResponse(stats)
+    return PlainTextResponse(render_metrics(_gauges("app", stats)), media_type="text/plain; version=0.0.4")
+
+def _gauges(prefix: str, stats: Dict) -> Dict[str, float]:
+    """Flattens the numeric values of nested stats into gauge names."""
+    gauges = {}
+    for key, value in stats.items():
+        name = f"{prefix}_{key}"
+        if isinstance(value, dict):
+            gauges.update(_gauges(name, value))
+        elif isinstance(value, (bool, int, float)):
+            gauges[name] = float(value)
+    return gauges
 
 @router.get("/robots.txt", response_class=PlainTextResponse)
 def robots(request: Request):
@@ -0,0 +1,263 @@
+from starlette.datastructures import Headers
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.responses import FileResponse, Response
+from starlette.types import Scope
+from functools import lru_cache
+from pathlib import Path, PurePosixPath
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs
+import argparse
+import gzip
+import hashlib
+import importlib.util
+import json
+import logging
+import mimetypes
+import os
+import re
+
+from app.core.cache import etag_matches
+from app.core.files import write_atomic
+from app.core.compression import accepted_codings, brotli
+
+STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+VENDOR_DIR = STATIC_DIR / "vendor"
+# Output of the asset build: fingerprinted copies of the assets and their precompressed variants
+BUILD_DIR = STATIC_DIR / "build"
+BUILD_MANIFEST = BUILD_DIR / "assets.json"
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Files the pages load, versioned by content hash in the asset manifest
+MANIFEST_ASSETS = ("css/style.css", "js/main.js", "js/spiral-layout.json", "manifest.json", "og-image.png")
+
+# Precompressed variants, by content coding in order of preference, and their file suffix
+PRECOMPRESSED_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+# Variants that do not shrink the file at least this much are not kept
+MIN_COMPRESSION_RATIO = 0.9
+
+logger = logging.getLogger(__name__)
+
+def _plotlyjs_source() -> Tuple[bytes, str]:
+    """
+    Returns the plotly.js bundle shipped with the plotly package and its
+    version, read from the package data without importing plotly.
+    """
+    spec = importlib.util.find_spec("plotly")
+    locations = list(spec.submodule_search_locations or []) if spec else []
+    for location in locations:
+        path = Path(location) / "package_data" / "plotly.min.js"
+        if path.exists():
+            source = path.read_bytes()
+            # The bundle starts with a "plotly.js vX.Y.Z" banner
+            match = re.search(rb"plotly\.js v([\w.+-]+)", source[:512])
+            if match:
+                return source, match.group(1).decode("ascii")
+    from plotly.offline import get_plotlyjs, get_plotlyjs_version
+
+    return get_plotlyjs().encode("utf-8"), get_plotlyjs_version()
+
+@lru_cache(maxsize=1)
+def plotly_bundle() -> str:
+    """
+    Publishes the plotly.js bundle shipped with the plotly package under
+    /static/vendor, named after its version and content hash.
+
+    Returns the bundle path relative to /static.
+    """
+    source, version = _plotlyjs_source()
+    digest = hashlib.sha256(source).hexdigest()[:12]
+    name = f"plotly-{version}.{digest}.min.js"
+    target = VENDOR_DIR / name
+
+    if not target.exists():
+        write_atomic(target, lambda f: f.write(source))
+        logger.info(f"Published plotly.js bundle as {target}")
+
+    return f"vendor/{name}"
+
+@lru_cache(maxsize=1)
+def asset_hashes() -> Dict[str, str]:
+    """Content hashes of the manifest assets and the plotly.js bundle, by path relative to /static."""
+    paths = MANIFEST_ASSETS + (plotly_bundle(),)
+    return {path: hashlib.sha256((STATIC_DIR / path).read_bytes()).hexdigest()[:12] for path in paths}
+
+def fingerprinted_name(path: str, digest: str) -> str:
+    """Inserts the content hash in a file name, `css/style.css` becoming `css/style.<hash>.css`."""
+    name = PurePosixPath(path)
+    if digest in name.name:
+        return path
+    return name.with_name(f"{name.stem}.{digest}{name.suffix}").as_posix()
+
+def _compressors() -> Dict[str, Callable[[bytes], bytes]]:
+    compressors = {}
+    if brotli is not None:
+        compressors["br"] = lambda data: brotli.compress(data, quality=11)
+    # No timestamp in the header, so that builds of the same file are identical
+    compressors["gzip"] = lambda data: gzip.compress(data, compresslevel=9, mtime=0)
+    return compressors
+
+def build_assets() -> Dict[str, Dict]:
+    """
+    Writes a copy of each manifest asset and of the plotly.js bundle to
+    BUILD_DIR, named after its content hash, along with its gzip and, when
+    brotli is installed, brotli compressed variants. Records them in
+    BUILD_MANIFEST, and returns its entries.
+
+    Files are named after their content, so existing ones are kept, and
+    pages still loading the files of a previous build find them.
+    """
+    compressors = _compressors()
+    entries = {}
+    for path, digest in asset_hashes().items():
+        name = fingerprinted_name(path, digest)
+        target = BUILD_DIR / name
+        source = (STATIC_DIR / path).read_bytes()
+        if not target.exists():
+            write_atomic(target, lambda f: f.write(source))
+        encodings = []
+        for encoding, compress in compressors.items():
+            variant = target.with_name(target.name + PRECOMPRESSED_SUFFIXES[encoding])
+            if not variant.exists():
+                compressed = compress(source)
+                if len(compressed) > len(source) * MIN_COMPRESSION_RATIO:
+                    continue
+                write_atomic(variant, lambda f: f.write(compressed))
+            encodings.append(encoding)
+        entries[path] = {"hash": digest, "file": name, "encodings": encodings}
+    manifest = json.dumps({"assets": entries}, indent=2, sort_keys=True).encode("utf-8")
+    write_atomic(BUILD_MANIFEST, lambda f: f.write(manifest))
+    return entries
+
+@lru_cache(maxsize=1)
+def built_assets() -> Dict[str, Dict]:
+    """
+    The entries of BUILD_MANIFEST built from the current content of their
+    asset, by path relative to /static. Assets missing from it, or changed
+    since the build, are served from /static as they are.
+    """
+    try:
+        entries = json.loads(BUILD_MANIFEST.read_text())["assets"]
+    except (OSError, ValueError, KeyError):
+        entries = {}
+    hashes = asset_hashes()
+    current = {path: entry for path, entry in entries.items() if hashes.get(path) == entry.get("hash")}
+    if len(current) < len(hashes):
+        logger.warning(
+            f"{len(hashes) - len(current)} static asset(s) missing from the asset build, "
+            "they are compressed per request: run `python -m app.core.assets`"
+        )
+    return current
+
+@lru_cache(maxsize=1)
+def _precompressed_files() -> Dict[str, Tuple[str, ...]]:
+    """The content codings of the precompressed variants of each built file, by path relative to /static."""
+    return {f"build/{entry['file']}": tuple(entry["encodings"]) for entry in built_assets().values()}
+
+@lru_cache(maxsize=1)
+def asset_manifest() -> Dict:
+    """
+    The manifest of the static assets: the URL of each, carrying its
+    content hash, and a version of the whole set. Built assets are linked
+    to their fingerprinted copy, others by their path and a `?v=` hash.
+
+    The service worker precaches these URLs and names its caches after the
+    version, so that a deploy changing any asset replaces them.
+    """
+    built = built_assets()
+    assets = {}
+    for path, digest in asset_hashes().items():
+        if path in built:
+            assets[path] = f"/static/build/{built[path]['file']}"
+        elif path.startswith("vendor/"):
+            assets[path] = f"/static/{path}"
+        else:
+            assets[path] = f"/static/{path}?v={digest}"
+    version = hashlib.sha256(json.dumps(assets, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+    return {"version": version, "assets": assets}
+
+def asset_url(path: str) -> str:
+    """Returns the versioned URL of a static file, or its plain URL if it is not in the manifest."""
+    path = path.lstrip("/")
+    return asset_manifest()["assets"].get(path, f"/static/{path}")
+
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles that lets browsers cache content-hashed files forever: the
+    built and vendor files, and manifest assets requested with their
+    current hash.
+
+    Built files are sent as their precompressed variant in the best coding
+    the client accepts, so that serving them costs no compression.
+    """
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        path = Path(full_path)
+        encoding = self._precompressed_encoding(path, scope)
+        if encoding is not None:
+            response = self._precompressed_response(path, encoding, scope, status_code)
+        else:
+            response = super().file_response(full_path, stat_result, scope, status_code)
+        if path.parent == VENDOR_DIR or BUILD_DIR in path.parents or self._is_current_version(full_path, scope):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+    @staticmethod
+    def _precompressed_encoding(path: Path, scope: Scope) -> Optional[str]:
+        if BUILD_DIR not in path.parents:
+            return None
+        try:
+            encodings = _precompressed_files().get(path.resolve().relative_to(STATIC_DIR).as_posix(), ())
+        except ValueError:
+            return None
+        if not encodings:
+            return None
+        accepted = accepted_codings(Headers(scope=scope).get("accept-encoding", ""))
+        return next((encoding for encoding in encodings if encoding in accepted or "*" in accepted), None)
+
+    def _precompressed_response(self, path: Path, encoding: str, scope: Scope, status_code: int) -> Response:
+        variant = path.with_name(path.name + PRECOMPRESSED_SUFFIXES[encoding])
+        response = FileResponse(
+            variant,
+            status_code=status_code,
+            stat_result=os.stat(variant),
+            media_type=mimetypes.guess_type(path.name)[0] or "text/plain",
+            headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"},
+        )
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    def is_not_modified(self, response_headers: Headers, request_headers: Headers) -> bool:
+        # Also matches the ETags CompressionMiddleware gives the bodies it encodes
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match:
+            return etag_matches(if_none_match, response_headers["etag"])
+        return super().is_not_modified(response_headers, request_headers)
+
+    @staticmethod
+    def _is_current_version(full_path, scope: Scope) -> bool:
+        requested = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("v")
+        if not requested:
+            return False
+        try:
+            path = Path(full_path).resolve().relative_to(STATIC_DIR).as_posix()
+        except ValueError:
+            return False
+        return asset_hashes().get(path) == requested[0]
+
+def main():
+    parser = argparse.ArgumentParser(description="Builds the fingerprinted and precompressed copies of the static assets.")
+    parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    for path, entry in build_assets().items():
+        target = BUILD_DIR / entry["file"]
+        sizes = ", ".join(
+            f"{encoding} {target.with_name(target.name + PRECOMPRESSED_SUFFIXES[encoding]).stat().st_size:,}"
+            for encoding in entry["encodings"]
+        )
+        print(f"{path:<36} -> build/{entry['file']} ({target.stat().st_size:,} bytes" + (f", {sizes})" if sizes else ")"))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+import hashlib
+import threading
+
+from app.core.config import settings
+
+class LRUCache:
+    """
+    Size-bounded, thread-safe least-recently-used cache with hit, miss and
+    eviction counters.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else None,
+        }
+
+# Fully rendered pages, keyed by (days, data version, host)
+page_cache = LRUCache(settings.PAGE_CACHE_SIZE)
+
+# Content codings whose name CompressionMiddleware appends to the ETag of the bodies it encodes
+ETAG_CODINGS = ("gzip", "br")
+
+def make_etag(key: Hashable) -> str:
+    """Returns a strong ETag derived from a cache key."""
+    return '"' + hashlib.sha256(repr(key).encode("utf-8")).hexdigest()[:32] + '"'
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """Returns the ETag of a body encoded with `encoding`, e.g. `"abc"` becomes `"abc-gzip"`."""
+    return f'{etag[:-1]}-{encoding}"' if etag.endswith('"') else etag
+
+def _unencoded_etag(tag: str) -> str:
+    tag = tag.strip().removeprefix("W/")
+    for encoding in ETAG_CODINGS:
+        if tag.endswith(f'-{encoding}"'):
+            return tag[:-len(encoding) - 2] + '"'
+    return tag
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Tells whether an If-None-Match header value matches `etag`, weakly, or
+    in the form `encoded_etag` gives it when the body was sent encoded.
+    """
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or _unencoded_etag(etag) in {_unencoded_etag(tag) for tag in candidates}
@@ -0,0 +1,183 @@
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from functools import lru_cache
+from typing import FrozenSet, Optional
+import zlib
+
+from app.core.cache import LRUCache, encoded_etag
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - without brotli, responses are gzip-only
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+@lru_cache(maxsize=256)
+def accepted_codings(accept_encoding: str) -> FrozenSet[str]:
+    """The content codings an Accept-Encoding header accepts, lowercased, `*` included."""
+    accepted = set()
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            accepted.add(coding.strip().lower())
+    return frozenset(accepted)
+
+@lru_cache(maxsize=256)
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Picks the content coding for an Accept-Encoding header: brotli when it
+    is installed and accepted, then gzip, else None for identity.
+    """
+    accepted = accepted_codings(accept_encoding)
+    if brotli is not None and ("br" in accepted or "*" in accepted):
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+class _Compressor:
+    """Incremental gzip or brotli stream, flushed after every chunk."""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._stream = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._stream = zlib.compressobj(gzip_level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._stream.process(data) + self._stream.flush()
+        return self._stream.compress(data) + self._stream.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self.encoding == "br":
+            return self._stream.process(data) + self._stream.finish()
+        return self._stream.compress(data) + self._stream.flush()
+
+class CompressionMiddleware:
+    """
+    Compresses text responses with the best coding the client accepts.
+
+    Complete bodies under `minimum_size` bytes are sent as is. Streamed
+    bodies are compressed chunk by chunk and flushed as they go, so the
+    client receives each part as soon as the application sends it.
+
+    Complete bodies of responses with an ETag are compressed once per
+    coding and kept in `cache`. Encoded responses get their own ETag, with
+    the coding appended, so that each representation has its own strong
+    validator, and 304 responses to a request for one echo it.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        cache: Optional[LRUCache] = None,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache = cache
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        encoding = negotiate_encoding(request_headers.get("accept-encoding", ""))
+        start_message: Optional[Message] = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start_message, compressor, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message.get("headers", []))
+                compressible = headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+                if compressible and "accept-encoding" not in headers.get("vary", "").lower():
+                    MutableHeaders(scope=message).add_vary_header("Accept-Encoding")
+                if (
+                    encoding is None
+                    or not compressible
+                    or "content-encoding" in headers
+                    or message["status"] in (204, 206, 304)
+                ):
+                    passthrough = True
+                    etag = headers.get("etag")
+                    if message["status"] == 304 and encoding is not None and etag:
+                        # The client revalidates the encoded body it holds
+                        tag = encoded_etag(etag, encoding)
+                        if tag in request_headers.get("if-none-match", ""):
+                            MutableHeaders(scope=message)["ETag"] = tag
+                    await send(message)
+                else:
+                    start_message = message
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                headers = MutableHeaders(scope=start_message)
+                headers["Content-Encoding"] = encoding
+                etag = headers.get("etag")
+                if etag:
+                    headers["ETag"] = encoded_etag(etag, encoding)
+                if not more_body:
+                    body = self._compress_body(body, encoding, scope["path"], etag)
+                    headers["Content-Length"] = str(len(body))
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+
+                del headers["Content-Length"]
+                compressor = _Compressor(encoding, self.gzip_level, self.brotli_quality)
+                await send(start_message)
+
+            body = compressor.compress(body) if more_body else compressor.finish(body)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+    def _compress_body(self, body: bytes, encoding: str, path: str, etag: Optional[str]) -> bytes:
+        key = (path, etag, encoding)
+        cached = self.cache.get(key) if self.cache is not None and etag else None
+        if cached is not None:
+            return cached
+        compressed = _Compressor(encoding, self.gzip_level, self.brotli_quality).finish(body)
+        if self.cache is not None and etag:
+            self.cache.set(key, compressed)
+        return compressed
@@ -0,0 +1,22 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+import asyncio
+import contextvars
+import functools
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+# Keeps chart builds off the event loop, so cached pages, /health and
+# database I/O are answered while a build runs
+render_executor = ThreadPoolExecutor(max_workers=settings.CHART_WORKERS, thread_name_prefix="render")
+
+async def run_in_render_pool(fn: Callable[..., T], *args, **kwargs) -> T:
+    """
+    Runs a CPU-bound chart or statistics build on `render_executor`, in a
+    copy of the caller's context so that its spans count for the request.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(render_executor, functools.partial(context.run, fn, *args, **kwargs))
@@ -1,5 +1,6 @@
 import os
 from dotenv import load_dotenv
+from sqlalchemy.engine import make_url
 
 load_dotenv()
 
@@ -9,11 +10,49 @@ class Settings:
     DB_HOST: str = os.getenv("DB_HOST", "localhost")
     DB_PORT: int = int(os.getenv("DB_PORT", "1234"))
     DB_NAME: str = os.getenv("DB_NAME", "db_name")
+    # Overrides the DB_* settings above, e.g. sqlite:///bitcoin.db for local runs
+    DATABASE_URL: str = os.getenv("DATABASE_URL", "")
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    
+    PRICE_REFRESH_SECONDS: int = int(os.getenv("PRICE_REFRESH_SECONDS", "300"))
+    # Where derived data such as the series pyramid and snapshot is persisted
+    DATA_DIR: str = os.getenv("DATA_DIR", "data")
+    # "server" embeds the rendered chart in the page, "client" serves a static
+    # shell that main.js fills from /api/spiral
+    CHART_RENDER_MODE: str = os.getenv("CHART_RENDER_MODE", "server")
+    # Upper bound on the points plotted per chart; longer series are downsampled
+    CHART_MAX_POINTS: int = int(os.getenv("CHART_MAX_POINTS", "5000"))
+    PAGE_CACHE_SIZE: int = int(os.getenv("PAGE_CACHE_SIZE", "64"))
+    # Stream pages that are not cached: the page shell and statistics panel
+    # are sent before the chart is rendered
+    PAGE_STREAMING: bool = os.getenv("PAGE_STREAMING", "true").lower() in ("1", "true", "yes")
+    # Stage timings in Server-Timing headers and /metrics histograms
+    INSTRUMENTATION_ENABLED: bool = os.getenv("INSTRUMENTATION_ENABLED", "true").lower() in ("1", "true", "yes")
+    # Responses smaller than this many bytes are sent uncompressed
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    # Threads that build charts off the event loop
+    CHART_WORKERS: int = int(os.getenv("CHART_WORKERS", "4"))
+    # Worker processes that render charts, and pre-render every selectable
+    # time range when new prices land; 0 renders in-process only
+    PRERENDER_WORKERS: int = int(os.getenv("PRERENDER_WORKERS", "2"))
+    # Renders queued on the workers before requests fall back to in-process rendering
+    PRERENDER_QUEUE_SIZE: int = int(os.getenv("PRERENDER_QUEUE_SIZE", "16"))
     
     GOOGLE_ANALYTICS_ID: str = os.getenv("GOOGLE_ANALYTICS_ID", "G-0000000000")
     
     @property
     def database_url(self) -> str:
+        if self.DATABASE_URL:
+            return self.DATABASE_URL
         return f"mysql+pymysql://{self.DB_USER}:{self.DB_PASS}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
+    
+    @property
+    def async_database_url(self) -> str:
+        """`database_url` with the asyncio driver of its backend."""
+        url = make_url(self.database_url)
+        drivers = {"mysql": "aiomysql", "sqlite": "aiosqlite"}
+        url = url.set(drivername=f"{url.get_backend_name()}+{drivers[url.get_backend_name()]}")
+        return url.render_as_string(hide_password=False)
 
 settings = Settings() 
\ No newline at end of file
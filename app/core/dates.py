@@ -0,0 +1,25 @@
+from datetime import datetime, timezone
+import math
+
+# Timestamps above this are taken to be in milliseconds (it is 5138 AD in seconds)
+MILLISECONDS_THRESHOLD = 1e11
+
+def parse_date(value: object) -> datetime:
+    """
+    Parses a datetime, an ISO 8601 string or a Unix timestamp into a naive
+    UTC datetime, to the second.
+    """
+    if isinstance(value, str):
+        value = value.strip()
+        try:
+            value = float(value)
+        except ValueError:
+            value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.replace(microsecond=0)
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value):
+        seconds = value / 1000 if value > MILLISECONDS_THRESHOLD else value
+        return datetime.fromtimestamp(int(seconds), timezone.utc).replace(tzinfo=None)
+    raise ValueError(f"not a date: {value!r}")
@@ -0,0 +1,25 @@
+from pathlib import Path
+from typing import BinaryIO, Callable
+import os
+import tempfile
+
+def write_atomic(target: Path, write: Callable[[BinaryIO], object]) -> None:
+    """
+    Writes a file through `write`, given the file opened in binary mode,
+    to a temporary file next to `target`, then renames it over `target`, so
+    that readers see either the previous content or the new one in full.
+    """
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=target.parent, suffix=f".{target.name}.tmp")
+    try:
+        # mkstemp creates the file readable by its owner only, a proxy serving /static or
+        # another worker may run as another user
+        os.fchmod(fd, 0o644)
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, target)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
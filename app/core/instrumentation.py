@@ -0,0 +1,153 @@
+from contextlib import nullcontext
+from contextvars import ContextVar
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from typing import Dict, List, Optional, Sequence, Tuple
+import bisect
+import threading
+import time
+
+from app.core.config import settings
+
+ENABLED = settings.INSTRUMENTATION_ENABLED
+
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1_000, 10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 5_000_000)
+ROW_BUCKETS = (1, 10, 100, 1_000, 10_000, 100_000, 1_000_000)
+
+class Histogram:
+    """
+    Cumulative histogram in the Prometheus exposition format, with one
+    series per value of a single label.
+    """
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float], label: str):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.label = label
+        # Per label value: bucket counts (the last one is +Inf), sum
+        self._series: Dict[str, Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_value: str, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {key: (list(counts), total[0]) for key, (counts, total) in self._series.items()}
+        for label_value, (counts, total) in sorted(snapshot.items()):
+            label = f'{self.label}="{_escape(label_value)}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f'{self.name}_bucket{{{label},le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label}}} {total!r}")
+            lines.append(f"{self.name}_count{{{label}}} {cumulative}")
+        return lines
+
+stage_seconds = Histogram("app_stage_duration_seconds", "Time spent in each stage of request handling.", DURATION_BUCKETS, "stage")
+request_seconds = Histogram("app_request_duration_seconds", "Time until the response headers are sent.", DURATION_BUCKETS, "route")
+response_bytes = Histogram("app_response_size_bytes", "Response body size, as sent.", SIZE_BUCKETS, "route")
+query_rows = Histogram("app_query_rows", "Rows returned per price query.", ROW_BUCKETS, "query")
+HISTOGRAMS = (stage_seconds, request_seconds, response_bytes, query_rows)
+
+# Durations of the spans of the current request, by stage
+_request_spans: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_spans", default=None)
+_NULL_SPAN = nullcontext()
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self) -> "_Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        elapsed = time.perf_counter() - self.start
+        stage_seconds.observe(self.name, elapsed)
+        spans = _request_spans.get()
+        if spans is not None:
+            spans[self.name] = spans.get(self.name, 0.0) + elapsed
+        return False
+
+def span(name: str):
+    """
+    Times the enclosed block as stage `name`, for the stage histogram and
+    the Server-Timing header of the current request.
+
+    Returns a shared no-op context manager when instrumentation is disabled.
+    """
+    return _Span(name) if ENABLED else _NULL_SPAN
+
+def observe_rows(query: str, rows: int) -> None:
+    if ENABLED:
+        query_rows.observe(query, rows)
+
+def render_metrics(gauges: Dict[str, float]) -> str:
+    """Renders the histograms, then `gauges`, in the Prometheus text format."""
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    for name, value in gauges.items():
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {float(value)!r}")
+    return "\n".join(lines) + "\n"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class ServerTimingMiddleware:
+    """
+    Collects the spans of each HTTP request, sends them in a Server-Timing
+    header along with the total time until the headers, and records the
+    request duration and response size per route.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        spans: Dict[str, float] = {}
+        token = _request_spans.set(spans)
+        start = time.perf_counter()
+        size = 0
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal size
+            if message["type"] == "http.response.start":
+                total = time.perf_counter() - start
+                request_seconds.observe(_route(scope), total)
+                timings = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in spans.items()]
+                timings.append(f"total;dur={total * 1000:.1f}")
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", ", ".join(timings).encode("latin-1"))]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+                if not message.get("more_body", False):
+                    response_bytes.observe(_route(scope), size)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_spans.reset(token)
+
+def _route(scope: Scope) -> str:
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    return "/static" if scope["path"].startswith("/static/") else "unmatched"
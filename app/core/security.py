@@ -1,24 +1,46 @@
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from typing import Dict
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
-        headers = MutableHeaders(response.headers)
-        headers["Content-Security-Policy"] = (
-            "default-src 'self'; "
-            "style-src 'self' 'unsafe-inline' https://fonts.googleapis.com; "
-            "font-src 'self' https://fonts.gstatic.com; "
-            "script-src 'self' 'unsafe-inline' https://www.googletagmanager.com; "
-            "connect-src 'self' https://www.google-analytics.com https://analytics.google.com; "
-            "img-src 'self' data: https://www.google-analytics.com; "
-            "object-src 'none'; "
-            "frame-ancestors 'none'; "
-            "base-uri 'self';"
-        )
-        headers["X-Content-Type-Options"] = "nosniff"
-        headers["X-Frame-Options"] = "DENY"
-        headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        response.headers.update(headers)
-        return response 
\ No newline at end of file
+SECURITY_HEADERS = {
+    "Content-Security-Policy": (
+        "default-src 'self'; "
+        "style-src 'self' 'unsafe-inline' https://fonts.googleapis.com; "
+        "font-src 'self' https://fonts.gstatic.com; "
+        "script-src 'self' 'unsafe-inline' https://www.googletagmanager.com; "
+        "connect-src 'self' https://www.google-analytics.com https://analytics.google.com; "
+        "img-src 'self' data: https://www.google-analytics.com; "
+        "object-src 'none'; "
+        "frame-ancestors 'none'; "
+        "base-uri 'self';"
+    ),
+    "X-Content-Type-Options": "nosniff",
+    "X-Frame-Options": "DENY",
+    "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
+}
+
+class SecurityHeadersMiddleware:
+    """
+    Sets the security headers on every HTTP response, replacing any value
+    set by the application.
+
+    A plain ASGI middleware: the headers are encoded once, and the response
+    body passes through untouched.
+    """
+
+    def __init__(self, app: ASGIApp, headers: Dict[str, str] = SECURITY_HEADERS):
+        self.app = app
+        self.raw_headers = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()]
+        self.names = {name for name, _ in self.raw_headers}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = [header for header in message.get("headers", []) if header[0].lower() not in self.names]
+                message["headers"] = headers + self.raw_headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
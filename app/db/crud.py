@@ -1,8 +1,12 @@
+from sqlalchemy import Select, bindparam, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta, timezone
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 import logging
+from app.core.instrumentation import observe_rows, span
 from .models import BitcoinPrice
+from .series import PriceSeries
 
 def get_prices(db: Session, days: Optional[int] = None) -> List[BitcoinPrice]:
     """
@@ -18,4 +22,157 @@ def get_prices(db: Session, days: Optional[int] = None) -> List[BitcoinPrice]:
         return query.all()
     except Exception as e:
         logging.error(f"Error fetching Bitcoin prices: {e}")
-        raise 
\ No newline at end of file
+        raise
+
+def _price_series_query(days: Optional[int] = None) -> Select:
+    query = select(BitcoinPrice.dateAdd, BitcoinPrice.price).order_by(BitcoinPrice.dateAdd.asc())
+    if days:
+        start_date = datetime.now(timezone.utc) - timedelta(days=days)
+        query = query.where(BitcoinPrice.dateAdd >= start_date)
+    return query
+
+def _price_series_since_query(since: datetime) -> Select:
+    return (
+        select(BitcoinPrice.dateAdd, BitcoinPrice.price)
+        .where(BitcoinPrice.dateAdd >= since)
+        .order_by(BitcoinPrice.dateAdd.asc())
+    )
+
+def _price_fingerprint_query(until: datetime) -> Select:
+    # Only the rows PriceSeries keeps, so that the count matches the length of the series
+    return select(func.count(), func.sum(BitcoinPrice.price)).where(BitcoinPrice.dateAdd <= until, BitcoinPrice.price > 0)
+
+def get_price_series(db: Session, days: Optional[int] = None) -> PriceSeries:
+    """
+    Fetches Bitcoin prices as a columnar series, without building ORM objects.
+    
+    Can be filtered by the number of days from the present.
+    """
+    try:
+        with span("db"):
+            series = PriceSeries.from_rows(db.execute(_price_series_query(days)).all())
+        observe_rows("series", len(series))
+        return series
+    except Exception as e:
+        logging.error(f"Error fetching Bitcoin price series: {e}")
+        raise
+
+def get_price_series_since(db: Session, since: datetime) -> PriceSeries:
+    """
+    Fetches the columnar series of prices dated at or after `since`.
+    """
+    try:
+        with span("db"):
+            series = PriceSeries.from_rows(db.execute(_price_series_since_query(since)).all())
+        observe_rows("series_since", len(series))
+        return series
+    except Exception as e:
+        logging.error(f"Error fetching Bitcoin price series since {since}: {e}")
+        raise
+
+async def get_price_series_async(db: AsyncSession, days: Optional[int] = None) -> PriceSeries:
+    """
+    Async variant of `get_price_series`.
+    """
+    try:
+        with span("db"):
+            series = PriceSeries.from_rows((await db.execute(_price_series_query(days))).all())
+        observe_rows("series", len(series))
+        return series
+    except Exception as e:
+        logging.error(f"Error fetching Bitcoin price series: {e}")
+        raise
+
+async def get_price_series_since_async(db: AsyncSession, since: datetime) -> PriceSeries:
+    """
+    Async variant of `get_price_series_since`.
+    """
+    try:
+        with span("db"):
+            series = PriceSeries.from_rows((await db.execute(_price_series_since_query(since))).all())
+        observe_rows("series_since", len(series))
+        return series
+    except Exception as e:
+        logging.error(f"Error fetching Bitcoin price series since {since}: {e}")
+        raise
+
+
+def get_price_fingerprint(db: Session, until: datetime) -> Tuple[int, Optional[float]]:
+    """
+    Counts and sums the positive prices dated at or before `until`, so that
+    rows inserted or updated behind a high-water mark can be detected.
+    """
+    try:
+        with span("db"):
+            count, total = db.execute(_price_fingerprint_query(until)).one()
+        # DECIMAL columns sum to a Decimal
+        return count, None if total is None else float(total)
+    except Exception as e:
+        logging.error(f"Error fetching Bitcoin price fingerprint: {e}")
+        raise
+
+async def get_price_fingerprint_async(db: AsyncSession, until: datetime) -> Tuple[int, Optional[float]]:
+    """
+    Async variant of `get_price_fingerprint`.
+    """
+    try:
+        with span("db"):
+            count, total = (await db.execute(_price_fingerprint_query(until))).one()
+        return count, None if total is None else float(total)
+    except Exception as e:
+        logging.error(f"Error fetching Bitcoin price fingerprint: {e}")
+        raise
+
+def get_latest_price_date(db: Session) -> Optional[datetime]:
+    return db.scalar(select(func.max(BitcoinPrice.dateAdd)))
+
+# Decimal places of the price column, DECIMAL(20, 8) in the documented schema
+PRICE_SCALE = 8
+
+def upsert_prices(db: Session, prices: Dict[datetime, float], update_existing: bool = True, check_existing: bool = True) -> Tuple[int, int]:
+    """
+    Writes prices keyed by `dateAdd` in multi-row statements, in the
+    current transaction of `db`.
+
+    Prices whose `dateAdd` is already stored are updated when
+    `update_existing` and they differ at the scale of the column, and
+    skipped otherwise. `check_existing=False` skips
+    that lookup, for prices known to be newer than every stored row.
+
+    Returns the number of rows inserted and updated.
+    """
+    if not prices:
+        return 0, 0
+    try:
+        conn = db.connection()
+        existing = {}
+        if check_existing:
+            rows = conn.execute(
+                select(BitcoinPrice.dateAdd, BitcoinPrice.price).where(BitcoinPrice.dateAdd.in_(list(prices)))
+            ).all()
+            existing = {date: price for date, price in rows}
+
+        new_rows = [{"dateAdd": date, "price": price} for date, price in prices.items() if date not in existing]
+        if new_rows:
+            # Sent as multi-row INSERT ... VALUES statements
+            conn.execute(insert(BitcoinPrice), new_rows)
+
+        changed_rows = []
+        if update_existing:
+            # Stored prices may come back as Decimal, rounded to the column scale
+            changed_rows = [
+                {"date": date, "new_price": prices[date]}
+                for date, price in existing.items()
+                if round(float(price), PRICE_SCALE) != round(float(prices[date]), PRICE_SCALE)
+            ]
+        if changed_rows:
+            conn.execute(
+                update(BitcoinPrice)
+                .where(BitcoinPrice.dateAdd == bindparam("date"))
+                .values(price=bindparam("new_price")),
+                changed_rows,
+            )
+        return len(new_rows), len(changed_rows)
+    except Exception as e:
+        logging.error(f"Error writing Bitcoin prices: {e}")
+        raise
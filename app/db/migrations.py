@@ -0,0 +1,154 @@
+"""
+Schema migrations, applied in order and recorded in the `schema_migrations`
+table. Each one checks the schema before changing it, so that it also
+applies to databases created from the current models.
+
+    python -m app.db.migrations           # applies the pending migrations
+    python -m app.db.migrations --status
+    python -m app.db.migrations --dedupe-dates
+"""
+from sqlalchemy import Column, DateTime, MetaData, String, Table, func, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from datetime import datetime, timezone
+from typing import Callable, List, Set
+import argparse
+import logging
+import sys
+
+from .models import BitcoinPrice
+from .session import engine as default_engine
+
+logger = logging.getLogger(__name__)
+
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", String(64), primary_key=True),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+class DuplicateDatesError(RuntimeError):
+    """Raised when `dateAdd` cannot be made unique without deleting rows that were not opted in to be deleted."""
+
+class Migration:
+    def __init__(self, version: str, description: str, upgrade: Callable[..., None]):
+        self.version = version
+        self.description = description
+        self.upgrade = upgrade
+
+def _create_price_table(conn: Connection, **options) -> None:
+    BitcoinPrice.__table__.create(conn, checkfirst=True)
+
+DATE_INDEXES = ("uq_BitcoinPrice_dateAdd", "ix_BitcoinPrice_dateAdd_price")
+# Duplicate dates listed in the error of a migration that finds them
+DUPLICATES_SHOWN = 20
+
+def _add_date_indexes(conn: Connection, dedupe_dates: bool = False, **options) -> None:
+    """
+    Makes `dateAdd` unique and adds the covering `(dateAdd, price)` index,
+    so that time range reads are index-ordered range scans instead of
+    full scans followed by a sort.
+
+    Fails with `DuplicateDatesError`, listing them, if rows share a date,
+    unless `dedupe_dates` is set, which deletes all but the last inserted
+    row of each date.
+    """
+    table = BitcoinPrice.__table__
+    quote = conn.dialect.identifier_preparer.quote
+    existing = {index["name"]: index for index in inspect(conn).get_indexes(table.name)}
+
+    if DATE_INDEXES[0] not in existing and dedupe_dates:
+        # Of rows sharing a date, the last inserted one wins, as in ingestion.
+        # The derived table lets MySQL read the table it deletes from.
+        removed = conn.execute(text(
+            f"DELETE FROM {quote(table.name)} WHERE id NOT IN "
+            f"(SELECT id FROM (SELECT MAX(id) AS id FROM {quote(table.name)} GROUP BY {quote('dateAdd')}) AS kept)"
+        )).rowcount
+        if removed:
+            logger.warning(f"Removed {removed} BitcoinPrice rows with a duplicate dateAdd")
+    elif DATE_INDEXES[0] not in existing:
+        count = func.count().label("count")
+        duplicates = conn.execute(
+            select(table.c.dateAdd, count).group_by(table.c.dateAdd).having(count > 1).order_by(table.c.dateAdd)
+        ).all()
+        if duplicates:
+            listed = "\n".join(f"  {date} ({rows} rows)" for date, rows in duplicates[:DUPLICATES_SHOWN])
+            more = f"\n  and {len(duplicates) - DUPLICATES_SHOWN} more" if len(duplicates) > DUPLICATES_SHOWN else ""
+            raise DuplicateDatesError(
+                f"{len(duplicates)} dateAdd values are shared by several BitcoinPrice rows:\n{listed}{more}\n"
+                "Remove the duplicates, or run `python -m app.db.migrations --dedupe-dates` "
+                "to keep the last inserted row of each date."
+            )
+
+    indexes = {index.name: index for index in table.indexes}
+    for name in DATE_INDEXES:
+        if name not in existing:
+            logger.info(f"Creating index {name}")
+            indexes[name].create(conn)
+
+    # A plain dateAdd index, like the one of the documented schema, is now redundant
+    for name, index in existing.items():
+        if index["column_names"] == ["dateAdd"] and not index["unique"]:
+            logger.info(f"Dropping redundant index {name}")
+            on_table = f" ON {quote(table.name)}" if conn.dialect.name == "mysql" else ""
+            conn.execute(text(f"DROP INDEX {quote(name)}{on_table}"))
+
+MIGRATIONS: List[Migration] = [
+    Migration("0001_create_price_table", "Creates the BitcoinPrice table", _create_price_table),
+    Migration("0002_date_indexes", "Unique dateAdd and covering (dateAdd, price) indexes", _add_date_indexes),
+]
+
+def applied_versions(engine: Engine) -> Set[str]:
+    schema_migrations.create(engine, checkfirst=True)
+    with engine.connect() as conn:
+        return set(conn.scalars(select(schema_migrations.c.version)))
+
+def pending_migrations(engine: Engine = default_engine) -> List[Migration]:
+    applied = applied_versions(engine)
+    return [migration for migration in MIGRATIONS if migration.version not in applied]
+
+def migrate(engine: Engine = default_engine, dedupe_dates: bool = False) -> List[str]:
+    """
+    Applies the pending migrations in order, each in its own transaction,
+    and returns their versions. `dedupe_dates` lets the unique `dateAdd`
+    index delete rows with a duplicate date.
+    """
+    versions = []
+    for migration in pending_migrations(engine):
+        logger.info(f"Applying migration {migration.version}: {migration.description}")
+        # MySQL commits DDL implicitly, which is why migrations check the schema first
+        with engine.begin() as conn:
+            migration.upgrade(conn, dedupe_dates=dedupe_dates)
+            conn.execute(schema_migrations.insert().values(
+                version=migration.version,
+                applied_at=datetime.now(timezone.utc).replace(tzinfo=None),
+            ))
+        versions.append(migration.version)
+    return versions
+
+def main():
+    parser = argparse.ArgumentParser(description="Applies the pending database schema migrations.")
+    parser.add_argument("--status", action="store_true", help="list the migrations and whether they are applied")
+    parser.add_argument(
+        "--dedupe-dates", action="store_true",
+        help="delete all but the last inserted row of each duplicate dateAdd, which otherwise fails the unique index migration",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.status:
+        applied = applied_versions(default_engine)
+        for migration in MIGRATIONS:
+            state = "applied" if migration.version in applied else "pending"
+            print(f"{migration.version:<28} {state:<8} {migration.description}")
+        return
+
+    try:
+        versions = migrate(dedupe_dates=args.dedupe_dates)
+    except DuplicateDatesError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    print(f"Applied {len(versions)} migration(s)" + (f": {', '.join(versions)}" if versions else ""))
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, DateTime, Float
+from sqlalchemy import Column, Integer, DateTime, Float, Index
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime, timezone
 
@@ -6,7 +6,12 @@ Base = declarative_base()
 
 class BitcoinPrice(Base):
     __tablename__ = "BitcoinPrice"
+    __table_args__ = (
+        Index("uq_BitcoinPrice_dateAdd", "dateAdd", unique=True),
+        # Covers the (dateAdd, price) series reads, in dateAdd order
+        Index("ix_BitcoinPrice_dateAdd_price", "dateAdd", "price"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     price = Column(Float, nullable=False)
-    dateAdd = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False) 
\ No newline at end of file
+    dateAdd = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
\ No newline at end of file
@@ -0,0 +1,91 @@
+from datetime import datetime
+from typing import List, Sequence, Tuple
+import hashlib
+import logging
+import numpy as np
+
+from .models import BitcoinPrice
+
+logger = logging.getLogger(__name__)
+
+class PriceSeries:
+    """
+    Columnar Bitcoin price series.
+
+    `dates` is a sorted `datetime64[s]` array and `prices` the matching
+    strictly positive `float64` array.
+    """
+
+    __slots__ = ("dates", "prices")
+
+    def __init__(self, dates: np.ndarray, prices: np.ndarray):
+        self.dates = dates
+        self.prices = prices
+
+    @classmethod
+    def empty(cls) -> "PriceSeries":
+        return cls(np.empty(0, dtype="datetime64[s]"), np.empty(0, dtype=np.float64))
+
+    @classmethod
+    def from_columns(cls, dates: Sequence[datetime], prices: Sequence[float]) -> "PriceSeries":
+        """Builds a series from raw columns, dropping non-positive prices and sorting by date."""
+        dates = np.asarray(dates, dtype="datetime64[s]")
+        prices = np.asarray(prices, dtype=np.float64)
+
+        positive = prices > 0
+        if not positive.all():
+            logger.warning(f"Dropping {int((~positive).sum())} non-positive prices")
+            dates, prices = dates[positive], prices[positive]
+
+        if len(dates) > 1 and (np.diff(dates) < np.timedelta64(0, "s")).any():
+            order = np.argsort(dates, kind="stable")
+            dates, prices = dates[order], prices[order]
+
+        return cls(dates, prices)
+
+    @classmethod
+    def from_rows(cls, rows: List[Tuple[datetime, float]]) -> "PriceSeries":
+        """Builds a series from `(dateAdd, price)` rows."""
+        if not rows:
+            return cls.empty()
+        dates, prices = zip(*rows)
+        return cls.from_columns(dates, prices)
+
+    @classmethod
+    def from_models(cls, prices: List[BitcoinPrice]) -> "PriceSeries":
+        return cls.from_columns([p.dateAdd for p in prices], [p.price for p in prices])
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    def since(self, start_date: datetime) -> "PriceSeries":
+        """Returns the points dated at or after `start_date`, sharing memory with this series."""
+        start = np.searchsorted(self.dates, np.datetime64(start_date, "s"), side="left")
+        return PriceSeries(self.dates[start:], self.prices[start:])
+
+    def until(self, end_date: datetime) -> "PriceSeries":
+        """Returns the points dated at or before `end_date`, sharing memory with this series."""
+        end = np.searchsorted(self.dates, np.datetime64(end_date, "s"), side="right")
+        return PriceSeries(self.dates[:end], self.prices[:end])
+
+    def version_token(self) -> str:
+        """
+        Identifies the contents of the series, the same in every process:
+        the Unix time of the last point, then a digest of the length, the
+        first date and the sum of the prices.
+        """
+        if not len(self):
+            return "0-0"
+        first, last = (int(d) for d in self.dates[[0, -1]].astype(np.int64))
+        digest = hashlib.sha256(repr((len(self), first, float(self.prices.sum()))).encode("utf-8")).hexdigest()[:16]
+        return f"{last}-{digest}"
+
+    def append(self, other: "PriceSeries") -> "PriceSeries":
+        """Returns a new series with `other`, which must be newer, appended."""
+        if not len(other):
+            return self
+        return PriceSeries(np.concatenate([self.dates, other.dates]), np.concatenate([self.prices, other.prices]))
+
+    def datetimes(self) -> List[datetime]:
+        """Returns the dates as naive `datetime` objects."""
+        return self.dates.astype(datetime).tolist()
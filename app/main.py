@@ -1,10 +1,19 @@
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 import logging
 
+from app.core.cache import LRUCache
+from app.core.compression import CompressionMiddleware
+from app.core.concurrency import run_in_render_pool
+from app.core.instrumentation import ServerTimingMiddleware
 from app.core.security import SecurityHeadersMiddleware
-from app.api.endpoints import main_page, meta
+from app.core.assets import CachedStaticFiles, STATIC_DIR, asset_manifest
+from app.api.endpoints import chart_data, main_page, meta
+from app.db.session import AsyncSessionLocal, async_engine
+from app.services.prerender import fragment_renderer
+from app.services.price_store import price_store
+from app.services.warmup import prime_charts, warmup
+from app.core.config import settings
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -12,8 +21,26 @@ logger = logging.getLogger(__name__)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Starting up Bitcoin Logarithmic Spiral Visualization API...")
+
+    async def load_price_store():
+        # Workers started after the first one map the series it wrote
+        if not await run_in_render_pool(price_store.load_snapshot):
+            async with AsyncSessionLocal() as db:
+                await price_store.load_async(db)
+
+    # The worker only accepts requests, and reports healthy, once warm
+    await warmup.run([
+        ("assets", lambda: run_in_render_pool(asset_manifest)),
+        ("price_store", load_price_store),
+        ("templates", lambda: run_in_render_pool(main_page.compile_templates)),
+        ("charts", prime_charts),
+    ])
+    # Client-rendered pages embed no chart, so there is nothing to pre-render
+    fragment_renderer.start(schedule=settings.CHART_RENDER_MODE != "client")
     yield
     logger.info("Shutting down Bitcoin Logarithmic Spiral Visualization API...")
+    await fragment_renderer.stop()
+    await async_engine.dispose()
 
 app = FastAPI(
     title="Bitcoin Logarithmic Spiral Visualization API",
@@ -22,11 +49,15 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_SIZE, cache=LRUCache(settings.PAGE_CACHE_SIZE))
 app.add_middleware(SecurityHeadersMiddleware)
+if settings.INSTRUMENTATION_ENABLED:
+    app.add_middleware(ServerTimingMiddleware)
 
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+app.mount("/static", CachedStaticFiles(directory=STATIC_DIR), name="static")
 
 app.include_router(main_page.router)
+app.include_router(chart_data.router)
 app.include_router(meta.router)
 
 if __name__ == "__main__":
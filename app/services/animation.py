@@ -0,0 +1,221 @@
+from typing import Dict, Hashable, List, Tuple
+import copy
+import json
+import numpy as np
+
+from app.core.cache import LRUCache
+from app.core.instrumentation import span
+from app.db.series import PriceSeries
+from app.services.chart_generator import (
+    ARRAY_DECIMALS,
+    SPIRAL_TEMPLATE,
+    figure_html,
+    find_annotations,
+    json_array,
+    radial_axis_ticks,
+    spiral_coordinates,
+)
+from app.services.downsampling import downsample_series
+from app.services.price_store import price_store
+
+# Time each monthly frame is shown for while playing
+FRAME_DURATION_MS = 100
+
+animation_cache = LRUCache(8)
+
+def month_ends(dates: np.ndarray) -> np.ndarray:
+    """Returns the index past the last point of each calendar month of `dates`."""
+    months = dates.astype("datetime64[M]")
+    return np.append(np.flatnonzero(months[1:] != months[:-1]) + 1, len(dates))
+
+def running_ath(series: PriceSeries) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns, at each point of `series`, the all-time high so far and the index of the point that set it."""
+    highs = np.maximum.accumulate(series.prices)
+    indices = np.maximum.accumulate(np.where(series.prices == highs, np.arange(len(series)), 0))
+    return highs, indices
+
+def frame_stats(series: PriceSeries) -> List[Dict]:
+    """
+    Returns the statistics at the end of each calendar month of `series`:
+    the last price, the all-time high so far and the days since it was set.
+    Computed in one pass over the series, not once per month.
+    """
+    last = month_ends(series.dates) - 1
+    highs, ath_indices = running_ath(series)
+    ath_at = ath_indices[last]
+    days_since_ath = (series.dates[last] - series.dates[ath_at]) // np.timedelta64(1, "D")
+    months = np.datetime_as_string(series.dates[last], unit="M").tolist()
+    dates = np.datetime_as_string(series.dates[last], unit="D").tolist()
+    ath_dates = np.datetime_as_string(series.dates[ath_at], unit="D").tolist()
+    prices = json_array(series.prices[last], ARRAY_DECIMALS["price"])
+    ath_prices = json_array(highs[last], ARRAY_DECIMALS["price"])
+    return [
+        {
+            "month": months[k],
+            "date": dates[k],
+            "price": prices[k],
+            "ath_price": ath_prices[k],
+            "ath_date": ath_dates[k],
+            "days_since_ath": int(days_since_ath[k]),
+        }
+        for k in range(len(last))
+    ]
+
+def _frame_title(stats: Dict) -> str:
+    return (
+        f"<b>{stats['month']}</b>  ·  ${stats['price']:,.2f}  ·  ATH ${stats['ath_price']:,.2f} on {stats['ath_date']}"
+        f"  ·  {stats['days_since_ath']} days since ATH"
+    )
+
+def create_spiral_animation(series: PriceSeries, plotted: PriceSeries) -> Dict:
+    """
+    Builds a Plotly figure of the spiral growing one calendar month per
+    frame: its `data`, `layout`, `frames` and `config`, and the `stats` of
+    each frame, as computed by `frame_stats` on `series`.
+
+    `plotted` is `series` or a downsampled copy of it. Its coordinates are
+    computed once and split into one trace per month, so frames carry no
+    points: frame k shows the traces of months up to k and the markers
+    reached by then, and moves the all-time high marker. The output grows
+    with the points plus the square of the months, not with points times
+    frames.
+    """
+    stats = frame_stats(series)
+    r, theta = spiral_coordinates(plotted, series.dates[0])
+    r_values = json_array(r, ARRAY_DECIMALS["r"])
+    theta_values = json_array(theta, ARRAY_DECIMALS["theta"])
+    day_labels = np.datetime_as_string(plotted.dates, unit="D").tolist()
+    hover_prices = json_array(plotted.prices, ARRAY_DECIMALS["price"])
+
+    # Plotted points of each month; every segment but the last also takes
+    # the first point of the next month, so that the line is continuous
+    ends = np.searchsorted(plotted.dates, series.dates[month_ends(series.dates) - 1], side="right")
+    starts = np.concatenate(([0], ends[:-1]))
+    traces = SPIRAL_TEMPLATE["traces"]
+    data = []
+    for k, (start, end) in enumerate(zip(starts.tolist(), ends.tolist())):
+        stop = min(end + 1, len(plotted))
+        data.append({
+            **traces["price"],
+            "r": r_values[start:stop],
+            "theta": theta_values[start:stop],
+            "hovertext": day_labels[start:stop],
+            "customdata": hover_prices[start:stop],
+            "legendgroup": "price",
+            "showlegend": k == 0,
+            "visible": k == 0,
+        })
+
+    # Frame from which each marker is shown
+    reached = []
+    halving_indices, event_indices = find_annotations(plotted.dates)
+    markers = [
+        (traces["halving"], h["index"], f"Halving #{h['number']} - {h['date'].strftime('%Y-%m-%d')}", f"🌕 HALVING #{h['number']}")
+        for h in halving_indices
+    ] + [
+        (traces["event"], e["index"], f"{e['name']} - {day_labels[e['index']]}", e["name"].upper())
+        for e in event_indices
+    ]
+    for style, i, name, title in markers:
+        frame = int(np.searchsorted(ends, i, side="right"))
+        reached.append(frame)
+        data.append({
+            **style,
+            "r": [r_values[i]],
+            "theta": [theta_values[i]],
+            "name": name,
+            "meta": title,
+            "hovertext": [day_labels[i]],
+            "customdata": [hover_prices[i]],
+            "visible": frame == 0,
+        })
+
+    ath_r, ath_theta = spiral_coordinates(
+        PriceSeries(np.array([s["ath_date"] for s in stats], dtype="datetime64[s]"), np.array([s["ath_price"] for s in stats])),
+        series.dates[0],
+    )
+    ath_r_values = json_array(ath_r, ARRAY_DECIMALS["r"])
+    ath_theta_values = json_array(ath_theta, ARRAY_DECIMALS["theta"])
+
+    def ath_point(k: int) -> Dict:
+        return {
+            "r": [ath_r_values[k]],
+            "theta": [ath_theta_values[k]],
+            "hovertext": [stats[k]["ath_date"]],
+            "customdata": [stats[k]["ath_price"]],
+        }
+
+    data.append({**traces["ath"], **ath_point(0), "name": "ATH", "meta": "ALL-TIME HIGH"})
+
+    segment_count = len(starts)
+    frames = []
+    for k, month_stats in enumerate(stats):
+        visible = [{"visible": i <= k} for i in range(segment_count)] + [{"visible": frame <= k} for frame in reached]
+        frames.append({
+            "name": month_stats["month"],
+            "traces": list(range(len(data))),
+            "data": visible + [ath_point(k)],
+            "layout": {"title": {"text": _frame_title(month_stats)}},
+        })
+
+    layout = copy.deepcopy(SPIRAL_TEMPLATE["layout"])
+    radial_ticks = radial_axis_ticks(float(series.prices.max()))
+    layout["polar"]["radialaxis"].update(tickvals=radial_ticks["values"], ticktext=radial_ticks["labels"])
+    layout["title"] = {"text": _frame_title(stats[0]), "x": 0.5, "font": {"size": 16}}
+    layout["margin"]["t"] = 60
+    layout["margin"]["b"] = 100
+    play = {"frame": {"duration": FRAME_DURATION_MS, "redraw": True}, "transition": {"duration": 0}, "fromcurrent": True}
+    seek = {"mode": "immediate", "frame": {"duration": 0, "redraw": True}, "transition": {"duration": 0}}
+    layout["updatemenus"] = [{
+        "type": "buttons",
+        "showactive": False,
+        "direction": "left",
+        "x": 0.02,
+        "y": 0,
+        "xanchor": "left",
+        "yanchor": "top",
+        "font": {"color": "#111111"},
+        "buttons": [
+            {"label": "▶ Play", "method": "animate", "args": [None, play]},
+            {"label": "❚❚ Pause", "method": "animate", "args": [[None], {**seek, "frame": {"duration": 0, "redraw": False}}]},
+        ],
+    }]
+    layout["sliders"] = [{
+        "x": 0.2,
+        "y": 0,
+        "len": 0.78,
+        "yanchor": "top",
+        # Month labels under every step would overlap, the current one is shown above
+        "font": {"color": "rgba(0,0,0,0)"},
+        "currentvalue": {"prefix": "", "font": {"color": "#ffffff", "size": 14}},
+        "steps": [
+            {"label": month_stats["month"], "method": "animate", "args": [[month_stats["month"]], seek]}
+            for month_stats in stats
+        ],
+    }]
+    return {"data": data, "layout": layout, "frames": frames, "config": SPIRAL_TEMPLATE["config"], "stats": stats}
+
+def _build_animation(series: PriceSeries, max_points: int, output_format: str):
+    stats = price_store.get_statistics(series)
+    with span("downsample"):
+        plotted = downsample_series(series, max_points, stats, price_store.pyramid)
+    with span("animation"):
+        figure = create_spiral_animation(series, plotted)
+    with span("encode"):
+        if output_format == "html":
+            return figure_html(figure["data"], figure["layout"], figure["frames"])
+        return json.dumps(figure, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+def get_animation(series: PriceSeries, max_points: int, output_format: str):
+    """
+    Returns the animation of a window of the price store, of at least two
+    points, downsampled to `max_points`: the figure as JSON bytes, or
+    with `output_format` "html" as an HTML fragment like the chart's. Kept in
+    `animation_cache` until the data changes.
+    """
+    key: Hashable = (price_store.version, series.dates[0].item(), len(series), max_points, output_format)
+    animation = animation_cache.get(key)
+    if animation is None:
+        animation = _build_animation(series, max_points, output_format)
+        animation_cache.set(key, animation)
+    return animation
@@ -1,303 +1,344 @@
-import plotly.graph_objects as go
 import numpy as np
-from typing import List
+from typing import Dict, List, Optional, Tuple, Union
 from app.db.models import BitcoinPrice
+from app.db.series import PriceSeries
 from app.services.statistics import calculate_statistics
+import copy
 import logging
 import html
+import json
+import struct
 from datetime import datetime
+from app.core.assets import STATIC_DIR
+from app.core.instrumentation import span
 
-def create_logarithmic_spiral_chart(prices: List[BitcoinPrice]) -> str:
+HALVING_DATES = [
+    datetime(2012, 11, 28),  # 1st halving
+    datetime(2016, 7, 9),    # 2nd halving
+    datetime(2020, 5, 11),   # 3rd halving
+    datetime(2024, 4, 20)    # 4th halving
+]
+
+EVENTS_DATES = [
+    {"date": datetime(2010, 5, 22), "name": "Bitcoin Pizza Day"},
+    {"date": datetime(2010, 12, 12), "name": "Satoshi Nakamoto Disappearance"},
+    {"date": datetime(2014, 2, 28), "name": "Mt. Gox crash"},
+    {"date": datetime(2017, 8, 1), "name": "Bitcoin Cash hard fork"},
+    {"date": datetime(2022, 5, 9), "name": "The Fall of Terra"},
+    {"date": datetime(2022, 11, 10), "name": "FTX collapse"},
+    {"date": datetime(2024, 1, 10), "name": "ETF Bitcoin approval"},
+]
+
+# Trace styles, layout and config shared with the client-side renderer in main.js
+with open(STATIC_DIR / "js" / "spiral-layout.json", encoding="utf-8") as f:
+    SPIRAL_TEMPLATE = json.load(f)
+
+# One full turn of the spiral per four years
+DEGREES_PER_DAY = 360 / 1461
+
+CHART_DIV_ID = "spiral-chart"
+
+# Columns of the spiral data payload, and their JSON precision when not 5 decimals
+SPIRAL_ARRAYS = ("r", "theta", "day", "price")
+ARRAY_DECIMALS = {"r": 5, "theta": 4, "price": 2}
+
+_ANNOTATION_TARGETS = np.array(
+    HALVING_DATES + [event["date"] for event in EVENTS_DATES], dtype="datetime64[s]"
+)
+
+def spiral_coordinates(series: PriceSeries, origin: Optional[np.datetime64] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the polar coordinates of a price series: log10 price as the
+    radius and whole days since the first point, or since `origin`, as the
+    angle.
+    """
+    r = np.log10(series.prices)
+    theta = spiral_angles(series.dates, series.dates[0] if origin is None else origin)
+    return r, theta
+
+def spiral_angles(dates: np.ndarray, origin: np.datetime64) -> np.ndarray:
+    """Returns the angle of each date on the spiral: whole days since `origin`, in degrees."""
+    return (dates - origin) // np.timedelta64(1, "D") * DEGREES_PER_DAY
+
+def find_nearest_indices(dates: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    """
+    For each target, returns the index of the first point of `dates` on the
+    same day or at most one whole day away from it, or -1 if there is none.
+
+    Points on the target day are preferred. `dates` must be sorted.
+    """
+    n = len(dates)
+    if not n:
+        return np.full(len(targets), -1)
+    day = np.timedelta64(1, "D")
+    same_day = np.searchsorted(dates, targets, side="left")
+    one_day = np.searchsorted(dates, targets - day, side="left")
+    same_day_found = (same_day < n) & (dates[np.minimum(same_day, n - 1)] < targets + day)
+    one_day_found = (one_day < n) & (dates[np.minimum(one_day, n - 1)] < targets + 2 * day)
+    return np.where(same_day_found, same_day, np.where(one_day_found, one_day, -1))
+
+def find_annotations(dates: np.ndarray) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Locates the halvings and notable events in a sorted date array.
+    """
+    indices = find_nearest_indices(dates, _ANNOTATION_TARGETS).tolist()
+    halving_indices = [
+        {"index": index, "date": halving_date, "number": i + 1}
+        for i, (index, halving_date) in enumerate(zip(indices, HALVING_DATES))
+        if index >= 0
+    ]
+    event_indices = [
+        {"index": index, "name": event["name"], "date": event["date"]}
+        for index, event in zip(indices[len(HALVING_DATES):], EVENTS_DATES)
+        if index >= 0
+    ]
+    return halving_indices, event_indices
+
+def find_point(series: PriceSeries, date: Optional[datetime]) -> Optional[int]:
+    """
+    Returns the index of the point dated exactly `date`, if the series has one.
+    """
+    if date is None:
+        return None
+    target = np.datetime64(date, "s")
+    index = int(np.searchsorted(series.dates, target))
+    return index if index < len(series) and series.dates[index] == target else None
+
+def create_logarithmic_spiral_chart(
+    prices: Union[PriceSeries, List[BitcoinPrice]],
+    stats: Optional[Dict] = None,
+    overlays: Optional[Dict[str, np.ndarray]] = None,
+) -> str:
+    """
+    Renders the spiral chart as an HTML fragment.
+
+    `stats` are the statistics already computed for the series, if any. The
+    series may be a downsampled copy of the one the statistics describe.
+    `overlays` maps indicator names to values aligned with the series.
+    """
     try:
-        if not prices:
+        if not len(prices):
             return "<h2>No data available</h2>"
         
-        price_values = [price.price for price in prices]
-        dates = [price.dateAdd for price in prices]
-        n = len(price_values)
+        series = prices if isinstance(prices, PriceSeries) else PriceSeries.from_models(prices)
+        n = len(series)
         if n < 2:
             return "<h2>Insufficient data for chart</h2>"
-        
-        halving_dates = [
-            datetime(2012, 11, 28),  # 1st halving
-            datetime(2016, 7, 9),    # 2nd halving
-            datetime(2020, 5, 11),   # 3rd halving
-            datetime(2024, 4, 20)    # 4th halving
-        ]
-
-        events_dates = [
-            {"date": datetime(2010, 5, 22), "name": "Bitcoin Pizza Day"},
-            {"date": datetime(2010, 12, 12), "name": "Satoshi Nakamoto Disappearance"},
-            {"date": datetime(2014, 2, 28), "name": "Mt. Gox crash"},
-            {"date": datetime(2017, 8, 1), "name": "Bitcoin Cash hard fork"},
-            {"date": datetime(2022, 5, 9), "name": "The Fall of Terra"},
-            {"date": datetime(2022, 11, 10), "name": "FTX collapse"},
-            {"date": datetime(2024, 1, 10), "name": "ETF Bitcoin approval"},
-        ]
-        
-        epsilon = 1e-2 # Use a small constant for prices that are zero or less
-        price_for_log = np.array([p if p > 0 else epsilon for p in price_values])
-        r = np.log10(price_for_log)
-        
-        start_date = min(dates)
-        end_date = max(dates)
-        days_since_start = np.array([(d - start_date).days for d in dates])
-        
-        theta = days_since_start * (360 / 1461)
-
-        halving_indices = []
-        for i, halving_date in enumerate(halving_dates):
-            date_differences = [abs((d - halving_date).days) for d in dates]
-            min_diff_index = date_differences.index(min(date_differences))
-            if min(date_differences) <= 1:
-                halving_indices.append({
-                    "index": min_diff_index,
-                    "date": halving_date,
-                    "number": i + 1
-                })
-
-        event_indices = []
-        for event in events_dates:
-            date_differences = [abs((d - event["date"]).days) for d in dates]
-            min_diff_index = date_differences.index(min(date_differences))
-            if min(date_differences) <= 1:
-                event_indices.append({
-                    "index": min_diff_index,
-                    "name": event["name"],
-                    "date": event["date"]
-                })
+
+        # Hover labels are formatted in the browser: dates are sent as whole
+        # days since the epoch, and prices as numbers for the hovertemplates
+        day_labels = np.floor(epoch_days(series.dates)).astype(np.int64).tolist()
+        hover_prices = json_array(series.prices, ARRAY_DECIMALS["price"])
+        r, theta = spiral_coordinates(series)
+        halving_indices, event_indices = find_annotations(series.dates)
 
         # Get ATH from statistics service
-        stats = calculate_statistics(prices)
+        if stats is None:
+            stats = calculate_statistics(series)
         ath_price = stats.get("ath_price")
         ath_date = stats.get("ath_date")
-        
-        ath_index = None
-        if ath_price and ath_date:
-            for i, (d, p) in enumerate(zip(dates, price_values)):
-                if d == ath_date and p == ath_price:
-                    ath_index = i
-                    break
-
-        usd_ticks = [1, 10, 100, 1_000, 10_000, 100_000, 1_000_000]
-        r_ticks = [np.log10(v) for v in usd_ticks if v <= price_for_log.max() * 1.5]
-        r_tick_labels = [f"{v:,}" for i, v in enumerate(usd_ticks) if i < len(r_ticks)]
-
-        year_tick_labels = ['2025', '2022', '2023', '2024']
-        year_angles = [0, 90, 180, 270]
-
-        hover_texts = []
-        for d, p in zip(dates, price_values):
-            hover_texts.append(
-                f"<b>Date:</b> {d.strftime('%Y-%m-%d')}<br>"
-                f"<b>Price:</b> ${p:,.2f}<br>"
-            )
-
-        fig = go.Figure()
-        fig.add_trace(go.Scatterpolar(
-            r=r,
-            theta=theta,
-            mode='lines+markers',
-            name='Bitcoin Price',
-            line=dict(color='#F7931A', width=2),
-            marker=dict(size=3, color='#F7931A', line=dict(color='#F7931A', width=1)),
-            hoverinfo='text',
-            text=hover_texts,
-            hovertemplate='%{text}<extra></extra>'
-        ))
+        ath_index = find_point(series, ath_date)
+
+        radial_ticks = radial_axis_ticks(float(series.prices.max()))
+
+        traces = SPIRAL_TEMPLATE["traces"]
+        r_values = json_array(r, ARRAY_DECIMALS["r"])
+        theta_values = json_array(theta, ARRAY_DECIMALS["theta"])
+
+        def marker_trace(style: Dict, i: int, name: str, title: str) -> Dict:
+            return {
+                **style,
+                "r": [r_values[i]],
+                "theta": [theta_values[i]],
+                "name": name,
+                "meta": title,
+                "hovertext": [day_labels[i]],
+                "customdata": [hover_prices[i]],
+            }
+
+        # Plain dicts: the template styles need no validation by plotly.py
+        data = [{**traces["price"], "r": r_values, "theta": theta_values, "hovertext": day_labels, "customdata": hover_prices}]
+
+        for name, values in (overlays or {}).items():
+            data.append({**traces["overlays"][name], "r": json_array(np.log10(values), ARRAY_DECIMALS["r"]), "theta": theta_values})
         
         for halving in halving_indices:
-            i = halving["index"]
-            d, p = dates[i], price_values[i]
-            
-            halving_hover_text = (
-                f"<b>🌕 HALVING #{halving['number']}</b><br>"
-                f"<b>Date:</b> {d.strftime('%Y-%m-%d')}<br>"
-                f"<b>Price:</b> ${p:,.2f}<br>"
-            )
-            
-            fig.add_trace(go.Scatterpolar(
-                r=[r[i]],
-                theta=[theta[i]],
-                mode='markers',
-                name=f"Halving #{halving['number']} - {halving['date'].strftime('%Y-%m-%d')}",
-                marker=dict(
-                    size=14, 
-                    color='white', 
-                    line=dict(color='#F7931A', width=2),
-                    symbol='diamond'
-                ),
-                hoverinfo='text',
-                text=[halving_hover_text],
-                hovertemplate='%{text}<extra></extra>'
+            data.append(marker_trace(
+                traces["halving"],
+                halving["index"],
+                f"Halving #{halving['number']} - {halving['date'].strftime('%Y-%m-%d')}",
+                f"🌕 HALVING #{halving['number']}",
             ))
 
         for event in event_indices:
             i = event["index"]
-            d, p = dates[i], price_values[i]
-            
-            event_hover_text = (
-                f"<b>{event['name'].upper()}</b><br>"
-                f"<b>Date:</b> {d.strftime('%Y-%m-%d')}<br>"
-                f"<b>Price:</b> ${p:,.2f}<br>"
-            )
-            
-            fig.add_trace(go.Scatterpolar(
-                r=[r[i]],
-                theta=[theta[i]],
-                mode='markers',
-                name=f"{event['name']} - {d.strftime('%Y-%m-%d')}",
-                marker=dict(
-                    size=14,
-                    color='#00FFFF',
-                    line=dict(color='#ffffff', width=1),
-                    symbol='square'
-                ),
-                hoverinfo='text',
-                text=[event_hover_text],
-                hovertemplate='%{text}<extra></extra>'
-            ))
+            day = np.datetime_as_string(series.dates[i], unit="D")
+            data.append(marker_trace(traces["event"], i, f"{event['name']} - {day}", event["name"].upper()))
 
         if ath_index is not None and ath_price and ath_date:
-            ath_hover_text = (
-                f"<b>ALL-TIME HIGH</b><br>"
-                f"<b>Date:</b> {ath_date.strftime('%Y-%m-%d')}<br>"
-                f"<b>Price:</b> ${ath_price:,.2f}<br>"
-            )
-            
-            fig.add_trace(go.Scatterpolar(
-                r=[r[ath_index]],
-                theta=[theta[ath_index]],
-                mode='markers',
-                name=f"ATH - {ath_date.strftime('%Y-%m-%d')}",
-                marker=dict(
-                    size=24,
-                    color='#FFFF00',
-                    line=dict(color='#000000', width=2),
-                    symbol='triangle-up'
-                ),
-                hoverinfo='text',
-                text=[ath_hover_text],
-                hovertemplate='%{text}<extra></extra>'
+            data.append(marker_trace(
+                traces["ath"], ath_index, f"ATH - {ath_date.strftime('%Y-%m-%d')}", "ALL-TIME HIGH",
             ))
         
-        fig.update_layout(
-            polar=dict(
-                radialaxis=dict(
-                    showgrid=True,
-                    gridcolor='#2a2a2a',
-                    tickfont={'size': 12, 'color': '#ffffff', 'family': 'Inter, sans-serif'},
-                    tickvals=r_ticks,
-                    ticktext=r_tick_labels,
-                    ticksuffix=' USD',
-                    range=[0, np.log10(max(usd_ticks))],
-                    linecolor='#2a2a2a',
-                    showline=True,
-                    linewidth=1,
-                ),
-                angularaxis=dict(
-                    showgrid=True,
-                    gridcolor='#2a2a2a',
-                    tickfont={'size': 12, 'color': '#ffffff', 'family': 'Inter, sans-serif'},
-                    tickvals=year_angles,
-                    ticktext=year_tick_labels,
-                    rotation=90,
-                    direction='clockwise',
-                    linecolor='#2a2a2a',
-                    showline=True,
-                    linewidth=1,
-                ),
-                bgcolor='#111111'
-            ),
-            showlegend=True,
-            legend=dict(
-                x=0.02,
-                y=0.98,
-                bgcolor='rgba(26, 26, 26, 0.9)',
-                bordercolor='#2a2a2a',
-                borderwidth=1,
-                font=dict(
-                    family='Inter, sans-serif',
-                    color='#ffffff',
-                    size=16
-                ),
-                itemsizing='constant',
-                itemwidth=30
-            ),
-            height=None,
-            width=None,
-            paper_bgcolor='rgba(0,0,0,0)',
-            plot_bgcolor='rgba(0,0,0,0)',
-            autosize=True,
-            margin=dict(l=10, r=10, t=40, b=40),
-            font=dict(family='Inter, sans-serif', color='#ffffff', size=10),
-            hoverlabel=dict(
-                bgcolor='#1a1a1a',
-                bordercolor='#2a2a2a',
-                font=dict(family='Inter, sans-serif', color='#ffffff', size=12)
-            )
-        )
-        
-        html_output = fig.to_html(
-            include_plotlyjs=True,
-            full_html=False,
-            config={
-                'displayModeBar': False, 
-                'displaylogo': False,
-                'modeBarButtonsToRemove': ['pan2d', 'lasso2d', 'select2d'],
-                'toImageButtonOptions': {
-                    'format': 'png',
-                    'filename': 'bitcoin-spiral-chart',
-                    'height': 800,
-                    'width': 1200,
-                    'scale': 2
-                }
-            },
-            default_height='90vh',
-            default_width='100vw'
-        )
-        
-        mobile_css = """
-        <style>
-        @media (max-width: 768px) {
-            .legend {
-                display: none !important;
-            }
-            .plotly .legend {
-                display: none !important;
-            }
-            .js-plotly-plot .plotly .legend {
-                display: none !important;
-            }
-        }
-        </style>
-        <script>
-        // Additional JavaScript to hide legend on mobile
-        document.addEventListener('DOMContentLoaded', function() {
-            function hideLegendOnMobile() {
-                if (window.innerWidth <= 768) {
-                    const plotlyDiv = document.querySelector('.js-plotly-plot');
-                    if (plotlyDiv) {
-                        Plotly.relayout(plotlyDiv, {'showlegend': false});
-                    }
-                } else {
-                    const plotlyDiv = document.querySelector('.js-plotly-plot');
-                    if (plotlyDiv) {
-                        Plotly.relayout(plotlyDiv, {'showlegend': true});
-                    }
-                }
-            }
-            
-            // Initial check
-            hideLegendOnMobile();
-            
-            // Check on window resize
-            window.addEventListener('resize', hideLegendOnMobile);
-        });
-        </script>
-        """
+        layout = copy.deepcopy(SPIRAL_TEMPLATE["layout"])
+        layout["polar"]["radialaxis"].update(tickvals=radial_ticks["values"], ticktext=radial_ticks["labels"])
         
-        return mobile_css + html_output
+        with span("chart_html"):
+            return figure_html(data, layout)
     except Exception as e:
         logging.error(f"Error creating chart: {e}")
-        return f"<h2>Error generating chart: {html.escape(str(e))}</h2>" 
\ No newline at end of file
+        return f"<h2>Error generating chart: {html.escape(str(e))}</h2>"
+
+# Replaces hovertext given as days since the epoch by YYYY-MM-DD dates, like
+# formatDay in main.js: the hovertemplate date format only parses date strings
+_HOVER_DAYS_SCRIPT = (
+    'function(data){data.forEach(function(t){if(t.hovertext&&typeof t.hovertext[0]==="number"){'
+    't.hovertext=t.hovertext.map(function(d){return new Date(d*864e5).toISOString().slice(0,10);});}});return data;}'
+)
+
+def figure_html(data: List[Dict], layout: Dict, frames: Optional[List[Dict]] = None) -> str:
+    """
+    Returns the HTML fragment that plotly.py's `to_html` would for a figure
+    with the spiral config and size, and animation `frames` if any, without
+    loading plotly.py: the traces are plain JSON, so there is nothing to
+    validate or encode. Trace `hovertext` may be whole days since the epoch,
+    shown as dates.
+    """
+    size = SPIRAL_TEMPLATE["size"]
+    arguments = ", ".join(
+        [f"({_HOVER_DAYS_SCRIPT})({_script_json(data)})"] + [_script_json(value) for value in (layout, SPIRAL_TEMPLATE["config"])]
+    )
+    add_frames = f'.then(function(){{Plotly.addFrames("{CHART_DIV_ID}", {_script_json(frames)});}})' if frames else ""
+    return (
+        f'<div style="height:{size["height"]}; width:{size["width"]};">'
+        f'<div id="{CHART_DIV_ID}" class="plotly-graph-div" style="height:100%; width:100%;"></div>'
+        f'<script>window.PLOTLYENV=window.PLOTLYENV || {{}};'
+        f'if (document.getElementById("{CHART_DIV_ID}")) {{Plotly.newPlot("{CHART_DIV_ID}", {arguments}){add_frames}}};</script>'
+        f'</div>'
+    )
+
+def _script_json(value) -> str:
+    # Escaped like plotly.py does, so that no string closes the script element
+    return (
+        json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+        .replace("<", "\\u003c").replace(">", "\\u003e").replace("/", "\\u002f")
+        .replace("\u2028", "\\u2028").replace("\u2029", "\\u2029")
+    )
+
+def radial_axis_ticks(max_price: float) -> Dict[str, List]:
+    """
+    Returns the radial axis ticks, one per power of ten of USD up to the
+    highest price plotted.
+    """
+    usd_ticks = SPIRAL_TEMPLATE["radial_ticks_usd"]
+    values = [float(np.log10(v)) for v in usd_ticks if v <= max_price * 1.5]
+    labels = [f"{v:,}" for v in usd_ticks[:len(values)]]
+    return {"values": values, "labels": labels}
+
+def create_spiral_data(series: PriceSeries, stats: Dict, overlays: Optional[Dict[str, np.ndarray]] = None) -> Dict:
+    """
+    Builds the data payload rendered client-side with the spiral template:
+    point coordinates, hover fields, annotation indices, statistics and
+    the log10 values of any overlay indicators.
+
+    The series may be a downsampled copy of the one `stats` describe.
+    """
+    r, theta = spiral_coordinates(series)
+    halving_indices, event_indices = find_annotations(series.dates)
+    ath_index = find_point(series, stats.get("ath_date"))
+    overlays = overlays or {}
+    data = {
+        "count": len(series),
+        "arrays": list(SPIRAL_ARRAYS) + [f"overlay_{name}" for name in overlays],
+        "overlays": list(overlays),
+        "r": r,
+        "theta": theta,
+        "day": epoch_days(series.dates),
+        "price": series.prices,
+        "halvings": [
+            {"index": h["index"], "number": h["number"], "date": h["date"].strftime('%Y-%m-%d')}
+            for h in halving_indices
+        ],
+        "events": [
+            {"index": e["index"], "name": e["name"], "date": e["date"].strftime('%Y-%m-%d')}
+            for e in event_indices
+        ],
+        "ath_index": ath_index,
+        "radial_ticks": radial_axis_ticks(float(series.prices.max())),
+        "stats": _json_stats(stats),
+    }
+    for name, values in overlays.items():
+        data[f"overlay_{name}"] = np.log10(values)
+    return data
+
+def create_spiral_delta(series: PriceSeries, start: int, stats: Dict, overlays: Optional[Dict[str, np.ndarray]] = None) -> Dict:
+    """
+    Builds the points of `series` from index `start` on, to be appended to
+    a chart of its earlier points, in the layout of `create_spiral_data`.
+
+    Angles are measured from the first date of `series`, like those of the
+    chart. `ath` holds the all-time high point when it is a new one, and
+    `stats` and `radial_ticks` replace those of the chart. `overlays` maps
+    indicator names to values aligned with the new points.
+    """
+    new = PriceSeries(series.dates[start:], series.prices[start:])
+    r, theta = spiral_coordinates(new, series.dates[0])
+    day = epoch_days(new.dates)
+    ath_index = find_point(new, stats.get("ath_date"))
+    overlays = overlays or {}
+    data = {
+        "full": False,
+        "count": len(new),
+        "arrays": list(SPIRAL_ARRAYS) + [f"overlay_{name}" for name in overlays],
+        "overlays": list(overlays),
+        "r": r,
+        "theta": theta,
+        "day": day,
+        "price": new.prices,
+        "ath": None if ath_index is None else {
+            "r": float(r[ath_index]),
+            "theta": float(theta[ath_index]),
+            "day": float(day[ath_index]),
+            "price": float(new.prices[ath_index]),
+        },
+        "radial_ticks": radial_axis_ticks(float(series.prices.max())),
+        "stats": _json_stats(stats),
+    }
+    for name, values in overlays.items():
+        data[f"overlay_{name}"] = np.log10(values)
+    return data
+
+def epoch_days(dates: np.ndarray) -> np.ndarray:
+    """Days since the Unix epoch, fractional for intraday points."""
+    return (dates - np.datetime64(0, "s")) / np.timedelta64(1, "D")
+
+def _json_stats(stats: Dict) -> Dict:
+    return {key: value.isoformat() if isinstance(value, datetime) else value for key, value in stats.items()}
+
+def json_array(values: np.ndarray, decimals: int) -> List:
+    """Rounds an array into a list for JSON, which has no NaN: undefined values become null."""
+    values = np.round(values, decimals)
+    return np.where(np.isnan(values), None, values).tolist() if np.isnan(values).any() else values.tolist()
+
+def encode_spiral_json(data: Dict) -> bytes:
+    """
+    Serializes a spiral payload to compact JSON, rounding the arrays to the
+    precision the chart needs.
+    """
+    payload = dict(data)
+    for key in data["arrays"]:
+        payload[key] = json_array(data[key], ARRAY_DECIMALS.get(key, 5))
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+def encode_spiral_binary(data: Dict) -> bytes:
+    """
+    Serializes a spiral payload as a little-endian binary blob: a uint32
+    header length, the UTF-8 JSON header padded to a multiple of 4 bytes,
+    then the arrays named in the header's `arrays` as consecutive float32
+    columns.
+    """
+    header = {key: value for key, value in data.items() if key not in data["arrays"]}
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    header_bytes += b" " * (-len(header_bytes) % 4)
+    columns = np.stack([np.asarray(data[key], dtype="<f4") for key in data["arrays"]])
+    return struct.pack("<I", len(header_bytes)) + header_bytes + columns.tobytes()
@@ -0,0 +1,149 @@
+from typing import Dict, Optional
+import numpy as np
+
+from app.core.config import settings
+from app.db.series import PriceSeries
+from app.services.chart_generator import find_annotations, find_point, spiral_angles, spiral_coordinates
+from app.services.pyramid import SeriesPyramid
+
+# Points kept per bucket: first, last, lowest and highest
+POINTS_PER_BUCKET = 4
+MIN_POINTS = 500
+
+def point_budget(points: Optional[int] = None, width: Optional[int] = None) -> int:
+    """
+    Returns the number of points to plot, from an explicit `points` count or
+    a viewport `width` in CSS pixels, capped at `settings.CHART_MAX_POINTS`.
+    """
+    if points:
+        budget = points
+    elif width:
+        budget = width * 2
+    else:
+        budget = settings.CHART_MAX_POINTS
+    return max(MIN_POINTS, min(budget, settings.CHART_MAX_POINTS))
+
+def bucket_indices(x: np.ndarray, start: float, span: float, bucket_count: int) -> np.ndarray:
+    """Returns the bucket of each of `x`, out of `bucket_count` equal-width buckets over `span` from `start`."""
+    if span > 0:
+        return np.minimum(((x - start) * (bucket_count / span)).astype(np.int64), bucket_count - 1)
+    return np.zeros(len(x), dtype=np.int64)
+
+def minmax_bucket_indices(x: np.ndarray, y: np.ndarray, max_points: int, keep: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Reduces a polyline sorted by `x` to at most about `max_points` points.
+
+    `x` is split into equal-width buckets and each bucket keeps its first,
+    last, lowest and highest points, so the visual envelope of the line is
+    preserved. Indices in `keep` are always kept. Returns sorted indices.
+    """
+    n = len(x)
+    if n <= max_points:
+        return np.arange(n)
+
+    bucket_count = max(1, max_points // POINTS_PER_BUCKET)
+    buckets = bucket_indices(x, x[0], x[-1] - x[0], bucket_count)
+
+    # Buckets are non-decreasing along x, so each one is a contiguous run
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], n] - 1
+    run_lengths = ends - starts + 1
+
+    lowest = np.minimum.reduceat(y, starts)
+    highest = np.maximum.reduceat(y, starts)
+    run_of_point = np.repeat(np.arange(len(starts)), run_lengths)
+    lowest_points = np.flatnonzero(y == lowest[run_of_point])
+    highest_points = np.flatnonzero(y == highest[run_of_point])
+    # First occurrence of the extreme in each run
+    lowest_points = lowest_points[np.unique(run_of_point[lowest_points], return_index=True)[1]]
+    highest_points = highest_points[np.unique(run_of_point[highest_points], return_index=True)[1]]
+
+    kept = [starts, ends, lowest_points, highest_points]
+    if keep is not None and len(keep):
+        kept.append(np.asarray(keep, dtype=np.int64))
+    return np.unique(np.concatenate(kept))
+
+def _keep_indices(series: PriceSeries, stats: Optional[Dict]) -> np.ndarray:
+    """Returns the indices of the first, last, halving, event and ATH points."""
+    halving_indices, event_indices = find_annotations(series.dates)
+    ath_index = find_point(series, stats.get("ath_date")) if stats else None
+    if ath_index is None:
+        ath_index = int(np.argmax(series.prices))
+    keep = [0, len(series) - 1, ath_index] + [a["index"] for a in halving_indices + event_indices]
+    return np.array(keep, dtype=np.int64)
+
+def pyramid_candidates(series: PriceSeries, max_points: int, pyramid: SeriesPyramid) -> Optional[np.ndarray]:
+    """
+    Returns a mask of the points of `series` that the min/max reducer
+    can keep, found from the aggregate level with the fewest of them: the
+    first, last, high and low points of the level's buckets that fall in a
+    single reducer bucket, and every point of the others, which straddle
+    reducer buckets or the window edges.
+
+    Reducing these instead of `series` keeps the same points, the first,
+    last, lowest and highest of each reducer bucket. Returns None when the
+    levels do not cover `series` or would not save reading most of it.
+    """
+    levels = pyramid.window_buckets(series)
+    if levels is None:
+        return None
+    n = len(series)
+    origin = series.dates[0]
+    span = float(spiral_angles(series.dates[-1:], origin)[0])
+    bucket_count = max(1, max_points // POINTS_PER_BUCKET)
+
+    best = None
+    for buckets in levels.values():
+        if not len(buckets):
+            continue
+        first = bucket_indices(spiral_angles(buckets["open_date"], origin), 0.0, span, bucket_count)
+        last = bucket_indices(spiral_angles(buckets["date"], origin), 0.0, span, bucket_count)
+        whole = buckets[first == last]
+        starts = np.searchsorted(series.dates, whole["open_date"], side="left")
+        ends = np.searchsorted(series.dates, whole["date"], side="right")
+        count = 4 * len(whole) + n - int((ends - starts).sum())
+        if best is None or count < best[0]:
+            best = (count, whole, starts, ends)
+
+    if best is None or best[0] > n // 2:
+        return None
+    _, whole, starts, ends = best
+    # Every point outside the whole buckets, then their first, last, high and low points
+    inside = np.zeros(n + 1, dtype=np.int64)
+    np.add.at(inside, starts, 1)
+    np.add.at(inside, ends, -1)
+    candidates = np.cumsum(inside[:-1]) == 0
+    candidates[starts] = True
+    candidates[ends - 1] = True
+    candidates[np.searchsorted(series.dates, whole["high_date"], side="left")] = True
+    candidates[np.searchsorted(series.dates, whole["low_date"], side="left")] = True
+    return candidates
+
+def downsample_series(
+    series: PriceSeries,
+    max_points: int,
+    stats: Optional[Dict] = None,
+    pyramid: Optional[SeriesPyramid] = None,
+) -> PriceSeries:
+    """
+    Reduces a price series for plotting in (theta, log r) space, keeping
+    the halving, event and ATH points exactly.
+
+    With a `pyramid` built from a series that `series` is a window of, only
+    the points found by `pyramid_candidates` are reduced, rather than every
+    raw row, with the same envelope.
+    """
+    if len(series) <= max_points:
+        return series
+
+    keep = _keep_indices(series, stats)
+    candidates = pyramid_candidates(series, max_points, pyramid) if pyramid is not None else None
+    if candidates is not None:
+        candidates[keep] = True
+        candidates = np.flatnonzero(candidates)
+        keep = np.searchsorted(candidates, keep)
+        series = PriceSeries(series.dates[candidates], series.prices[candidates])
+
+    r, theta = spiral_coordinates(series)
+    indices = minmax_bucket_indices(theta, r, max_points, keep)
+    return PriceSeries(series.dates[indices], series.prices[indices])
@@ -0,0 +1,79 @@
+from typing import Dict, Optional, Tuple
+import numpy as np
+
+from app.core.instrumentation import span
+from app.db.series import PriceSeries
+from app.services.chart_generator import create_logarithmic_spiral_chart
+from app.services.statistics import calculate_statistics
+
+def _percent_item(label: str, value: Optional[float]) -> str:
+    color = '#ff4d4d' if (value or 0) < 0 else '#4caf50'
+    formatted = f"{value:.2f}%" if value is not None else 'N/A'
+    return f"""<div class="stat-item">
+                    <span>{label}</span>
+                    <strong style="color: {color};">{formatted}</strong>
+                </div>"""
+
+def render_stats_html(stats: Dict, latest: Dict) -> str:
+    """Builds the statistics panel HTML from window statistics and latest indicator values."""
+    return f"""
+        <div class="stat-item">
+            <span>Current Price</span>
+            <strong>${stats.get('latest_price', 0):,.2f}</strong>
+        </div>
+        <div class="stat-item">
+            <span>All-Time High</span>
+            <strong>${stats.get('ath_price', 0):,.2f}</strong>
+        </div>
+        <div class="stat-item">
+            <span>Days Since ATH</span>
+            <strong>{stats.get('days_since_ath', 'N/A')}</strong>
+        </div>
+        <div class="stat-item">
+            <span>Change from ATH</span>
+            <strong style="color: {'#ff4d4d' if stats.get('change_from_ath_percent', 0) < 0 else '#4caf50'};">{stats.get('change_from_ath_percent', 0):.2f}%</strong>
+        </div>
+        <div class="stat-item">
+            <span>Performance (1Y)</span>
+            <strong style="color: {'#ff4d4d' if stats.get('performance_365d', 0) < 0 else '#4caf50'};">
+                {f"{stats['performance_365d']:.2f}%" if stats.get('performance_365d') is not None else 'N/A'}
+            </strong>
+        </div>
+        <div class="stat-item">
+            <span>SMA 50D</span>
+            <strong>{f"${stats['sma_50']:,.2f}" if stats.get('sma_50') is not None else 'N/A'}</strong>
+        </div>
+        <div class="stat-item">
+            <span>SMA 200D</span>
+            <strong>{f"${stats['sma_200']:,.2f}" if stats.get('sma_200') is not None else 'N/A'}</strong>
+        </div>
+        {_percent_item("Performance (7D)", latest["performance_7d"])}
+        {_percent_item("Performance (30D)", latest["performance_30d"])}
+        {_percent_item("Performance (90D)", latest["performance_90d"])}
+        {_percent_item("Performance (4Y)", latest["performance_1461d"])}
+        {_percent_item("Max Drawdown", latest["max_drawdown"])}
+        <div class="stat-item">
+            <span>Volatility (30D, ann.)</span>
+            <strong>{f"{latest['volatility_30']:.1f}%" if latest['volatility_30'] is not None else 'N/A'}</strong>
+        </div>
+        <div class="stat-item">
+            <span>Mayer Multiple</span>
+            <strong>{f"{latest['mayer_multiple']:.2f}" if latest['mayer_multiple'] is not None else 'N/A'}</strong>
+        </div>
+    """
+
+def render_fragments(plotted: PriceSeries, stats: Dict, latest: Dict, overlays: Dict[str, np.ndarray]) -> Tuple[str, str]:
+    """
+    Builds the chart and statistics panel HTML of a page.
+
+    Only takes picklable arguments and reads no process state, so it can run
+    in a worker process.
+    """
+    with span("chart"):
+        chart_html = create_logarithmic_spiral_chart(plotted, stats, overlays)
+    return chart_html, render_stats_html(stats, latest)
+
+def warm_up() -> None:
+    """Builds a two-point chart, so that a new worker process has imported the chart modules and read the spiral layout before its first render."""
+    series = PriceSeries(np.array(["2024-01-01", "2024-01-02"], dtype="datetime64[s]"), np.array([1.0, 2.0]))
+    create_logarithmic_spiral_chart(series, calculate_statistics(series))
@@ -0,0 +1,194 @@
+from datetime import datetime
+from typing import Dict, Hashable, Optional, Tuple
+import numpy as np
+
+from app.core.cache import LRUCache
+from app.core.instrumentation import span
+from app.db.series import PriceSeries
+
+GENESIS_DATE = np.datetime64(datetime(2009, 1, 3), "s")
+
+# Windows and spans in days, whatever the spacing of the prices
+SMA_WINDOWS = (50, 200)
+EMA_SPANS = (21, 200)
+VOLATILITY_WINDOW = 30
+PERFORMANCE_DAYS = (7, 30, 90, 365, 1461)
+# Width of the power-law band, in standard deviations of the log residuals
+POWER_LAW_BAND_SIGMAS = 2.0
+
+OVERLAYS = ("sma_50", "sma_200", "ema_21", "ema_200", "power_law", "power_law_lower", "power_law_upper")
+
+# Indicators per data version and window
+indicator_cache = LRUCache(16)
+
+def window_starts(dates: np.ndarray, days: int) -> np.ndarray:
+    """Returns, for each point, the index of the first point of the `days` days ending at it."""
+    return np.searchsorted(dates, dates - np.timedelta64(days, "D"), side="right")
+
+def sma(dates: np.ndarray, values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Simple moving average over the last `window` days from a cumulative
+    sum. NaN until the series spans the window, as a daily series does
+    from its `window`-th point.
+    """
+    result = np.full(len(values), np.nan)
+    if not len(values):
+        return result
+    sums = np.cumsum(np.r_[0.0, values])
+    ends = np.arange(1, len(values) + 1)
+    starts = window_starts(dates, window)
+    filled = dates - dates[0] >= np.timedelta64(window - 1, "D")
+    result[filled] = ((sums[ends] - sums[starts]) / (ends - starts))[filled]
+    return result
+
+def ema(dates: np.ndarray, values: np.ndarray, span: int) -> np.ndarray:
+    """
+    Exponential moving average with a decay of `1 - 2 / (span + 1)` per
+    day, seeded with the first value. Each point weighs in by the time
+    elapsed since the previous one, so a daily series gets the usual
+    `alpha = 2 / (span + 1)`.
+
+    Within blocks short enough for the decay powers to stay finite, the
+    recurrence is solved in closed form with a cumulative sum.
+    """
+    n = len(values)
+    result = np.empty(n)
+    if not n:
+        return result
+    decay = 1 - 2 / (span + 1)
+    block_days = np.log(1e100) / -np.log(decay)
+    days = (dates - dates[0]) / np.timedelta64(1, "D")
+    alphas = 1 - decay ** np.diff(days, prepend=days[0])
+
+    previous = values[0]
+    start = 0
+    while start < n:
+        stop = max(start + 1, int(np.searchsorted(days, days[start] + block_days, side="right")))
+        # y_k = decay^(t_k - t_-1) * y_-1 + sum_j(alpha_j * x_j * decay^(t_k - t_j))
+        powers = decay ** (days[start:stop] - days[start])
+        weighted = np.cumsum(alphas[start:stop] * values[start:stop] / powers)
+        result[start:stop] = powers * (previous * (1 - alphas[start]) + weighted)
+        previous = result[stop - 1]
+        start = stop
+    return result
+
+def rolling_volatility(dates: np.ndarray, prices: np.ndarray, window: int) -> np.ndarray:
+    """
+    Annualized standard deviation of the log returns of the last `window`
+    days, in percent, scaled by the typical spacing of the prices. NaN
+    until the series spans the window.
+    """
+    result = np.full(len(prices), np.nan)
+    if len(prices) < 2:
+        return result
+    # The return of each point is from the previous one
+    returns = np.r_[0.0, np.diff(np.log(prices))]
+    sums = np.cumsum(np.r_[0.0, returns])
+    squares = np.cumsum(np.r_[0.0, returns ** 2])
+    ends = np.arange(1, len(prices) + 1)
+    starts = np.maximum(window_starts(dates, window), 1)
+    counts = ends - starts
+    filled = (dates - dates[0] >= np.timedelta64(window, "D")) & (counts > 0)
+    mean = (sums[ends] - sums[starts])[filled] / counts[filled]
+    variance = np.maximum((squares[ends] - squares[starts])[filled] / counts[filled] - mean ** 2, 0)
+    spacing = np.median(np.diff(dates).astype(np.int64))
+    periods_per_year = 365 * 86400 / spacing if spacing > 0 else 365
+    result[filled] = np.sqrt(variance * periods_per_year) * 100
+    return result
+
+def drawdown(prices: np.ndarray) -> np.ndarray:
+    """Fall from the running all-time high, in percent."""
+    return (prices / np.maximum.accumulate(prices) - 1) * 100
+
+def power_law(dates: np.ndarray, prices: np.ndarray) -> Dict:
+    """
+    Fits `log10(price) = intercept + slope * log10(days since genesis)` and
+    returns the fit with a band of `POWER_LAW_BAND_SIGMAS` standard
+    deviations of the residuals.
+    """
+    days = (dates - GENESIS_DATE) / np.timedelta64(1, "D")
+    valid = days > 0
+    log_days = np.log10(np.where(valid, days, np.nan))
+    log_prices = np.log10(prices)
+    if valid.sum() < 2:
+        nan = np.full(len(prices), np.nan)
+        return {"slope": None, "intercept": None, "fit": nan, "lower": nan, "upper": nan}
+
+    slope, intercept = np.polyfit(log_days[valid], log_prices[valid], 1)
+    fit = intercept + slope * log_days
+    spread = POWER_LAW_BAND_SIGMAS * np.std(log_prices[valid] - fit[valid])
+    return {
+        "slope": float(slope),
+        "intercept": float(intercept),
+        "fit": 10 ** fit,
+        "lower": 10 ** (fit - spread),
+        "upper": 10 ** (fit + spread),
+    }
+
+def performance(dates: np.ndarray, prices: np.ndarray, days_ago: int) -> Optional[float]:
+    """Change in percent from the price closest to `days_ago` days before the latest one."""
+    if not len(prices):
+        return None
+    target = dates[-1] - np.timedelta64(days_ago, "D")
+    after = int(np.searchsorted(dates, target))
+    candidates = [i for i in (after - 1, after) if 0 <= i < len(dates)]
+    past = min(candidates, key=lambda i: abs(dates[i] - target))
+    return float((prices[-1] - prices[past]) / prices[past] * 100)
+
+def calculate_indicators(series: PriceSeries) -> Dict:
+    """
+    Computes every indicator over a whole price series in one pass.
+
+    Moving windows span days rather than points, so that they hold for
+    intraday series and series with gaps. Array indicators are aligned with the series; `latest` holds the
+    values at the latest price.
+    """
+    dates, prices = series.dates, series.prices
+    indicators = {f"sma_{w}": sma(dates, prices, w) for w in SMA_WINDOWS}
+    indicators.update({f"ema_{s}": ema(dates, prices, s) for s in EMA_SPANS})
+    indicators[f"volatility_{VOLATILITY_WINDOW}"] = rolling_volatility(dates, prices, VOLATILITY_WINDOW)
+    indicators["drawdown"] = drawdown(prices)
+    indicators["mayer_multiple"] = prices / indicators["sma_200"]
+
+    fit = power_law(dates, prices)
+    indicators["power_law"] = fit["fit"]
+    indicators["power_law_lower"] = fit["lower"]
+    indicators["power_law_upper"] = fit["upper"]
+
+    latest = {
+        name: _optional_float(values[-1]) if len(values) else None
+        for name, values in indicators.items()
+    }
+    latest["max_drawdown"] = _optional_float(indicators["drawdown"].min()) if len(prices) else None
+    latest["power_law_slope"] = fit["slope"]
+    for days_ago in PERFORMANCE_DAYS:
+        latest[f"performance_{days_ago}d"] = performance(dates, prices, days_ago)
+    indicators["latest"] = latest
+    return indicators
+
+def parse_overlays(value: Optional[str]) -> Tuple[str, ...]:
+    """Parses a comma-separated list of overlay names, ignoring unknown ones."""
+    if not value:
+        return ()
+    return tuple(name for name in OVERLAYS if name in value.split(","))
+
+def get_indicators(series: PriceSeries, version: Hashable) -> Dict:
+    """Returns the indicators of a window, computed once per data version."""
+    key = (version, series.dates[0].item() if len(series) else None, len(series))
+    indicators = indicator_cache.get(key)
+    if indicators is None:
+        with span("indicators"):
+            indicators = calculate_indicators(series)
+        indicator_cache.set(key, indicators)
+    return indicators
+
+def overlays_at(indicators: Dict, series: PriceSeries, plotted: PriceSeries, names: Tuple[str, ...]) -> Dict[str, np.ndarray]:
+    """
+    Returns the overlay indicators at the dates of `plotted`, a downsampled
+    copy of `series`. Values are NaN where an indicator is undefined.
+    """
+    positions = np.searchsorted(series.dates, plotted.dates)
+    return {name: indicators[name][positions] for name in names if name in OVERLAYS}
+
+def _optional_float(value) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
@@ -0,0 +1,244 @@
+"""
+Bulk ingestion of Bitcoin prices from CSV and JSON dumps.
+
+Input files are streamed: records are parsed, validated and written in
+batches of `batch_size` prices keyed by `dateAdd`, so memory use does not
+depend on the size of the input. Each transaction covers
+`batches_per_transaction` batches.
+
+CSV files need a header naming a date column (`dateAdd`, `date`,
+`timestamp` or `time`) and a price column (`price` or `close`). JSON files
+hold an array, or one value per line, of objects with the same keys or of
+`[date, price]` pairs. Dates are ISO 8601 strings or Unix timestamps in
+seconds or milliseconds, and are stored as naive UTC.
+
+    python -m app.services.ingestion history.csv ticks.jsonl
+"""
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import argparse
+import csv
+import json
+import logging
+import math
+import time
+
+from app.core.dates import parse_date
+from app.db.crud import get_latest_price_date, upsert_prices
+from app.db.session import SessionLocal
+from app.services.price_store import price_store
+
+logger = logging.getLogger(__name__)
+
+DATE_FIELDS = ("dateAdd", "date", "timestamp", "time")
+PRICE_FIELDS = ("price", "close")
+# Rejected records logged per run, the rest are only counted
+MAX_LOGGED_REJECTIONS = 10
+JSON_CHUNK_SIZE = 1 << 16
+
+def read_csv(path: Path) -> Iterator[Tuple[object, object]]:
+    """Yields the raw `(date, price)` values of the rows of a CSV file."""
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f)
+        date_field = _pick_field(reader.fieldnames or [], DATE_FIELDS, path)
+        price_field = _pick_field(reader.fieldnames or [], PRICE_FIELDS, path)
+        for row in reader:
+            yield row[date_field], row[price_field]
+
+def read_json(path: Path) -> Iterator[Tuple[object, object]]:
+    """Yields the raw `(date, price)` values of a JSON array or JSON Lines file."""
+    for item in _json_values(path):
+        if isinstance(item, dict):
+            date = next((item[name] for name in DATE_FIELDS if name in item), None)
+            price = next((item[name] for name in PRICE_FIELDS if name in item), None)
+            yield date, price
+        elif isinstance(item, (list, tuple)) and len(item) == 2:
+            yield item[0], item[1]
+        else:
+            yield None, None
+
+def _json_values(path: Path) -> Iterator[object]:
+    """
+    Decodes the values of a top-level JSON array, or of whitespace-separated
+    JSON values, reading the file in chunks.
+    """
+    decoder = json.JSONDecoder()
+    with open(path) as f:
+        buffer = f.read(JSON_CHUNK_SIZE)
+        stripped = buffer.lstrip()
+        in_array = stripped.startswith("[")
+        position = len(buffer) - len(stripped) + (1 if in_array else 0)
+        eof = len(buffer) < JSON_CHUNK_SIZE
+        while True:
+            # Skips separators, then decodes the next value once it is complete
+            while position < len(buffer) and (buffer[position].isspace() or (in_array and buffer[position] == ",")):
+                position += 1
+            if position < len(buffer) and in_array and buffer[position] == "]":
+                return
+            try:
+                if position >= len(buffer):
+                    raise ValueError("end of buffer")
+                value, end = decoder.raw_decode(buffer, position)
+                # A number at the end of the buffer may continue in the next chunk
+                if end == len(buffer) and not eof:
+                    raise ValueError("value may be truncated")
+            except ValueError:
+                if eof:
+                    if position < len(buffer):
+                        raise ValueError(f"Invalid JSON in {path} near character {position}")
+                    return
+                chunk = f.read(JSON_CHUNK_SIZE)
+                eof = len(chunk) < JSON_CHUNK_SIZE
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+            yield value
+            position = end
+
+def _pick_field(fieldnames: List[str], candidates: Tuple[str, ...], path: Path) -> str:
+    for name in candidates:
+        if name in fieldnames:
+            return name
+    raise ValueError(f"{path} has none of the columns {', '.join(candidates)}")
+
+READERS: Dict[str, Callable[[Path], Iterator[Tuple[object, object]]]] = {
+    "csv": read_csv,
+    "json": read_json,
+}
+
+def reader_for(path: Path, format: Optional[str] = None) -> Callable[[Path], Iterator[Tuple[object, object]]]:
+    """Picks the reader of `format`, or of the file extension."""
+    if format is None:
+        format = "csv" if path.suffix.lower() in (".csv", ".tsv", ".txt") else "json"
+    return READERS[format]
+
+def parse_price(value: object) -> float:
+    price = float(value) if isinstance(value, (str, int, float)) and not isinstance(value, bool) else math.nan
+    if not math.isfinite(price) or price <= 0:
+        raise ValueError(f"not a positive price: {value!r}")
+    return price
+
+class IngestionReport:
+    """Counters of one ingestion run."""
+
+    def __init__(self):
+        self.read = 0
+        self.rejected = 0
+        self.duplicates = 0
+        self.inserted = 0
+        self.updated = 0
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.read / self.seconds if self.seconds else 0.0
+
+    def as_dict(self) -> Dict:
+        return {
+            "read": self.read,
+            "rejected": self.rejected,
+            "duplicates": self.duplicates,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "unchanged": self.read - self.rejected - self.duplicates - self.inserted - self.updated,
+            "seconds": round(self.seconds, 3),
+            "rows_per_second": round(self.rows_per_second),
+        }
+
+def validate(records: Iterable[Tuple[object, object]], report: IngestionReport) -> Iterator[Tuple[datetime, float]]:
+    """Parses raw records, counting and skipping the invalid ones."""
+    for number, (date, price) in enumerate(records, start=1):
+        report.read += 1
+        try:
+            yield parse_date(date), parse_price(price)
+        except (TypeError, ValueError, OverflowError, OSError) as e:
+            report.rejected += 1
+            if report.rejected <= MAX_LOGGED_REJECTIONS:
+                logger.warning(f"Skipping record {number}: {e}")
+
+def ingest(
+    records: Iterable[Tuple[object, object]],
+    batch_size: int = 5000,
+    batches_per_transaction: int = 20,
+    update_existing: bool = True,
+    session_factory: Callable = SessionLocal,
+) -> IngestionReport:
+    """
+    Validates raw `(date, price)` records and writes them to the
+    `BitcoinPrice` table, deduplicated on `dateAdd`: the last price of a
+    date wins within a batch, and prices of stored dates replace the stored
+    ones when `update_existing`.
+
+    Bumps the data version of the price store of this process; other
+    processes notice the new rows at their next refresh.
+    """
+    report = IngestionReport()
+    start = time.perf_counter()
+    appended_only = True
+    prices = validate(records, report)
+    with session_factory() as db:
+        high_water_mark = get_latest_price_date(db)
+        batches = 0
+        while True:
+            valid = report.read - report.rejected
+            batch = dict(islice(prices, batch_size))
+            if not batch:
+                break
+            # Records of the batch replaced by a later one of the same date
+            report.duplicates += report.read - report.rejected - valid - len(batch)
+            check_existing = high_water_mark is not None and min(batch) <= high_water_mark
+            inserted, updated = upsert_prices(db, batch, update_existing, check_existing)
+            report.inserted += inserted
+            report.updated += updated
+            if check_existing and (inserted or updated):
+                appended_only = False
+            latest = max(batch)
+            high_water_mark = latest if high_water_mark is None else max(high_water_mark, latest)
+
+            batches += 1
+            if batches % batches_per_transaction == 0:
+                db.commit()
+                report.seconds = time.perf_counter() - start
+                logger.info(f"Ingested {report.read} records ({report.rows_per_second:.0f} rows/s)")
+        db.commit()
+    report.seconds = time.perf_counter() - start
+
+    if report.inserted or report.updated:
+        price_store.invalidate(appended_only=appended_only)
+    return report
+
+def ingest_files(paths: Iterable[Path], format: Optional[str] = None, **options) -> IngestionReport:
+    """Ingests files in order, as one stream of records."""
+    def records():
+        for path in paths:
+            logger.info(f"Reading {path}")
+            yield from reader_for(path, format)(path)
+    return ingest(records(), **options)
+
+def main():
+    parser = argparse.ArgumentParser(description="Loads Bitcoin prices from CSV or JSON files into the BitcoinPrice table.")
+    parser.add_argument("paths", type=Path, nargs="+")
+    parser.add_argument("--format", choices=sorted(READERS), help="input format, guessed from the file extension by default")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--batches-per-transaction", type=int, default=20)
+    parser.add_argument("--no-update", action="store_true", help="keep the stored price of dates already in the table")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    report = ingest_files(
+        args.paths,
+        args.format,
+        batch_size=args.batch_size,
+        batches_per_transaction=args.batches_per_transaction,
+        update_existing=not args.no_update,
+    )
+    if report.inserted or report.updated:
+        # Servers starting from now on map the new data instead of reading the table
+        with SessionLocal() as db:
+            price_store.load(db)
+    print(json.dumps(report.as_dict()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Hashable, List, Optional, Tuple
+import asyncio
+import contextlib
+import logging
+import multiprocessing
+
+from app.core.cache import LRUCache
+from app.core.concurrency import run_in_render_pool
+from app.core.config import settings
+from app.core.instrumentation import span
+from app.db.series import PriceSeries
+from app.db.session import AsyncSessionLocal
+from app.services.downsampling import downsample_series, point_budget
+from app.services.fragments import render_fragments, render_stats_html, warm_up
+from app.services.indicators import get_indicators, overlays_at
+from app.services.price_store import price_store
+
+logger = logging.getLogger(__name__)
+
+# The time ranges offered by the `dataDays` selector of index.html
+PRERENDER_WINDOWS = (None, 365, 1460, 2920, 4380, 5475)
+
+# Seconds before restarting a pool that broke or failed to warm up, doubled
+# after each consecutive failure
+RESTART_DELAY = 1.0
+RESTART_MAX_DELAY = 300.0
+
+fragment_cache = LRUCache(settings.PAGE_CACHE_SIZE)
+
+def fragment_key(prices: PriceSeries, max_points: int, overlay_names: Tuple[str, ...]) -> Tuple:
+    """Identifies the fragments of a window: the data held, the window bounds and the chart options."""
+    first_date = prices.dates[0].item() if len(prices) else None
+    return price_store.version, first_date, len(prices), max_points, overlay_names
+
+def prepare_fragments(prices: PriceSeries, max_points: int, overlay_names: Tuple[str, ...]) -> Tuple:
+    """Computes the arguments of `render_fragments` from the price store of this process."""
+    stats = price_store.get_statistics(prices)
+    indicators = get_indicators(prices, price_store.version)
+    with span("downsample"):
+        plotted = downsample_series(prices, max_points, stats, price_store.pyramid)
+    return plotted, stats, indicators["latest"], overlays_at(indicators, prices, plotted, overlay_names)
+
+def prepare_stats_fragment(prices: PriceSeries) -> str:
+    """Builds the statistics panel HTML of a window from the price store of this process."""
+    return render_stats_html(price_store.get_statistics(prices), get_indicators(prices, price_store.version)["latest"])
+
+class FragmentRenderer:
+    """
+    Renders the chart and statistics fragments of pages on a pool of worker
+    processes, so chart building runs outside the GIL of the server.
+
+    At most `queue_size` renders are queued or running on the pool; past
+    that, and until the workers have warmed up, renders run in-process on
+    the render thread pool rather than wait. Concurrent requests for the
+    same fragments share one render. A pool that breaks or fails to warm
+    up is restarted after a delay that doubles with each consecutive
+    failure, and not used until its new workers have warmed up.
+
+    Once started, a scheduler syncs the price store every `interval`
+    seconds and, when it gained rows, pre-renders every `PRERENDER_WINDOWS`
+    window so that requests for them are served from `fragment_cache`.
+    """
+
+    def __init__(self, workers: int, queue_size: int, interval: float):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.interval = max(interval, 1)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._warm_ups: List[Future] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._restart: Optional[asyncio.TimerHandle] = None
+        self._failures = 0
+        self._scheduler: Optional[asyncio.Task] = None
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._pending = 0
+        self._rendered_version = None
+        self.pool_renders = 0
+        self.inline_renders = 0
+        self.prerenders = 0
+        self.restarts = 0
+
+    def start(self, schedule: bool = True) -> None:
+        if self.workers <= 0:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._start_executor()
+        if schedule:
+            self._scheduler = asyncio.create_task(self._schedule())
+
+    async def stop(self) -> None:
+        if self._scheduler is not None:
+            self._scheduler.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._scheduler
+            self._scheduler = None
+        if self._restart is not None:
+            self._restart.cancel()
+            self._restart = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _start_executor(self) -> None:
+        # Workers are spawned, not forked from a process running threads and an event loop
+        executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        self._executor = executor
+        self._warm_ups = [executor.submit(warm_up) for _ in range(self.workers)]
+        for future in self._warm_ups:
+            # Called on the thread of the pool that completed the future
+            future.add_done_callback(lambda f: self._loop.call_soon_threadsafe(self._warmed_up, executor, f))
+
+    def _warmed_up(self, executor: ProcessPoolExecutor, future: Future) -> None:
+        if future.cancelled() or executor is not self._executor:
+            return
+        if future.exception() is not None:
+            logger.error(f"Render worker failed to warm up, rendering in-process: {future.exception()!r}")
+            self._schedule_restart(executor)
+        elif self.ready:
+            self._failures = 0
+
+    def _schedule_restart(self, failed: ProcessPoolExecutor) -> None:
+        # Every render or warm-up on the failed pool fails; only the first one schedules its restart
+        if failed is not self._executor or self._restart is not None:
+            return
+        delay = min(RESTART_DELAY * 2 ** self._failures, RESTART_MAX_DELAY)
+        self._failures += 1
+        logger.warning(f"Render worker pool failed, restarting it in {delay:g}s")
+        self._restart = self._loop.call_later(delay, self._restart_executor, failed)
+
+    def _restart_executor(self, failed: ProcessPoolExecutor) -> None:
+        self._restart = None
+        if failed is not self._executor:
+            return
+        self.restarts += 1
+        failed.shutdown(wait=False, cancel_futures=True)
+        self._start_executor()
+
+    @property
+    def ready(self) -> bool:
+        """Whether the worker pool is running, not awaiting a restart, and every worker has warmed up without error."""
+        return self._executor is not None and self._restart is None and all(
+            future.done() and not future.cancelled() and future.exception() is None for future in self._warm_ups
+        )
+
+    @property
+    def status(self) -> str:
+        """
+        "disabled" without a worker pool, "ready" once its workers have
+        warmed up, "restarting" while a failed pool awaits its restart,
+        "failed" if a worker failed to warm up, "starting" before.
+        """
+        if self._executor is None:
+            return "disabled"
+        if self.ready:
+            return "ready"
+        if self._restart is not None:
+            return "restarting"
+        if any(future.done() and (future.cancelled() or future.exception() is not None) for future in self._warm_ups):
+            return "failed"
+        return "starting"
+
+    @property
+    def degraded(self) -> bool:
+        """Whether renders run in-process because the pool failed and is not ready again yet."""
+        return self._executor is not None and not self.ready and (self._failures > 0 or self.restarts > 0)
+
+    async def get_fragments(self, prices: PriceSeries, max_points: int, overlay_names: Tuple[str, ...] = ()) -> Tuple[str, str]:
+        """Returns the chart and statistics panel HTML of a non-empty window."""
+        key = fragment_key(prices, max_points, overlay_names)
+        fragments = fragment_cache.get(key)
+        if fragments is not None:
+            return fragments
+
+        render = self._inflight.get(key)
+        if render is None:
+            render = asyncio.ensure_future(self._render_into_cache(key, prices, max_points, overlay_names))
+            self._inflight[key] = render
+            render.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # A cancelled request must not cancel a render other requests wait for
+        return await asyncio.shield(render)
+
+    async def get_stats_fragment(self, prices: PriceSeries, max_points: int, overlay_names: Tuple[str, ...] = ()) -> str:
+        """
+        Returns the statistics panel HTML of a non-empty window without
+        waiting for its chart. The indicators it computes are cached, so a
+        chart render that follows reuses them.
+        """
+        fragments = fragment_cache.get(fragment_key(prices, max_points, overlay_names))
+        if fragments is not None:
+            return fragments[1]
+        return await run_in_render_pool(prepare_stats_fragment, prices)
+
+    async def _render_into_cache(self, key: Hashable, prices: PriceSeries, max_points: int, overlay_names: Tuple[str, ...]) -> Tuple[str, str]:
+        args = await run_in_render_pool(prepare_fragments, prices, max_points, overlay_names)
+        fragments = await self._render(args)
+        fragment_cache.set(key, fragments)
+        return fragments
+
+    async def _render(self, args: Tuple) -> Tuple[str, str]:
+        if self.ready and self._pending < self.queue_size:
+            self._pending += 1
+            executor = self._executor
+            try:
+                # The chart spans are recorded in the worker; this one covers the round trip
+                with span("render"):
+                    fragments = await asyncio.wrap_future(executor.submit(render_fragments, *args))
+                self.pool_renders += 1
+                return fragments
+            except BrokenProcessPool:
+                self._schedule_restart(executor)
+            finally:
+                self._pending -= 1
+        self.inline_renders += 1
+        return await run_in_render_pool(render_fragments, *args)
+
+    async def _schedule(self) -> None:
+        # Pre-rendering in-process while the workers start would only slow down both
+        await asyncio.gather(*(asyncio.wrap_future(future) for future in self._warm_ups), return_exceptions=True)
+        while True:
+            try:
+                async with AsyncSessionLocal() as db:
+                    await price_store.sync_async(db)
+                if price_store.version != self._rendered_version:
+                    await self.prerender()
+            except Exception as e:
+                logger.warning(f"Pre-rendering failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def prerender(self) -> None:
+        """Renders every `PRERENDER_WINDOWS` window of the current data in parallel."""
+        version = price_store.version
+        max_points = point_budget()
+        windows = [price_store.window(days) for days in PRERENDER_WINDOWS]
+        await asyncio.gather(*(self.get_fragments(prices, max_points) for prices in windows if len(prices)))
+        self._rendered_version = version
+        self.prerenders += 1
+        logger.info(f"Pre-rendered {len(windows)} chart windows")
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.workers if self._executor is not None else 0,
+            "ready": self.ready,
+            "status": self.status,
+            "degraded": self.degraded,
+            "restarts": self.restarts,
+            "pending": self._pending,
+            "queue_size": self.queue_size,
+            "pool_renders": self.pool_renders,
+            "inline_renders": self.inline_renders,
+            "prerenders": self.prerenders,
+            "cache": fragment_cache.stats(),
+        }
+
+fragment_renderer = FragmentRenderer(
+    workers=settings.PRERENDER_WORKERS,
+    queue_size=settings.PRERENDER_QUEUE_SIZE,
+    interval=settings.PRICE_REFRESH_SECONDS,
+)
@@ -0,0 +1,254 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+import asyncio
+import threading
+import logging
+import time
+
+from app.core.concurrency import run_in_render_pool
+from app.core.config import settings
+from app.core.instrumentation import span
+from app.db.crud import (
+    get_price_fingerprint,
+    get_price_fingerprint_async,
+    get_price_series,
+    get_price_series_async,
+    get_price_series_since,
+    get_price_series_since_async,
+)
+from app.db.series import PriceSeries
+from app.services.pyramid import SeriesPyramid
+from app.services.snapshot import SeriesSnapshot
+from app.services.statistics import StatisticsEngine
+
+logger = logging.getLogger(__name__)
+
+class PriceStore:
+    """
+    Process-wide in-memory copy of the BitcoinPrice series.
+
+    The full table is loaded once, then only rows newer than the latest
+    `dateAdd` seen are fetched, at most once per `refresh_interval` seconds.
+    Each refresh first compares the count and sum of the rows held with the
+    table's, and reloads the table when earlier rows were inserted or
+    updated, as a backfill does.
+    `days` windows are answered by slicing the in-memory series, their
+    statistics come from an incrementally updated `StatisticsEngine`, and
+    `pyramid` holds the daily, weekly and monthly aggregates.
+
+    The `*_async` methods read through an `AsyncSession` and rebuild the
+    derived data on the render pool, one load or refresh at a time.
+
+    Whenever the data changes, the series is written to `snapshot` and
+    mapped back from it, so that worker processes share one copy and start
+    from it without a full read of the table.
+    """
+
+    def __init__(self, refresh_interval: float, data_dir: Optional[str] = None):
+        self.refresh_interval = refresh_interval
+        self.pyramid = SeriesPyramid(data_dir)
+        self.snapshot = SeriesSnapshot(data_dir)
+        self.statistics = StatisticsEngine()
+        self._series = PriceSeries.empty()
+        # Count and sum of the stored prices up to the high-water mark
+        self._fingerprint: Tuple[int, Optional[float]] = (0, None)
+        self._loaded = False
+        self._invalidated = False
+        self.generation = 0
+        self._last_refresh = 0.0
+        self._lock = threading.Lock()
+        self._async_lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    @property
+    def high_water_mark(self) -> Optional[datetime]:
+        series = self._series
+        return series.dates[-1].item() if len(series) else None
+
+    def load(self, db: Session) -> None:
+        """Replaces the in-memory series with a full read of the table."""
+        series = get_price_series(db)
+        fingerprint = get_price_fingerprint(db, series.dates[-1].item()) if len(series) else (0, None)
+        self._replace(series, fingerprint)
+
+    async def load_async(self, db: AsyncSession) -> None:
+        series = await get_price_series_async(db)
+        fingerprint = await get_price_fingerprint_async(db, series.dates[-1].item()) if len(series) else (0, None)
+        await run_in_render_pool(self._replace, series, fingerprint)
+
+    def load_snapshot(self) -> bool:
+        """
+        Loads the series from the snapshot, without reading the database,
+        and makes the next sync refresh it. Returns False if there is none.
+        """
+        loaded = self.snapshot.load()
+        if loaded is None:
+            return False
+        self._replace(*loaded, persist=False)
+        self._last_refresh = float("-inf")
+        return True
+
+    def _replace(self, series: PriceSeries, fingerprint: Tuple[int, Optional[float]], persist: bool = True) -> None:
+        if persist:
+            series = self.snapshot.sync(series, fingerprint)
+        if not self._loaded:
+            self.pyramid.load()
+        # Rows may have changed without moving the high-water mark or the row count
+        self.pyramid.sync(series, rebuild=self._loaded)
+        statistics = StatisticsEngine()
+        statistics.extend(series)
+        with self._lock:
+            self._series = series
+            self._fingerprint = fingerprint
+            self.statistics = statistics
+            self._loaded = True
+            self._invalidated = False
+            self.generation += 1
+            self._last_refresh = time.monotonic()
+        logger.info(f"Price store loaded {len(series)} rows")
+
+    def invalidate(self, appended_only: bool = False) -> None:
+        """
+        Marks the series held as out of date, for writers in this process.
+
+        The next sync fetches the rows newer than the high-water mark when
+        `appended_only`, and otherwise reloads the whole table.
+        """
+        self._last_refresh = float("-inf")
+        if not appended_only:
+            self._invalidated = True
+
+    def refresh(self, db: Session) -> int:
+        """Appends rows newer than the high-water mark and returns how many were added."""
+        since = self.high_water_mark
+        if since is None:
+            self.load(db)
+            return len(self._series)
+
+        if get_price_fingerprint(db, since) != self._fingerprint:
+            logger.info("Stored prices changed before the high-water mark, reloading")
+            self.load(db)
+            return len(self._series)
+
+        # Series dates have second resolution, like MySQL DATETIME columns
+        new_series = get_price_series_since(db, since + timedelta(seconds=1))
+        fingerprint = get_price_fingerprint(db, new_series.dates[-1].item()) if len(new_series) else self._fingerprint
+        return self._append(new_series, fingerprint)
+
+    async def refresh_async(self, db: AsyncSession) -> int:
+        since = self.high_water_mark
+        if since is None:
+            await self.load_async(db)
+            return len(self._series)
+
+        if await get_price_fingerprint_async(db, since) != self._fingerprint:
+            logger.info("Stored prices changed before the high-water mark, reloading")
+            await self.load_async(db)
+            return len(self._series)
+
+        new_series = await get_price_series_since_async(db, since + timedelta(seconds=1))
+        fingerprint = await get_price_fingerprint_async(db, new_series.dates[-1].item()) if len(new_series) else self._fingerprint
+        return await run_in_render_pool(self._append, new_series, fingerprint)
+
+    def _append(self, new_series: PriceSeries, fingerprint: Tuple[int, Optional[float]]) -> int:
+        series = self._series.append(new_series)
+        if len(new_series):
+            series = self.snapshot.sync(series, fingerprint)
+        self.pyramid.sync(series)
+        self.statistics.extend(new_series)
+        with self._lock:
+            self._series = series
+            self._fingerprint = fingerprint
+            self._last_refresh = time.monotonic()
+            self.refreshes += 1
+        if len(new_series):
+            logger.info(f"Price store appended {len(new_series)} rows")
+        return len(new_series)
+
+    @property
+    def version(self) -> Tuple[Optional[datetime], int, Optional[float]]:
+        """
+        Identifies the data currently held: the latest `dateAdd`, the row
+        count, and the sum of the prices, which changes when a full load
+        changes earlier rows. The same in every process holding the same data.
+        """
+        with self._lock:
+            series, fingerprint = self._series, self._fingerprint
+        return (series.dates[-1].item() if len(series) else None), len(series), fingerprint[1]
+
+    def sync(self, db: Session) -> None:
+        """Loads the series, or refreshes it if the refresh interval has elapsed."""
+        if not self._loaded or self._invalidated:
+            self.misses += 1
+            self.load(db)
+        else:
+            self.hits += 1
+            if self._refresh_due():
+                self.refresh(db)
+
+    async def sync_async(self, db: AsyncSession) -> None:
+        if self._loaded and not self._invalidated and not self._refresh_due():
+            self.hits += 1
+            return
+        async with self._async_lock:
+            # Another request may have loaded or refreshed while this one waited
+            if not self._loaded or self._invalidated:
+                self.misses += 1
+                await self.load_async(db)
+            else:
+                self.hits += 1
+                if self._refresh_due():
+                    await self.refresh_async(db)
+
+    def _refresh_due(self) -> bool:
+        return time.monotonic() - self._last_refresh >= self.refresh_interval
+
+    def get_series(self, db: Session, days: Optional[int] = None) -> PriceSeries:
+        """
+        Returns the price series, optionally limited to the last `days` days.
+
+        Loads or refreshes from the database first when needed.
+        """
+        self.sync(db)
+        return self.window(days)
+
+    async def get_series_async(self, db: AsyncSession, days: Optional[int] = None) -> PriceSeries:
+        await self.sync_async(db)
+        return self.window(days)
+
+    def window(self, days: Optional[int] = None) -> PriceSeries:
+        """Returns the last `days` days of the series held, without touching the database."""
+        series = self._series
+        if days:
+            start_date = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=days)
+            return series.since(start_date)
+        return series
+
+    def get_statistics(self, series: PriceSeries) -> Dict:
+        """
+        Returns the statistics of a window returned by `get_series`, with
+        the same keys as `calculate_statistics`.
+        """
+        if len(series) < 2:
+            return {}
+        with span("statistics"):
+            return self.statistics.window_stats(series.dates[0], series.dates[-1])
+
+    def stats(self) -> Dict:
+        high_water_mark = self.high_water_mark
+        return {
+            "rows": len(self._series),
+            "high_water_mark": high_water_mark.isoformat() if high_water_mark else None,
+            "generation": self.generation,
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "pyramid": self.pyramid.stats(),
+            "snapshot": self.snapshot.stats(),
+        }
+
+price_store = PriceStore(refresh_interval=settings.PRICE_REFRESH_SECONDS, data_dir=settings.DATA_DIR)
@@ -0,0 +1,202 @@
+from pathlib import Path
+from typing import Dict, Optional
+import json
+import logging
+import threading
+import numpy as np
+
+from app.core.files import write_atomic
+from app.db.series import PriceSeries
+
+logger = logging.getLogger(__name__)
+
+# Coarser levels come last
+AGGREGATE_LEVELS = ("daily", "weekly", "monthly")
+
+OHLC_DTYPE = np.dtype([
+    ("date", "datetime64[s]"),  # date of the last raw point in the bucket
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("open_date", "datetime64[s]"),
+    # Dates of the first raw points at the high and the low
+    ("high_date", "datetime64[s]"),
+    ("low_date", "datetime64[s]"),
+])
+
+def bucket_keys(dates: np.ndarray, level: str) -> np.ndarray:
+    """Returns the bucket number of each date: days, Monday-aligned weeks or months since 1970."""
+    days = dates.astype("datetime64[D]").astype(np.int64)
+    if level == "daily":
+        return days
+    if level == "weekly":
+        # 1970-01-05 is the first Monday after the epoch
+        return (days - 4) // 7
+    if level == "monthly":
+        return dates.astype("datetime64[M]").astype(np.int64)
+    raise ValueError(f"Unknown pyramid level: {level}")
+
+def bucket_start(key: int, level: str) -> np.datetime64:
+    """Returns the first instant of a bucket."""
+    if level == "daily":
+        return np.datetime64(int(key), "D").astype("datetime64[s]")
+    if level == "weekly":
+        return np.datetime64(int(key) * 7 + 4, "D").astype("datetime64[s]")
+    if level == "monthly":
+        return np.datetime64(int(key), "M").astype("datetime64[s]")
+    raise ValueError(f"Unknown pyramid level: {level}")
+
+def aggregate(series: PriceSeries, level: str) -> np.ndarray:
+    """Aggregates a price series into OHLC buckets."""
+    n = len(series)
+    if not n:
+        return np.empty(0, dtype=OHLC_DTYPE)
+    keys = bucket_keys(series.dates, level)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], n] - 1
+
+    buckets = np.empty(len(starts), dtype=OHLC_DTYPE)
+    buckets["date"] = series.dates[ends]
+    buckets["open"] = series.prices[starts]
+    buckets["high"] = np.maximum.reduceat(series.prices, starts)
+    buckets["low"] = np.minimum.reduceat(series.prices, starts)
+    buckets["close"] = series.prices[ends]
+    buckets["open_date"] = series.dates[starts]
+    bucket_of_point = np.repeat(np.arange(len(starts)), ends - starts + 1)
+    for extreme in ("high", "low"):
+        points = np.flatnonzero(series.prices == buckets[extreme][bucket_of_point])
+        # First occurrence of the extreme in each bucket
+        points = points[np.unique(bucket_of_point[points], return_index=True)[1]]
+        buckets[f"{extreme}_date"] = series.dates[points]
+    return buckets
+
+class SeriesPyramid:
+    """
+    Daily, weekly and monthly OHLC aggregates of the raw price series.
+
+    Levels are extended incrementally as rows are appended to the raw series
+    and persisted as `.npy` files in `data_dir`, which are memory-mapped
+    read-only when the process starts.
+    """
+
+    def __init__(self, data_dir: Optional[str]):
+        self.data_dir = Path(data_dir) / "pyramid" if data_dir else None
+        self._levels: Dict[str, np.ndarray] = {}
+        # Number of raw rows and date of the last one the levels were built from
+        self._rows = 0
+        self._high_water_mark: Optional[np.datetime64] = None
+        self._lock = threading.Lock()
+        self.rebuilds = 0
+        self.extensions = 0
+
+    def load(self) -> bool:
+        """Memory-maps the persisted levels. Returns False if there are none."""
+        if not self.data_dir or not (self.data_dir / "meta.json").exists():
+            return False
+        try:
+            meta = json.loads((self.data_dir / "meta.json").read_text())
+            levels = {
+                name: np.load(self.data_dir / f"{name}.npy", mmap_mode="r")
+                for name in AGGREGATE_LEVELS
+            }
+            # Levels written after the metadata was, by an interrupted save, or in an older layout
+            if {name: len(level) for name, level in levels.items()} != meta["levels"]:
+                raise ValueError("levels do not match their metadata")
+            if any(level.dtype != OHLC_DTYPE for level in levels.values()):
+                raise ValueError("levels are in an older layout")
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable series pyramid in {self.data_dir}: {e}")
+            return False
+        with self._lock:
+            self._levels = levels
+            self._rows = meta["rows"]
+            self._high_water_mark = np.datetime64(meta["high_water_mark"], "s") if meta["high_water_mark"] else None
+        return True
+
+    def sync(self, series: PriceSeries, rebuild: bool = False) -> None:
+        """
+        Brings the levels up to date with `series`.
+
+        When `series` extends the rows the levels were built from, only the
+        last bucket of each level and the buckets after it are recomputed.
+        Otherwise, or when `rebuild`, the levels are rebuilt.
+        """
+        n = len(series)
+        appended = (
+            not rebuild
+            and self._levels
+            and 0 < self._rows <= n
+            and series.dates[self._rows - 1] == self._high_water_mark
+        )
+        if appended and n == self._rows:
+            return
+
+        levels = {}
+        for name in AGGREGATE_LEVELS:
+            current = self._levels.get(name) if appended else None
+            if current is None or not len(current):
+                levels[name] = aggregate(series, name)
+                continue
+            last_key = bucket_keys(current["date"][-1:], name)[0]
+            start = np.searchsorted(series.dates, bucket_start(last_key, name), side="left")
+            tail = aggregate(PriceSeries(series.dates[start:], series.prices[start:]), name)
+            levels[name] = np.concatenate([current[:-1], tail])
+
+        with self._lock:
+            self._levels = levels
+            self._rows = n
+            self._high_water_mark = series.dates[-1] if n else None
+            if appended:
+                self.extensions += 1
+            else:
+                self.rebuilds += 1
+        self._persist()
+
+    def _persist(self) -> None:
+        """
+        Writes each level, then the metadata, each to a temporary file
+        renamed over the previous one. The metadata is removed first, so
+        that a save interrupted half way leaves no pyramid to load rather
+        than levels that do not match their metadata.
+        """
+        if not self.data_dir:
+            return
+        try:
+            self.data_dir.mkdir(parents=True, exist_ok=True)
+            (self.data_dir / "meta.json").unlink(missing_ok=True)
+            for name, level in self._levels.items():
+                write_atomic(self.data_dir / f"{name}.npy", lambda f, level=level: np.save(f, np.ascontiguousarray(level)))
+            meta = {
+                "rows": self._rows,
+                "high_water_mark": str(self._high_water_mark) if self._high_water_mark is not None else None,
+                "levels": {name: len(level) for name, level in self._levels.items()},
+            }
+            write_atomic(self.data_dir / "meta.json", lambda f: f.write(json.dumps(meta).encode("utf-8")))
+        except OSError as e:
+            logger.warning(f"Could not persist series pyramid to {self.data_dir}: {e}")
+
+    def window_buckets(self, window: PriceSeries) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Returns the buckets of each level that lie within `window`, from its
+        first to its last point, or None if the levels do not cover it.
+        """
+        levels = self._levels
+        if not levels or not len(window) or self._high_water_mark is None or window.dates[-1] > self._high_water_mark:
+            return None
+        buckets = {}
+        for name in AGGREGATE_LEVELS:
+            level = levels[name]
+            start = np.searchsorted(level["open_date"], window.dates[0], side="left")
+            end = np.searchsorted(level["date"], window.dates[-1], side="right")
+            buckets[name] = level[start:max(start, end)]
+        return buckets
+
+    def stats(self) -> Dict:
+        return {
+            "rows": self._rows,
+            "levels": {name: len(level) for name, level in self._levels.items()},
+            "rebuilds": self.rebuilds,
+            "extensions": self.extensions,
+            "persisted": self.data_dir is not None,
+        }
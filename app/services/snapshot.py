@@ -0,0 +1,127 @@
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+import logging
+import math
+import os
+import struct
+import time
+import numpy as np
+
+from app.core.files import write_atomic
+from app.db.series import PriceSeries
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"BTCSERIE"
+FORMAT_VERSION = 1
+# Magic, format version, header size, rows, high-water mark and creation
+# time in seconds since the epoch, and sum of the prices, padded to 64 bytes
+HEADER = struct.Struct("<8sIIqqqd16x")
+NO_DATE = np.iinfo(np.int64).min
+
+class SeriesSnapshot:
+    """
+    The raw price series as a binary file in `data_dir`, memory-mapped
+    read-only so that every worker process shares one page cache copy and
+    starts without reading the database.
+
+    The file is a `HEADER` followed by the dates as little-endian int64
+    seconds and the prices as little-endian float64. The header carries the
+    data version: the row count, the high-water mark and the sum of the
+    prices, as compared by the price store to detect changed rows. New
+    versions are written to a temporary file and renamed over the old one,
+    so readers see either version whole.
+    """
+
+    def __init__(self, data_dir: Optional[str]):
+        self.path = Path(data_dir) / "series.bin" if data_dir else None
+        self.writes = 0
+        self.loads = 0
+
+    def load(self) -> Optional[Tuple[PriceSeries, Tuple[int, Optional[float]]]]:
+        """Maps the snapshot. Returns the series and its fingerprint, or None if there is none."""
+        if not self.path or not self.path.exists():
+            return None
+        try:
+            # Header and data come from one open file, even if a new version replaces it meanwhile
+            with open(self.path, "rb") as f:
+                header = self._read_header(f.read(HEADER.size))
+                rows = header[0]
+                if os.fstat(f.fileno()).st_size != HEADER.size + 16 * rows:
+                    raise ValueError("size does not match the row count")
+                dates = np.memmap(f, dtype="<i8", mode="r", offset=HEADER.size, shape=(rows,))
+                prices = np.memmap(f, dtype="<f8", mode="r", offset=HEADER.size + 8 * rows, shape=(rows,))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable series snapshot {self.path}: {e}")
+            return None
+        self.loads += 1
+        # Plain read-only views of the mappings, which stay open while referenced
+        series = PriceSeries(np.asarray(dates).view("datetime64[s]"), np.asarray(prices))
+        return series, (rows, header[2])
+
+    def sync(self, series: PriceSeries, fingerprint: Tuple[int, Optional[float]]) -> PriceSeries:
+        """
+        Writes `series` unless the snapshot already holds this version, as
+        written by another worker, then returns the series mapped from it.
+
+        Returns `series` itself when there is no snapshot to map.
+        """
+        if not self.path or not len(series):
+            return series
+        if self._version() != self._series_version(series, fingerprint):
+            try:
+                self._write(series, fingerprint)
+            except OSError as e:
+                logger.warning(f"Could not write series snapshot {self.path}: {e}")
+                return series
+        loaded = self.load()
+        if loaded is None or loaded[1] != fingerprint or len(loaded[0]) != len(series):
+            return series
+        return loaded[0]
+
+    def _write(self, series: PriceSeries, fingerprint: Tuple[int, Optional[float]]) -> None:
+        rows, high_water_mark, total = self._series_version(series, fingerprint)
+        header = HEADER.pack(
+            MAGIC, FORMAT_VERSION, HEADER.size, rows, high_water_mark, int(time.time()),
+            math.nan if total is None else total,
+        )
+        def write(f):
+            f.write(header)
+            f.write(series.dates.astype("<i8").tobytes())
+            f.write(series.prices.astype("<f8").tobytes())
+
+        write_atomic(self.path, write)
+        self.writes += 1
+        logger.info(f"Wrote series snapshot of {rows} rows to {self.path}")
+
+    @staticmethod
+    def _series_version(series: PriceSeries, fingerprint: Tuple[int, Optional[float]]) -> Tuple[int, int, Optional[float]]:
+        high_water_mark = int(series.dates[-1].astype(np.int64)) if len(series) else NO_DATE
+        return len(series), high_water_mark, fingerprint[1]
+
+    def _version(self) -> Optional[Tuple[int, int, Optional[float]]]:
+        try:
+            with open(self.path, "rb") as f:
+                rows, high_water_mark, total, _ = self._read_header(f.read(HEADER.size))
+        except (OSError, ValueError):
+            return None
+        return rows, high_water_mark, total
+
+    @staticmethod
+    def _read_header(data: bytes) -> Tuple[int, int, Optional[float], int]:
+        """Returns the rows, high-water mark, price sum and creation time of a header."""
+        if len(data) < HEADER.size:
+            raise ValueError("truncated header")
+        magic, version, header_size, rows, high_water_mark, created, total = HEADER.unpack(data)
+        if magic != MAGIC or version != FORMAT_VERSION or header_size != HEADER.size:
+            raise ValueError("not a series snapshot of this version")
+        return rows, high_water_mark, None if math.isnan(total) else total, created
+
+    def stats(self) -> Dict:
+        version = self._version() if self.path else None
+        return {
+            "persisted": self.path is not None,
+            "rows": version[0] if version else 0,
+            "writes": self.writes,
+            "loads": self.loads,
+        }
@@ -1,45 +1,48 @@
-from typing import List, Dict
+from typing import List, Dict, Union
 from app.db.models import BitcoinPrice
-from datetime import timedelta
+from app.db.series import PriceSeries
+from datetime import datetime, timedelta
+from bisect import bisect_left, bisect_right
+import threading
 import numpy as np
 
-def calculate_statistics(prices: List[BitcoinPrice]) -> Dict:
+def calculate_statistics(prices: Union[PriceSeries, List[BitcoinPrice]]) -> Dict:
     """
-    Calculates key statistics from a list of Bitcoin prices.
+    Calculates key statistics from a price series or a list of Bitcoin prices.
     """
-    if not prices or len(prices) < 2:
+    if len(prices) < 2:
         return {}
 
-    # Sort prices by date to ensure chronological order
-    price_data = sorted([(p.dateAdd, p.price) for p in prices if p.price > 0], key=lambda x: x[0])
+    # PriceSeries is sorted by date and holds only positive prices
+    series = prices if isinstance(prices, PriceSeries) else PriceSeries.from_models(prices)
     
-    if not price_data:
+    if not len(series):
         return {}
 
-    dates, price_values = zip(*price_data)
+    dates, price_values = series.dates, series.prices
     
     # Latest price
-    latest_price = price_values[-1]
-    latest_date = dates[-1]
+    latest_price = float(price_values[-1])
+    latest_date = dates[-1].item()
 
     # ATH (All-Time High)
-    ath_price = max(price_values)
-    ath_date = dates[price_values.index(ath_price)]
+    ath_index = int(np.argmax(price_values))
+    ath_price = float(price_values[ath_index])
+    ath_date = dates[ath_index].item()
     days_since_ath = (latest_date - ath_date).days
 
     # Average price for the period
-    average_price = np.mean(price_values)
+    average_price = float(np.mean(price_values))
 
     # Moving averages
-    sma_50 = np.mean(price_values[-50:]) if len(price_values) >= 50 else None
-    sma_200 = np.mean(price_values[-200:]) if len(price_values) >= 200 else None
+    sma_50 = float(np.mean(price_values[-50:])) if len(price_values) >= 50 else None
+    sma_200 = float(np.mean(price_values[-200:])) if len(price_values) >= 200 else None
 
     # Performance over periods
     performance = {}
     for days_ago in [365]:
-        target_date = latest_date - timedelta(days=days_ago)
-        past_price_point = min(price_data, key=lambda x: abs(x[0] - target_date))
-        past_price = past_price_point[1]
+        target_date = np.datetime64(latest_date - timedelta(days=days_ago), "s")
+        past_price = float(price_values[np.argmin(np.abs(dates - target_date))])
         if past_price > 0:
             performance[days_ago] = ((latest_price - past_price) / past_price) * 100
         else:
@@ -52,10 +55,130 @@ def calculate_statistics(prices: List[BitcoinPrice]) -> Dict:
         "latest_date": latest_date,
         "ath_price": ath_price,
         "ath_date": ath_date,
+        "ath_index": ath_index,
         "days_since_ath": days_since_ath,
         "average_price": average_price,
         "sma_50": sma_50,
         "sma_200": sma_200,
         "performance_365d": performance.get(365),
         "change_from_ath_percent": change_from_ath_percent,
-    } 
\ No newline at end of file
+    }
+
+class StatisticsEngine:
+    """
+    Incrementally maintained statistics over an append-only price series.
+
+    Each appended price updates, in amortized O(1), the prefix sums used for
+    averages and moving averages, and a monotonic stack of suffix maxima
+    used for the ATH. Statistics for any window ending at the latest price
+    are then answered in O(log n) with the same keys as
+    `calculate_statistics`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            # Seconds since the epoch, prices and prefix sums of the prices
+            self._dates: List[int] = []
+            self._prices: List[float] = []
+            self._prefix_sums: List[float] = [0.0]
+            # Indices of the prices at least as high as every later price
+            self._suffix_max: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._prices)
+
+    def append(self, date: np.datetime64, price: float) -> None:
+        """Appends a price newer than all previous ones."""
+        with self._lock:
+            self._append(int(np.datetime64(date, "s").astype(np.int64)), float(price))
+
+    def _append(self, seconds: int, price: float) -> None:
+        index = len(self._prices)
+        self._dates.append(seconds)
+        self._prices.append(price)
+        self._prefix_sums.append(self._prefix_sums[-1] + price)
+        suffix_max = self._suffix_max
+        while suffix_max and self._prices[suffix_max[-1]] < price:
+            suffix_max.pop()
+        suffix_max.append(index)
+
+    def extend(self, series: PriceSeries) -> None:
+        """Appends every price of a series newer than all previous ones."""
+        with self._lock:
+            for seconds, price in zip(series.dates.astype(np.int64).tolist(), series.prices.tolist()):
+                self._append(seconds, price)
+
+    def window_stats(self, start_date: np.datetime64, end_date: np.datetime64) -> Dict:
+        """
+        Returns the statistics of the prices dated from `start_date` to
+        `end_date`, both included.
+        """
+        start_seconds = int(np.datetime64(start_date, "s").astype(np.int64))
+        end_seconds = int(np.datetime64(end_date, "s").astype(np.int64))
+        with self._lock:
+            dates, prices, prefix_sums = self._dates, self._prices, self._prefix_sums
+            start = bisect_left(dates, start_seconds)
+            end = bisect_right(dates, end_seconds)
+            count = end - start
+            if count < 2:
+                return {}
+            if end < len(dates):
+                # The suffix maxima only describe windows ending at the latest price
+                window = PriceSeries(
+                    np.array(dates[start:end], dtype="datetime64[s]"), np.array(prices[start:end])
+                )
+                return calculate_statistics(window)
+
+            latest_price = prices[-1]
+            latest_date = _to_datetime(dates[-1])
+
+            ath_index = self._suffix_max[bisect_left(self._suffix_max, start)]
+            ath_price = prices[ath_index]
+            ath_date = _to_datetime(dates[ath_index])
+
+            average_price = (prefix_sums[end] - prefix_sums[start]) / count
+            sma_50 = (prefix_sums[end] - prefix_sums[end - 50]) / 50 if count >= 50 else None
+            sma_200 = (prefix_sums[end] - prefix_sums[end - 200]) / 200 if count >= 200 else None
+
+            performance = {}
+            for days_ago in [365]:
+                target = dates[-1] - days_ago * 86400
+                past_index = self._nearest_index(target, start, end)
+                past_price = prices[past_index]
+                performance[days_ago] = ((latest_price - past_price) / past_price) * 100
+
+        return {
+            "latest_price": latest_price,
+            "latest_date": latest_date,
+            "ath_price": ath_price,
+            "ath_date": ath_date,
+            "ath_index": ath_index - start,
+            "days_since_ath": (latest_date - ath_date).days,
+            "average_price": average_price,
+            "sma_50": sma_50,
+            "sma_200": sma_200,
+            "performance_365d": performance.get(365),
+            "change_from_ath_percent": ((latest_price - ath_price) / ath_price) * 100,
+        }
+
+    def _nearest_index(self, target: int, start: int, end: int) -> int:
+        """Returns the first index in [start, end) whose date is closest to `target`."""
+        dates = self._dates
+        after = bisect_left(dates, target, start, end)
+        if after == end:
+            before = end - 1
+        elif after == start:
+            return after
+        else:
+            before = after - 1
+            if dates[after] - target < target - dates[before]:
+                return after
+        # Earliest of the points sharing the closest date
+        return bisect_left(dates, dates[before], start, before + 1)
+
+def _to_datetime(seconds: int) -> datetime:
+    return np.datetime64(seconds, "s").item()
@@ -0,0 +1,72 @@
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+import logging
+import time
+
+from app.core.concurrency import run_in_render_pool
+from app.core.config import settings
+from app.db.series import PriceSeries
+from app.services.downsampling import point_budget
+from app.services.fragments import warm_up
+from app.services.indicators import get_indicators
+from app.services.prerender import fragment_renderer
+from app.services.price_store import price_store
+
+logger = logging.getLogger(__name__)
+
+class WarmUp:
+    """
+    Startup steps of a worker, run in order by the application lifespan
+    before the worker accepts requests, each one timed.
+
+    A failed step is logged and skipped: the first requests then pay for
+    what it would have loaded or primed.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.seconds: Optional[float] = None
+        self.steps: Dict[str, float] = {}
+        self.failed: Dict[str, str] = {}
+
+    async def run(self, steps: Iterable[Tuple[str, Callable[[], Awaitable]]]) -> None:
+        start = time.perf_counter()
+        for name, step in steps:
+            step_start = time.perf_counter()
+            try:
+                await step()
+            except Exception as e:
+                logger.warning(f"Warm-up step {name} failed, requests will do it instead: {e}")
+                self.failed[name] = str(e)
+            self.steps[name] = time.perf_counter() - step_start
+        self.seconds = time.perf_counter() - start
+        self.ready = True
+        logger.info(f"Warmed up in {self.seconds:.2f} s: " + ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in self.steps.items()))
+
+    def stats(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "seconds": self.seconds,
+            "steps": dict(self.steps),
+            "failed": sorted(self.failed),
+        }
+
+warmup = WarmUp()
+
+def _prime_statistics(series: PriceSeries) -> None:
+    price_store.get_statistics(series)
+    get_indicators(series, price_store.version)
+
+async def prime_charts() -> None:
+    """
+    Fills the caches behind the default page: its chart and statistics
+    fragments, or in client render mode the statistics and indicators that
+    /api/spiral serves. Without data, renders a small chart instead, so the
+    rendering code is loaded all the same.
+    """
+    series = price_store.window()
+    if len(series) < 2:
+        await run_in_render_pool(warm_up)
+    elif settings.CHART_RENDER_MODE == "client":
+        await run_in_render_pool(_prime_statistics, series)
+    else:
+        await fragment_renderer.get_fragments(series, point_budget())
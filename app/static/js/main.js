@@ -3,11 +3,365 @@
  */
 function refreshChart() {
     const days = document.getElementById('dataDays').value;
-    const url = days ? '/?days=' + days : '/';
+    const overlaySelect = document.getElementById('overlay');
+    const overlays = overlaySelect ? overlaySelect.value : '';
+    const params = new URLSearchParams();
+    if (days) params.set('days', days);
+    if (overlays) params.set('overlays', overlays);
+    const query = params.toString();
+    const url = query ? '/?' + query : '/';
     const btn = document.querySelector('.btn');
     btn.textContent = 'Loading...';
     btn.disabled = true;
-    window.location.href = url;
+    
+    if (typeof Plotly === 'undefined') {
+        window.location.href = url;
+        return;
+    }
+    
+    updateSpiral(days, overlays)
+        .then(updated => updated || renderSpiral(days, overlays))
+        .then(() => {
+            window.history.replaceState(null, '', url);
+            btn.textContent = 'Refresh Chart';
+            btn.disabled = false;
+        })
+        .catch(() => {
+            window.location.href = url;
+        });
+}
+
+/**
+ * Spiral chart rendering from the /api/spiral data endpoint
+ */
+// Versioned URL from the page, so that browsers cache it until it changes
+const SPIRAL_TEMPLATE_URL = document.getElementById('mainContent').dataset.spiralTemplate || '/static/js/spiral-layout.json';
+let spiralTemplatePromise = null;
+
+/**
+ * Load the trace styles, layout and config shared with the server renderer
+ * @returns {Promise<Object>} - The spiral template
+ */
+function loadSpiralTemplate() {
+    if (!spiralTemplatePromise) {
+        spiralTemplatePromise = fetch(SPIRAL_TEMPLATE_URL).then(response => {
+            if (!response.ok) {
+                throw new Error('Failed to load chart template: ' + response.status);
+            }
+            return response.json();
+        });
+    }
+    return spiralTemplatePromise;
+}
+
+/**
+ * Decode a binary spiral payload: a uint32 header length, a JSON header,
+ * then one little-endian float32 column per array named in the header
+ * @param {ArrayBuffer} buffer - The response body
+ * @returns {Object} - The spiral data
+ */
+function decodeSpiralBinary(buffer) {
+    const view = new DataView(buffer);
+    const headerLength = view.getUint32(0, true);
+    const data = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 4, headerLength)));
+    let offset = 4 + headerLength;
+    
+    data.arrays.forEach(name => {
+        data[name] = new Float32Array(buffer, offset, data.count);
+        offset += data.count * 4;
+    });
+    
+    return data;
+}
+
+/**
+ * Fetch the spiral data for a time range
+ * @param {string} days - The number of days, empty for all time
+ * @param {string} overlays - Comma-separated indicator overlays, empty for none
+ * @returns {Promise<Object>} - The spiral data
+ */
+async function fetchSpiralData(days, overlays) {
+    const url = '/api/spiral?format=binary&width=' + window.innerWidth +
+        (days ? '&days=' + encodeURIComponent(days) : '') +
+        (overlays ? '&overlays=' + encodeURIComponent(overlays) : '');
+    const response = await fetch(url);
+    if (!response.ok) {
+        const error = new Error('Failed to load chart data: ' + response.status);
+        error.status = response.status;
+        throw error;
+    }
+    return decodeSpiralBinary(await response.arrayBuffer());
+}
+
+/**
+ * Format a price in USD with two decimals
+ * @param {number} value - The price
+ * @returns {string} - The formatted price
+ */
+function formatUsd(value) {
+    return '$' + value.toLocaleString('en-US', { minimumFractionDigits: 2, maximumFractionDigits: 2 });
+}
+
+/**
+ * Format a number of days since the Unix epoch as YYYY-MM-DD
+ * @param {number} day - The day
+ * @returns {string} - The formatted date
+ */
+function formatDay(day) {
+    return new Date(Math.round(day * 86400) * 1000).toISOString().slice(0, 10);
+}
+
+/**
+ * Build the Plotly traces and layout of the spiral
+ * @param {Object} template - The spiral template
+ * @param {Object} data - The spiral data
+ * @returns {Object} - The traces and the layout
+ */
+function buildSpiralFigure(template, data) {
+    // The template hovertemplates format the date and price of each point
+    const markerTrace = (style, index, name, title) => ({
+        ...style,
+        r: [data.r[index]],
+        theta: [data.theta[index]],
+        name: name,
+        meta: title,
+        hovertext: [formatDay(data.day[index])],
+        customdata: [data.price[index]]
+    });
+    
+    const traces = [{
+        ...template.traces.price,
+        r: data.r,
+        theta: data.theta,
+        hovertext: Array.from(data.day, formatDay),
+        customdata: data.price
+    }];
+    
+    (data.overlays || []).forEach(name => {
+        traces.push({
+            ...template.traces.overlays[name],
+            r: data['overlay_' + name],
+            theta: data.theta
+        });
+    });
+    
+    data.halvings.forEach(halving => {
+        traces.push(markerTrace(
+            template.traces.halving, halving.index,
+            'Halving #' + halving.number + ' - ' + halving.date,
+            '🌕 HALVING #' + halving.number
+        ));
+    });
+    
+    data.events.forEach(event => {
+        traces.push(markerTrace(
+            template.traces.event, event.index,
+            event.name + ' - ' + formatDay(data.day[event.index]),
+            event.name.toUpperCase()
+        ));
+    });
+    
+    if (data.ath_index !== null && data.ath_index !== undefined) {
+        traces.push(markerTrace(
+            template.traces.ath, data.ath_index,
+            'ATH - ' + formatDay(data.day[data.ath_index]),
+            'ALL-TIME HIGH'
+        ));
+    }
+    
+    const layout = JSON.parse(JSON.stringify(template.layout));
+    layout.polar.radialaxis.tickvals = data.radial_ticks.values;
+    layout.polar.radialaxis.ticktext = data.radial_ticks.labels;
+    layout.showlegend = window.innerWidth > 768;
+    
+    return { traces: traces, layout: layout };
+}
+
+/**
+ * Render the statistics panel content
+ * @param {Object} stats - The statistics from the spiral data
+ * @returns {string} - The panel HTML
+ */
+function renderStats(stats) {
+    const color = value => (value || 0) < 0 ? '#ff4d4d' : '#4caf50';
+    const defined = value => value !== null && value !== undefined;
+    const optionalUsd = value => defined(value) ? formatUsd(value) : 'N/A';
+    const percentItem = (label, value) => item(label,
+        defined(value) ? value.toFixed(2) + '%' : 'N/A',
+        'color: ' + color(value) + ';');
+    const item = (label, value, style) => (
+        '<div class="stat-item"><span>' + label + '</span>' +
+        '<strong' + (style ? ' style="' + style + '"' : '') + '>' + value + '</strong></div>'
+    );
+    
+    return [
+        item('Current Price', formatUsd(stats.latest_price || 0)),
+        item('All-Time High', formatUsd(stats.ath_price || 0)),
+        item('Days Since ATH', stats.days_since_ath !== undefined ? stats.days_since_ath : 'N/A'),
+        item('Change from ATH', (stats.change_from_ath_percent || 0).toFixed(2) + '%', 'color: ' + color(stats.change_from_ath_percent) + ';'),
+        percentItem('Performance (1Y)', stats.performance_365d),
+        item('SMA 50D', optionalUsd(stats.sma_50)),
+        item('SMA 200D', optionalUsd(stats.sma_200)),
+        percentItem('Performance (7D)', stats.performance_7d),
+        percentItem('Performance (30D)', stats.performance_30d),
+        percentItem('Performance (90D)', stats.performance_90d),
+        percentItem('Performance (4Y)', stats.performance_1461d),
+        percentItem('Max Drawdown', stats.max_drawdown),
+        item('Volatility (30D, ann.)', defined(stats.volatility_30) ? stats.volatility_30.toFixed(1) + '%' : 'N/A'),
+        item('Mayer Multiple', defined(stats.mayer_multiple) ? stats.mayer_multiple.toFixed(2) : 'N/A')
+    ].join('');
+}
+
+/**
+ * Get the chart element, creating it if the page has none yet
+ * @returns {Element} - The chart element
+ */
+function getChartDiv() {
+    let chartDiv = document.querySelector('#chartContainer .js-plotly-plot, #spiralChart');
+    if (!chartDiv) {
+        const container = document.getElementById('chartContainer');
+        container.innerHTML = '';
+        chartDiv = document.createElement('div');
+        chartDiv.id = 'spiralChart';
+        chartDiv.className = 'spiral-chart';
+        container.appendChild(chartDiv);
+    }
+    return chartDiv;
+}
+
+/**
+ * Fetch the spiral data for a time range and render it in place
+ * @param {string} days - The number of days, empty for all time
+ * @param {string} overlays - Comma-separated indicator overlays, empty for none
+ * @returns {Promise} - Resolves once the chart is rendered
+ */
+async function renderSpiral(days, overlays) {
+    const [template, data] = await Promise.all([loadSpiralTemplate(), fetchSpiralData(days, overlays)]);
+    const figure = buildSpiralFigure(template, data);
+    
+    await Plotly.react(getChartDiv(), figure.traces, figure.layout, template.config);
+    chartState = { days: days || '', overlays: overlays || '', version: data.version };
+    
+    updateStatsPanel(data.stats);
+}
+
+/**
+ * The time range, overlays and data version of the chart shown, null if unknown
+ */
+let chartState = null;
+
+/**
+ * Replace the statistics panel content
+ * @param {Object} stats - The statistics from the spiral data
+ */
+function updateStatsPanel(stats) {
+    const statsContent = document.querySelector('.stats-content');
+    if (statsContent) {
+        statsContent.innerHTML = renderStats(stats);
+    }
+}
+
+/**
+ * Append the points newer than the chart shown, from /api/spiral/delta, and
+ * update the statistics in place
+ * @param {string} days - The number of days, empty for all time
+ * @param {string} overlays - Comma-separated indicator overlays, empty for none
+ * @returns {Promise<boolean>} - False if the chart must be rendered again instead
+ */
+async function updateSpiral(days, overlays) {
+    const state = chartState;
+    if (!state || !state.version || state.days !== (days || '') || state.overlays !== (overlays || '')) {
+        return false;
+    }
+    const url = '/api/spiral/delta?version=' + encodeURIComponent(state.version) +
+        (days ? '&days=' + encodeURIComponent(days) : '') +
+        (overlays ? '&overlays=' + encodeURIComponent(overlays) : '');
+    const response = await fetch(url);
+    if (!response.ok) {
+        return false;
+    }
+    const delta = await response.json();
+    if (delta.full) {
+        return false;
+    }
+    
+    const chartDiv = getChartDiv();
+    if (delta.count) {
+        await Plotly.extendTraces(chartDiv, {
+            r: [delta.r],
+            theta: [delta.theta],
+            hovertext: [delta.day.map(formatDay)],
+            customdata: [delta.price]
+        }, [0]);
+        if (delta.overlays.length) {
+            // Overlay traces follow the price trace, in the order of the overlays
+            await Plotly.extendTraces(chartDiv, {
+                r: delta.overlays.map(name => delta['overlay_' + name]),
+                theta: delta.overlays.map(() => delta.theta)
+            }, delta.overlays.map((name, index) => index + 1));
+        }
+        if (delta.ath) {
+            await moveAthMarker(chartDiv, delta.ath);
+        }
+        await Plotly.relayout(chartDiv, {
+            'polar.radialaxis.tickvals': delta.radial_ticks.values,
+            'polar.radialaxis.ticktext': delta.radial_ticks.labels
+        });
+    }
+    
+    chartState = { days: state.days, overlays: state.overlays, version: delta.version };
+    updateStatsPanel(delta.stats);
+    return true;
+}
+
+/**
+ * Move the all-time high marker, the last trace of the chart, to a new point
+ * @param {Element} chartDiv - The chart element
+ * @param {Object} ath - The coordinates, day and price of the point
+ * @returns {Promise} - Resolves once the chart is updated
+ */
+async function moveAthMarker(chartDiv, ath) {
+    const point = {
+        r: [ath.r],
+        theta: [ath.theta],
+        name: 'ATH - ' + formatDay(ath.day),
+        hovertext: [formatDay(ath.day)],
+        customdata: [ath.price]
+    };
+    const index = chartDiv.data.length - 1;
+    if (index > 0 && String(chartDiv.data[index].name).startsWith('ATH')) {
+        return Plotly.restyle(chartDiv, {
+            r: [point.r], theta: [point.theta], name: point.name, hovertext: [point.hovertext], customdata: [point.customdata]
+        }, [index]);
+    }
+    const template = await loadSpiralTemplate();
+    return Plotly.addTraces(chartDiv, { ...template.traces.ath, ...point, meta: 'ALL-TIME HIGH' });
+}
+
+/**
+ * Keep the chart up to date, for dashboards left open
+ * @param {number} seconds - The seconds between updates
+ */
+function startAutoRefresh(seconds) {
+    setInterval(() => {
+        if (document.hidden || typeof Plotly === 'undefined') return;
+        const days = document.getElementById('dataDays').value;
+        const overlaySelect = document.getElementById('overlay');
+        const overlays = overlaySelect ? overlaySelect.value : '';
+        updateSpiral(days, overlays)
+            .then(updated => updated || renderSpiral(days, overlays))
+            .catch(error => console.log('Chart update failed: ', error));
+    }, seconds * 1000);
+}
+
+/**
+ * Hide the chart legend on mobile
+ */
+function syncLegendVisibility() {
+    const plotlyDiv = document.querySelector('.js-plotly-plot');
+    if (plotlyDiv && typeof Plotly !== 'undefined') {
+        Plotly.relayout(plotlyDiv, { 'showlegend': window.innerWidth > 768 });
+    }
 }
 
 /**
@@ -498,6 +852,33 @@ document.addEventListener('DOMContentLoaded', function() {
             daysSelect.value = days;
         }
     }
+    const overlays = urlParams.get('overlays');
+    if (overlays) {
+        const overlaySelect = document.getElementById('overlay');
+        if (overlaySelect) {
+            overlaySelect.value = overlays;
+        }
+    }
+    
+    const clientChart = document.querySelector('#spiralChart[data-client-render]');
+    if (clientChart) {
+        renderSpiral(days, overlays).catch(error => {
+            clientChart.innerHTML = '<h2>' + (error.status === 404 ? 'No Bitcoin price data available' : 'Error loading chart') + '</h2>';
+        });
+    } else {
+        syncLegendVisibility();
+        const chartContainer = document.getElementById('chartContainer');
+        if (chartContainer && chartContainer.dataset.chartVersion) {
+            chartState = { days: days || '', overlays: overlays || '', version: chartContainer.dataset.chartVersion };
+        }
+    }
+    
+    // e.g. ?refresh=300 on wall displays
+    const refreshSeconds = parseInt(urlParams.get('refresh'), 10);
+    if (refreshSeconds > 0) {
+        startAutoRefresh(Math.max(refreshSeconds, 10));
+    }
+    window.addEventListener('resize', syncLegendVisibility);
     
     window.chartDragHandler = new ChartDragHandler();
     
@@ -1,45 +1,10 @@
-const CACHE_NAME = 'btc-spiral-cache-v1';
-const urlsToCache = [
-  '/',
-  '/static/css/style.css',
-  '/static/js/main.js',
-  '/static/og-image.png'
-];
-
-self.addEventListener('install', event => {
-  event.waitUntil(
-    caches.open(CACHE_NAME)
-      .then(cache => {
-        console.log('Opened cache');
-        return cache.addAll(urlsToCache);
-      })
-  );
-});
-
-self.addEventListener('fetch', event => {
-  event.respondWith(
-    caches.match(event.request)
-      .then(response => {
-        if (response) {
-          return response;
-        }
-        return fetch(event.request);
-      }
-    )
-  );
-});
+// Former service worker, scoped to /static. The site worker is now served
+// at /sw.js: this one deletes its cache and unregisters itself.
+self.addEventListener('install', () => self.skipWaiting());
 
 self.addEventListener('activate', event => {
-  const cacheWhitelist = [CACHE_NAME];
   event.waitUntil(
-    caches.keys().then(cacheNames => {
-      return Promise.all(
-        cacheNames.map(cacheName => {
-          if (cacheWhitelist.indexOf(cacheName) === -1) {
-            return caches.delete(cacheName);
-          }
-        })
-      );
-    })
+    caches.delete('btc-spiral-cache-v2')
+      .then(() => self.registration.unregister())
   );
-}); 
\ No newline at end of file
+});
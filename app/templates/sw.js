@@ -0,0 +1,141 @@
+// Served at /sw.js with the asset manifest filled in, so that the worker
+// controls the whole site and its bytes change whenever an asset does
+const MANIFEST = {{ manifest | tojson }};
+
+const CACHE_PREFIX = 'btc-spiral-';
+const ASSET_CACHE = CACHE_PREFIX + 'assets-' + MANIFEST.version;
+const PAGE_CACHE = CACHE_PREFIX + 'pages-' + MANIFEST.version;
+const DATA_CACHE = CACHE_PREFIX + 'data-' + MANIFEST.version;
+
+// Entries kept per cache, the oldest ones are deleted first
+const CACHE_LIMITS = {
+  [ASSET_CACHE]: 32,
+  [PAGE_CACHE]: 12,
+  [DATA_CACHE]: 24
+};
+
+const PRECACHE_URLS = Object.values(MANIFEST.assets);
+const HASHED_URLS = new Set(PRECACHE_URLS);
+
+self.addEventListener('install', event => {
+  event.waitUntil(
+    caches.open(ASSET_CACHE)
+      .then(cache => cache.addAll(PRECACHE_URLS))
+      .then(() => self.skipWaiting())
+  );
+});
+
+self.addEventListener('activate', event => {
+  const current = Object.keys(CACHE_LIMITS);
+  event.waitUntil(
+    caches.keys()
+      .then(cacheNames => Promise.all(
+        cacheNames
+          .filter(cacheName => cacheName.startsWith(CACHE_PREFIX) && current.indexOf(cacheName) === -1)
+          .map(cacheName => caches.delete(cacheName))
+      ))
+      .then(() => self.clients.claim())
+  );
+});
+
+self.addEventListener('fetch', event => {
+  const request = event.request;
+  const url = new URL(request.url);
+  if (request.method !== 'GET' || url.origin !== self.location.origin) {
+    return;
+  }
+
+  // Built and vendor file names carry their content hash
+  if (HASHED_URLS.has(url.pathname + url.search) || url.pathname.startsWith('/static/build/') || url.pathname.startsWith('/static/vendor/')) {
+    event.respondWith(cacheFirst(request));
+  } else if (request.mode === 'navigate' && url.pathname === '/') {
+    event.respondWith(staleWhileRevalidate(event, request));
+  } else if (url.pathname === '/api/spiral') {
+    event.respondWith(networkFirst(request));
+  }
+});
+
+/**
+ * Content-hashed assets never change: serve them from the cache, and only
+ * fetch those missing from it
+ */
+async function cacheFirst(request) {
+  const cache = await caches.open(ASSET_CACHE);
+  const cached = await cache.match(request);
+  if (cached) {
+    return cached;
+  }
+  const response = await fetch(request);
+  if (response.ok) {
+    await cache.put(request, response.clone());
+    await trimCache(ASSET_CACHE);
+  }
+  return response;
+}
+
+/**
+ * Serve the cached page at once and refresh the cache in the background,
+ * so that the next visit shows the new data
+ */
+async function staleWhileRevalidate(event, request) {
+  const cached = await caches.match(request, { cacheName: PAGE_CACHE });
+  const refreshed = conditionalFetch(request, PAGE_CACHE);
+  if (cached) {
+    event.waitUntil(refreshed.catch(() => undefined));
+    return cached;
+  }
+  return refreshed;
+}
+
+/**
+ * Chart data is always revalidated, and served from the cache when offline
+ */
+async function networkFirst(request) {
+  try {
+    return await conditionalFetch(request, DATA_CACHE);
+  } catch (error) {
+    const cached = await caches.match(request, { cacheName: DATA_CACHE });
+    if (cached) {
+      return cached;
+    }
+    throw error;
+  }
+}
+
+/**
+ * Fetch with the ETag of the cached response, so that unchanged content
+ * costs a 304 without a body, and store changed content
+ */
+async function conditionalFetch(request, cacheName) {
+  const cache = await caches.open(cacheName);
+  const cached = await cache.match(request);
+  const headers = new Headers(request.headers);
+  const etag = cached && cached.headers.get('ETag');
+  if (etag) {
+    headers.set('If-None-Match', etag);
+  }
+
+  // The worker keeps the validated copy, the HTTP cache would be a second one
+  const response = await fetch(request.url, { headers: headers, credentials: 'same-origin', cache: 'no-store' });
+  if (response.status === 304 && cached) {
+    return cached;
+  }
+  // Streamed pages carry no ETag, they may hold placeholders for failed fragments
+  if (response.ok && response.headers.has('ETag')) {
+    await cache.put(request, response.clone());
+    await trimCache(cacheName);
+  }
+  return response;
+}
+
+/**
+ * Delete the oldest entries of a cache beyond its limit
+ */
+async function trimCache(cacheName) {
+  const cache = await caches.open(cacheName);
+  const keys = await cache.keys();
+  const excess = keys.length - CACHE_LIMITS[cacheName];
+  if (excess > 0) {
+    await Promise.all(keys.slice(0, excess).map(key => cache.delete(key)));
+  }
+}
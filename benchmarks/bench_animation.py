@@ -0,0 +1,59 @@
+"""
+Compares two ways of building the monthly time-lapse of the spiral, on a
+daily (5k) and an hourly (100k) series downsampled to 5,000 points:
+
+- per month: a full chart per month of the history, each re-plotting the
+  points and recomputing the statistics up to that month,
+- animation: create_spiral_animation, one set of coordinates split into
+  monthly traces that frames only toggle, statistics from running maxima.
+
+Reports build time, output size (raw and gzipped) and peak Python memory.
+"""
+from datetime import timedelta
+import gzip
+import json
+import tracemalloc
+import numpy as np
+
+from app.db.series import PriceSeries
+from app.services.animation import create_spiral_animation, month_ends
+from app.services.chart_generator import create_logarithmic_spiral_chart
+from app.services.downsampling import downsample_series
+from benchmarks.common import best_of, synthetic_series
+
+MAX_POINTS = 5000
+
+def per_month(series: PriceSeries, plotted: PriceSeries) -> bytes:
+    ends = np.searchsorted(plotted.dates, series.dates[month_ends(series.dates) - 1], side="right")
+    charts = []
+    for end in ends.tolist():
+        charts.append(create_logarithmic_spiral_chart(PriceSeries(plotted.dates[:end], plotted.prices[:end])))
+    return "".join(charts).encode("utf-8")
+
+def animation(series: PriceSeries, plotted: PriceSeries) -> bytes:
+    return json.dumps(create_spiral_animation(series, plotted), separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+def peak_memory(fn) -> int:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def main():
+    print(f"{'points':>8} {'months':>7} {'method':<10} {'time (ms)':>10} {'bytes':>12} {'gzipped':>10} {'peak MiB':>9}")
+    for n, step in [(5_000, timedelta(days=1)), (100_000, timedelta(hours=1))]:
+        series = synthetic_series(n, step)
+        plotted = downsample_series(series, MAX_POINTS)
+        months = len(month_ends(series.dates))
+        for label, fn, repeat in (("per month", per_month, 1), ("animation", animation, 3)):
+            seconds, output = best_of(lambda: fn(series, plotted), repeat=repeat)
+            peak = peak_memory(lambda: fn(series, plotted))
+            print(
+                f"{n:>8} {months:>7} {label:<10} {seconds * 1000:>10.1f} {len(output):>12,} "
+                f"{len(gzip.compress(output)):>10,} {peak / 2**20:>9.1f}"
+            )
+
+if __name__ == "__main__":
+    main()
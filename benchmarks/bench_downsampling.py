@@ -0,0 +1,66 @@
+"""
+Measures the throughput of the min/max bucket reducer and checks its
+visual fidelity in (theta, log r) space, reducing either every raw point
+or only the candidates found from the aggregate pyramid:
+
+- every bucket keeps its exact lowest and highest log price,
+- the halving, event and ATH points survive,
+- the deviation of the reduced polyline from each original point, in
+  log10 USD, stays within the price range of the bucket of that point.
+"""
+from datetime import timedelta
+import numpy as np
+
+from app.services.chart_generator import find_annotations, spiral_coordinates
+from app.services.downsampling import POINTS_PER_BUCKET, downsample_series
+from app.services.pyramid import SeriesPyramid
+from benchmarks.common import best_of, synthetic_series
+
+MAX_POINTS = 2000
+
+def check_fidelity(series, reduced):
+    r, theta = spiral_coordinates(series)
+    kept = np.searchsorted(series.dates, reduced.dates)
+    assert np.array_equal(series.dates[kept], reduced.dates)
+    is_kept = np.zeros(len(series), dtype=bool)
+    is_kept[kept] = True
+
+    # The buckets of the reducer, each a contiguous run of points
+    bucket_count = MAX_POINTS // POINTS_PER_BUCKET
+    buckets = np.minimum(((theta - theta[0]) * (bucket_count / (theta[-1] - theta[0]))).astype(np.int64), bucket_count - 1)
+    bucket_starts = np.flatnonzero(np.r_[True, np.diff(buckets) != 0])
+    bucket_of_point = np.repeat(np.arange(len(bucket_starts)), np.diff(np.r_[bucket_starts, len(series)]))
+    lowest = np.minimum.reduceat(r, bucket_starts)
+    highest = np.maximum.reduceat(r, bucket_starts)
+    for name, extreme in (("lowest", lowest), ("highest", highest)):
+        found = is_kept & (r == extreme[bucket_of_point])
+        missing = np.bincount(bucket_of_point[found], minlength=len(bucket_starts)) == 0
+        assert not missing.any(), f"{int(missing.sum())} buckets lost their {name} point, e.g. bucket {int(np.argmax(missing))}"
+
+    halvings, events = find_annotations(series.dates)
+    for index in [a["index"] for a in halvings + events] + [int(np.argmax(series.prices))]:
+        assert series.dates[index] in reduced.dates, "annotation point dropped"
+
+    # Each bucket keeps its first and last points, so every point is drawn
+    # between kept points of its own bucket
+    deviation = np.abs(np.interp(theta, theta[kept], r[kept]) - r)
+    bucket_range = highest - lowest
+    assert (deviation <= bucket_range[bucket_of_point] + 1e-12).all(), "point further from the line than its bucket range"
+    return deviation.max(), bucket_range.max()
+
+def main():
+    print(f"{'points':>9} {'source':<8} {'kept':>6} {'time':>9} {'throughput':>14} {'max dev (log10)':>16} {'max bucket range':>17}")
+    for n, step in [(5_000, timedelta(days=1)), (50_000, timedelta(hours=1)), (500_000, timedelta(hours=1)), (2_000_000, timedelta(hours=1))]:
+        series = synthetic_series(n, step)
+        pyramid = SeriesPyramid(None)
+        pyramid.sync(series)
+        for source, levels in (("raw", None), ("pyramid", pyramid)):
+            elapsed, reduced = best_of(lambda: downsample_series(series, MAX_POINTS, pyramid=levels), repeat=3)
+            max_deviation, max_bucket_range = check_fidelity(series, reduced)
+            print(
+                f"{n:>9} {source:<8} {len(reduced):>6} {elapsed * 1000:>7.1f}ms {n / elapsed / 1e6:>9.1f} Mpt/s "
+                f"{max_deviation:>16.4f} {max_bucket_range:>17.4f}"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Compares the per-point hover strings formerly built by
+create_logarithmic_spiral_chart with the customdata and hovertemplate
+traces, on 5k and 100k point series: render time of the chart fragment,
+and its size raw and gzip-compressed.
+"""
+from datetime import timedelta
+import gzip
+import numpy as np
+import plotly.graph_objects as go
+
+from app.services.chart_generator import (
+    SPIRAL_TEMPLATE,
+    create_logarithmic_spiral_chart,
+    find_annotations,
+    find_point,
+    radial_axis_ticks,
+    spiral_coordinates,
+)
+from app.services.statistics import calculate_statistics
+from benchmarks.common import best_of, synthetic_series
+
+def legacy_chart(series, stats):
+    """The chart with one formatted hover string per point, as before."""
+    traces = {
+        name: {key: value for key, value in style.items() if key != "hovertemplate"}
+        for name, style in SPIRAL_TEMPLATE["traces"].items() if name != "overlays"
+    }
+    price_values = series.prices.tolist()
+    day_labels = np.datetime_as_string(series.dates, unit="D").tolist()
+    r, theta = spiral_coordinates(series)
+    halving_indices, event_indices = find_annotations(series.dates)
+    ath_index = find_point(series, stats["ath_date"])
+
+    def hover_text(title, i):
+        return (f"<b>{title}</b><br>" if title else "") + f"<b>Date:</b> {day_labels[i]}<br><b>Price:</b> ${price_values[i]:,.2f}<br>"
+
+    def marker_trace(style, i, name, title):
+        return go.Scatterpolar(
+            style, r=[r[i]], theta=[theta[i]], name=name, text=[hover_text(title, i)], hovertemplate='%{text}<extra></extra>',
+        )
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatterpolar(
+        traces["price"],
+        r=r,
+        theta=theta,
+        text=[hover_text(None, i) for i in range(len(series))],
+        hovertemplate='%{text}<extra></extra>',
+    ))
+    for halving in halving_indices:
+        fig.add_trace(marker_trace(traces["halving"], halving["index"], f"Halving #{halving['number']}", f"🌕 HALVING #{halving['number']}"))
+    for event in event_indices:
+        fig.add_trace(marker_trace(traces["event"], event["index"], event["name"], event["name"].upper()))
+    if ath_index is not None:
+        fig.add_trace(marker_trace(traces["ath"], ath_index, "ATH", "ALL-TIME HIGH"))
+    fig.update_layout(SPIRAL_TEMPLATE["layout"])
+    radial_ticks = radial_axis_ticks(float(series.prices.max()))
+    fig.update_layout(polar_radialaxis=dict(tickvals=radial_ticks["values"], ticktext=radial_ticks["labels"]))
+    return fig.to_html(
+        include_plotlyjs=False,
+        full_html=False,
+        div_id="spiral-chart",
+        config=SPIRAL_TEMPLATE["config"],
+        default_height=SPIRAL_TEMPLATE["size"]["height"],
+        default_width=SPIRAL_TEMPLATE["size"]["width"],
+    )
+
+def main():
+    print(f"{'points':>8} {'variant':<12} {'render':>10} {'bytes':>11} {'gzip':>10}")
+    for n in (5_000, 100_000):
+        series = synthetic_series(n, timedelta(days=1) if n <= 5_000 else timedelta(hours=1))
+        stats = calculate_statistics(series)
+        results = {}
+        for label, render in (
+            ("hover text", lambda: legacy_chart(series, stats)),
+            ("customdata", lambda: create_logarithmic_spiral_chart(series, stats)),
+        ):
+            seconds, html = best_of(render, 5 if n <= 5_000 else 3)
+            body = html.encode("utf-8")
+            results[label] = (seconds, len(body), len(gzip.compress(body, 6)))
+            print(f"{n:>8} {label:<12} {seconds * 1000:>8.1f}ms {len(body):>11,} {results[label][2]:>10,}")
+        (old_time, old_size, old_gzip), (new_time, new_size, new_gzip) = results.values()
+        print(f"{n:>8} {'ratio':<12} {old_time / new_time:>9.1f}x {old_size / new_size:>10.1f}x {old_gzip / new_gzip:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
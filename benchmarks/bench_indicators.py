@@ -0,0 +1,70 @@
+"""
+Measures the indicator pass over a whole series and checks the vectorized
+kernels against straightforward per-point loops, on a daily series and on
+an hourly one with gaps.
+"""
+from datetime import timedelta
+import numpy as np
+
+from app.db.series import PriceSeries
+from app.services.indicators import calculate_indicators, ema, rolling_volatility, sma
+from benchmarks.common import best_of, synthetic_series
+
+def ema_loop(prices, span):
+    alpha = 2.0 / (span + 1)
+    out = np.empty_like(prices)
+    out[0] = prices[0]
+    for i in range(1, len(prices)):
+        out[i] = alpha * prices[i] + (1 - alpha) * out[i - 1]
+    return out
+
+def gapped_series(n: int) -> PriceSeries:
+    """An hourly series with a few missing weeks, whose windows hold a varying number of points."""
+    series = synthetic_series(n, timedelta(hours=1))
+    keep = np.ones(n, dtype=bool)
+    for start in range(n // 7, n, n // 5):
+        keep[start:start + 24 * 14] = False
+    return PriceSeries(series.dates[keep], series.prices[keep])
+
+def check_kernels(series):
+    dates, prices = series.dates, series.prices
+    # On a daily series, day windows hold as many points as days
+    for span in (21, 200):
+        expected = ema_loop(prices, span)
+        assert np.allclose(ema(dates, prices, span), expected, rtol=1e-9), f"ema({span}) diverges"
+    expected = np.array([prices[i - 199:i + 1].mean() for i in range(199, len(prices))])
+    assert np.allclose(sma(dates, prices, 200)[199:], expected, rtol=1e-9), "sma(200) diverges"
+    assert np.isnan(sma(dates, prices, 200)[:199]).all()
+    returns = np.diff(np.log(prices))
+    expected = np.array([returns[i - 30:i].std() for i in range(30, len(prices))]) * np.sqrt(365) * 100
+    assert np.allclose(rolling_volatility(dates, prices, 30)[30:], expected, rtol=1e-6), "volatility(30) diverges"
+
+    # On an irregular series, windows cover the days before each point
+    gapped = gapped_series(20_000)
+    dates, prices = gapped.dates, gapped.prices
+    days = (dates - dates[0]) / np.timedelta64(1, "D")
+    values = sma(dates, prices, 50)
+    for i in range(0, len(prices), 997):
+        in_window = (dates > dates[i] - np.timedelta64(50, "D")) & (dates <= dates[i])
+        if days[i] >= 49:
+            assert np.isclose(values[i], prices[in_window].mean(), rtol=1e-9), "time-window sma diverges"
+        else:
+            assert np.isnan(values[i])
+    decay = 1 - 2 / 22
+    expected = np.empty_like(prices)
+    expected[0] = prices[0]
+    for i in range(1, len(prices)):
+        weight = decay ** (days[i] - days[i - 1])
+        expected[i] = (1 - weight) * prices[i] + weight * expected[i - 1]
+    assert np.allclose(ema(dates, prices, 21), expected, rtol=1e-9), "time-decayed ema diverges"
+
+def main():
+    check_kernels(synthetic_series(5_000))
+    print(f"{'points':>9} {'time':>9} {'throughput':>14}")
+    for n, step in [(5_000, timedelta(days=1)), (50_000, timedelta(hours=1)), (500_000, timedelta(hours=1))]:
+        series = synthetic_series(n, step)
+        elapsed, _ = best_of(lambda: calculate_indicators(series), repeat=3)
+        print(f"{n:>9} {elapsed * 1000:>7.1f}ms {n / elapsed / 1e6:>9.1f} Mpt/s")
+
+if __name__ == "__main__":
+    main()
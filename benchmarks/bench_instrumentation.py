@@ -0,0 +1,33 @@
+"""
+Measures the cost of instrumentation: a span enabled and disabled, and
+requests per second on /health with and without ServerTimingMiddleware.
+"""
+import asyncio
+import time
+
+from app.core import instrumentation
+from app.core.instrumentation import ServerTimingMiddleware, span
+from benchmarks.bench_middleware import build_app, requests_per_second
+
+def span_cost(enabled: bool, count: int = 200_000) -> float:
+    instrumentation.ENABLED = enabled
+    start = time.perf_counter()
+    for _ in range(count):
+        with span("bench"):
+            pass
+    return (time.perf_counter() - start) / count
+
+def main():
+    enabled = instrumentation.ENABLED
+    try:
+        print(f"span enabled:  {span_cost(True) * 1e9:7.0f} ns")
+        print(f"span disabled: {span_cost(False) * 1e9:7.0f} ns")
+    finally:
+        instrumentation.ENABLED = enabled
+
+    for name, middleware in [("without", ()), ("with", ((ServerTimingMiddleware, {}),))]:
+        rate, _ = asyncio.run(requests_per_second(build_app("", *middleware), "/health", b"identity"))
+        print(f"/health {name} ServerTimingMiddleware: {rate:7.0f} req/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Compares the per-row Python loops formerly used by
+create_logarithmic_spiral_chart with the vectorized angle and annotation
+lookup, on daily (5k) and hourly (50k, 500k) series.
+"""
+from datetime import timedelta
+import numpy as np
+
+from app.services.chart_generator import EVENTS_DATES, HALVING_DATES, find_annotations, spiral_coordinates
+from benchmarks.common import best_of, synthetic_series
+
+def legacy_pipeline(dates, price_values):
+    start_date = min(dates)
+    theta = np.array([(d - start_date).days for d in dates]) * (360 / 1461)
+
+    indices = []
+    for target in HALVING_DATES + [event["date"] for event in EVENTS_DATES]:
+        date_differences = [abs((d - target).days) for d in dates]
+        min_diff_index = date_differences.index(min(date_differences))
+        indices.append(min_diff_index if min(date_differences) <= 1 else -1)
+
+    ath_price = max(price_values)
+    ath_index = price_values.index(ath_price)
+    return theta, indices, ath_index
+
+def vectorized_pipeline(series):
+    _, theta = spiral_coordinates(series)
+    halvings, events = find_annotations(series.dates)
+    ath_index = int(np.argmax(series.prices))
+    return theta, halvings, events, ath_index
+
+def main():
+    print(f"{'points':>8} {'legacy':>10} {'vectorized':>11} {'speedup':>8}")
+    for n, step in [(5_000, timedelta(days=1)), (50_000, timedelta(hours=1)), (500_000, timedelta(hours=1))]:
+        series = synthetic_series(n, step)
+        dates = series.datetimes()
+        price_values = series.prices.tolist()
+
+        legacy_time, (legacy_theta, legacy_indices, legacy_ath) = best_of(
+            lambda: legacy_pipeline(dates, price_values), repeat=1 if n > 50_000 else 3
+        )
+        vector_time, (theta, halvings, events, ath_index) = best_of(lambda: vectorized_pipeline(series))
+
+        found = {h["date"]: h["index"] for h in halvings}
+        found.update({e["date"]: e["index"] for e in events})
+        targets = HALVING_DATES + [event["date"] for event in EVENTS_DATES]
+        assert np.array_equal(theta, legacy_theta)
+        assert [found.get(t, -1) for t in targets] == legacy_indices
+        assert ath_index == legacy_ath
+
+        print(f"{n:>8} {legacy_time * 1000:>8.1f}ms {vector_time * 1000:>9.2f}ms {legacy_time / vector_time:>7.0f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Measures requests per second through the middleware stack, calling the
+ASGI app directly so that only the application and middleware run:
+
+- bare: no middleware,
+- legacy: the former BaseHTTPMiddleware security headers,
+- security: the pure ASGI security headers,
+- security+gzip / security+br: the security headers and compression,
+  with a client accepting that coding,
+- +cache: the same, keeping compressed bodies by ETag.
+
+/ serves a page body of the size rendered for the full series, with an
+ETag like the real page.
+"""
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse
+from starlette.datastructures import MutableHeaders
+from starlette.middleware.base import BaseHTTPMiddleware
+import asyncio
+import time
+
+from app.core.cache import LRUCache
+from app.core.compression import CompressionMiddleware, brotli
+from app.core.security import SECURITY_HEADERS, SecurityHeadersMiddleware
+from app.services.downsampling import downsample_series
+from app.services.fragments import render_fragments
+from app.services.indicators import calculate_indicators
+from app.services.statistics import calculate_statistics
+from benchmarks.common import synthetic_series
+
+class LegacySecurityHeadersMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        response = await call_next(request)
+        headers = MutableHeaders(response.headers)
+        headers.update(SECURITY_HEADERS)
+        response.headers.update(headers)
+        return response
+
+def page_body() -> str:
+    series = synthetic_series(5_500)
+    stats = calculate_statistics(series)
+    chart_html, stats_html = render_fragments(
+        downsample_series(series, 5_000, stats), stats, calculate_indicators(series)["latest"], {}
+    )
+    return f"<!DOCTYPE html><html><body>{stats_html}{chart_html}</body></html>"
+
+def build_app(body: str, *middleware) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health_check():
+        return {"status": "healthy", "service": "bitcoin-logarithmic-spiral-api"}
+
+    @app.get("/")
+    async def root():
+        return HTMLResponse(body, headers={"ETag": '"page"'})
+
+    for cls, options in middleware:
+        app.add_middleware(cls, **options)
+    return app
+
+async def call(app, path: str, accept_encoding: bytes) -> int:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"testserver"), (b"accept-encoding", accept_encoding)],
+        "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+    }
+    size = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal size
+        if message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return size
+
+async def requests_per_second(app, path: str, accept_encoding: bytes, seconds: float = 2.0):
+    size = await call(app, path, accept_encoding)
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        await call(app, path, accept_encoding)
+        count += 1
+    return count / (time.perf_counter() - start), size
+
+def main():
+    body = page_body()
+    security = (SecurityHeadersMiddleware, {})
+    stacks = [
+        ("bare", b"identity", ()),
+        ("legacy", b"identity", ((LegacySecurityHeadersMiddleware, {}),)),
+        ("security", b"identity", (security,)),
+    ]
+    for encoding in ("gzip", "br") if brotli is not None else ("gzip",):
+        stacks.append((f"security+{encoding}", encoding.encode(), ((CompressionMiddleware, {}), security)))
+        stacks.append((f"security+{encoding}+cache", encoding.encode(), ((CompressionMiddleware, {"cache": LRUCache(8)}), security)))
+
+    print(f"{'stack':<20} {'path':<8} {'req/s':>9} {'bytes':>9}")
+    for name, accept_encoding, middleware in stacks:
+        app = build_app(body, *middleware)
+        for path in ("/health", "/"):
+            rate, size = asyncio.run(requests_per_second(app, path, accept_encoding))
+            print(f"{name:<20} {path:<8} {rate:>9.0f} {size:>9}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Cold start profile of a worker.
+
+Prints where the import of `app.main` spends its time, as reported by
+`python -X importtime`: the slowest modules by cumulative time and the
+total by top-level package. Then, in a fresh process over a synthetic
+SQLite history, times the import, the lifespan warm-up step by step, and
+the first requests: `/` twice, then `/` for a new point budget, which
+renders a chart.
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --rows 100000 --top 30
+"""
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.suite import database_url, populate
+
+def import_profile(module: str = "app.main") -> List[Tuple[str, int, int]]:
+    """Returns the `(module, self µs, cumulative µs)` of every module imported by `module`."""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+def by_package(rows: List[Tuple[str, int, int]]) -> Dict[str, int]:
+    totals = defaultdict(int)
+    for name, self_us, _ in rows:
+        totals[name.split(".")[0]] += self_us
+    return dict(totals)
+
+def run_case(rows: int, data_dir: Path) -> Dict:
+    """Times the import, warm-up and first requests of a worker. Must run in a fresh process."""
+    os.environ["DATABASE_URL"] = database_url("sqlite", data_dir, rows, "daily")
+    os.environ["DATA_DIR"] = str(data_dir / f"derived-startup-{rows}")
+    os.environ["PRERENDER_WORKERS"] = "0"
+
+    start = time.perf_counter()
+    from app.main import app
+    timings = {"import": time.perf_counter() - start}
+
+    from fastapi.testclient import TestClient
+    from app.services.warmup import warmup
+
+    client = TestClient(app)
+    start = time.perf_counter()
+    client.__enter__()
+    timings["lifespan"] = time.perf_counter() - start
+    try:
+        for name, path in (("first_page", "/"), ("second_page", "/"), ("new_chart", "/?points=4321")):
+            start = time.perf_counter()
+            client.get(path).raise_for_status()
+            timings[name] = time.perf_counter() - start
+    finally:
+        client.__exit__(None, None, None)
+    return {"rows": rows, "seconds": timings, "warmup": warmup.stats()}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=10_000, help="daily rows of the synthetic history")
+    parser.add_argument("--top", type=int, default=20, help="modules to list")
+    parser.add_argument("--data-dir", type=Path, help="where to keep the database, a temporary directory by default")
+    parser.add_argument("--case", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    data_dir = args.data_dir or Path(tempfile.gettempdir()) / "bench_startup"
+    if args.case:
+        print(json.dumps(run_case(args.rows, data_dir)))
+        return
+
+    rows = import_profile()
+    total = next(cumulative for name, _, cumulative in rows if name == "app.main")
+    print(f"import app.main: {total / 1000:.0f} ms\n")
+    print(f"{'module':<48} {'self ms':>8} {'cumul. ms':>10}")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda row: -row[2])[:args.top]:
+        print(f"{name:<48} {self_us / 1000:>8.1f} {cumulative_us / 1000:>10.1f}")
+    print(f"\n{'package':<48} {'self ms':>8}")
+    for package, self_us in sorted(by_package(rows).items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{package:<48} {self_us / 1000:>8.1f}")
+
+    from sqlalchemy import create_engine
+
+    data_dir.mkdir(parents=True, exist_ok=True)
+    populate(create_engine(database_url("sqlite", data_dir, args.rows, "daily")), args.rows, "daily")
+    process = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--case", "--rows", str(args.rows), "--data-dir", str(data_dir)],
+        capture_output=True, text=True, check=True,
+    )
+    case = json.loads(process.stdout.strip().splitlines()[-1])
+    print(f"\ncold start, {args.rows} daily rows:")
+    for name, seconds in case["seconds"].items():
+        print(f"{name:<48} {seconds * 1000:>8.1f}")
+    print("\nwarm-up steps:")
+    for name, seconds in case["warmup"]["steps"].items():
+        print(f"{name:<48} {seconds * 1000:>8.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Measures static file serving through the compression middleware, calling
+the ASGI app directly: requests per second and bytes sent for main.js and
+the plotly.js bundle, each coding the client accepts, served
+
+- per request: the source file, compressed by the middleware,
+- built: the precompressed variant from the asset build.
+
+Builds the assets first if needed.
+"""
+from fastapi import FastAPI
+import asyncio
+import time
+
+from app.core.assets import BUILD_DIR, CachedStaticFiles, STATIC_DIR, asset_hashes, build_assets, built_assets
+from app.core.compression import CompressionMiddleware, brotli
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    app.mount("/static", CachedStaticFiles(directory=STATIC_DIR), name="static")
+    app.add_middleware(CompressionMiddleware)
+    return app
+
+async def call(app, path: str, query_string: bytes, accept_encoding: bytes) -> int:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query_string, "root_path": "",
+        "headers": [(b"host", b"testserver"), (b"accept-encoding", accept_encoding)],
+        "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+    }
+    size = 0
+    received = False
+
+    async def receive():
+        nonlocal received
+        if received:
+            # The client stays connected
+            await asyncio.Event().wait()
+        received = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal size
+        if message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return size
+
+async def requests_per_second(app, path: str, query_string: bytes, accept_encoding: bytes, seconds: float = 2.0):
+    size = await call(app, path, query_string, accept_encoding)
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        await call(app, path, query_string, accept_encoding)
+        count += 1
+    return count / (time.perf_counter() - start), size
+
+def main():
+    if len(built_assets()) < len(asset_hashes()):
+        build_assets()
+        built_assets.cache_clear()
+    built = built_assets()
+    app = build_app()
+
+    print(f"{'file':<44} {'coding':<9} {'served':<11} {'req/s':>9} {'bytes':>11}")
+    for path in ("js/main.js", next(path for path in asset_hashes() if path.startswith("vendor/"))):
+        variants = (
+            ("per request", f"/static/{path}", f"v={asset_hashes()[path]}".encode()),
+            ("built", f"/static/{(BUILD_DIR / built[path]['file']).relative_to(STATIC_DIR).as_posix()}", b""),
+        )
+        for encoding in ("identity", "gzip", "br") if brotli is not None else ("identity", "gzip"):
+            for label, url, query_string in variants:
+                rate, size = asyncio.run(requests_per_second(app, url, query_string, encoding.encode()))
+                print(f"{path:<44} {encoding:<9} {label:<11} {rate:>9.1f} {size:>11,}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Time to first byte of uncached pages, streamed and buffered.
+
+Starts a uvicorn server over a synthetic SQLite history, once with
+PAGE_STREAMING on and once off, and requests `/` for new point budgets, so
+that each page is rendered rather than served from a cache. For each
+request, times from sending it until:
+
+- ttfb: the response headers and first bytes,
+- stats: the statistics panel is received, the earliest the browser can
+  paint the page header and panels, a proxy for first contentful paint,
+- chart: the chart HTML starts,
+- total: the page is complete.
+
+Test clients buffer response bodies, hence the real server.
+
+    python -m benchmarks.bench_streaming
+    python -m benchmarks.bench_streaming --rows 100000 --requests 10
+"""
+from pathlib import Path
+from typing import Dict, List
+import argparse
+import http.client
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+
+from benchmarks.suite import database_url, populate
+
+STATS_MARKER = b"Current Price"
+CHART_MARKER = b'id="spiral-chart"'
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server(port: int, env: Dict[str, str]) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env={**os.environ, **env},
+        stdout=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            connection.request("GET", "/metrics?format=json")
+            response = connection.getresponse()
+            if response.status == 200 and is_idle(json.loads(response.read())["renderer"]):
+                return server
+        except OSError:
+            pass
+        time.sleep(0.2)
+    stop_server(server)
+    raise RuntimeError("The server did not start")
+
+def is_idle(renderer: Dict) -> bool:
+    """Whether the render workers, if any, have started and pre-rendered, which would otherwise compete with the requests timed."""
+    return renderer["workers"] == 0 or (renderer["ready"] and renderer["prerenders"] > 0)
+
+def stop_server(server: subprocess.Popen) -> None:
+    # Ctrl-C runs the lifespan shutdown, which stops the render workers
+    server.send_signal(signal.SIGINT)
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+def timed_request(port: int, path: str) -> Dict[str, float]:
+    """Requests `path` gzip-compressed, as browsers do, and times when each part of the page arrives."""
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    start = time.perf_counter()
+    connection.request("GET", path, headers={"Accept-Encoding": "gzip"})
+    response = connection.getresponse()
+    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16) if response.getheader("Content-Encoding") == "gzip" else None
+    timings = {}
+    # Only the body up to the chart is searched, so that large pages do not slow down the reads
+    head = b""
+    while True:
+        chunk = response.read1(65536)
+        if not chunk:
+            break
+        now = time.perf_counter() - start
+        timings.setdefault("ttfb", now)
+        if decompressor:
+            chunk = decompressor.decompress(chunk)
+        if "chart" not in timings:
+            head += chunk
+            if "stats" not in timings and STATS_MARKER in head:
+                timings["stats"] = now
+            if CHART_MARKER in head:
+                timings["chart"] = now
+    timings["total"] = time.perf_counter() - start
+    connection.close()
+    return timings
+
+def run_mode(streaming: bool, port: int, env: Dict[str, str], requests: int) -> Dict[str, List[float]]:
+    server = start_server(port, {**env, "PAGE_STREAMING": "true" if streaming else "false"})
+    try:
+        results: Dict[str, List[float]] = {}
+        for i in range(requests):
+            # A new point budget per request misses the page and fragment caches
+            for name, seconds in timed_request(port, f"/?points={3000 + i + (500 if streaming else 0)}").items():
+                results.setdefault(name, []).append(seconds)
+        return results
+    finally:
+        stop_server(server)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=10_000, help="daily rows of the synthetic history")
+    parser.add_argument("--requests", type=int, default=5, help="uncached pages requested per mode")
+    parser.add_argument("--data-dir", type=Path, help="where to keep the database, a temporary directory by default")
+    args = parser.parse_args()
+
+    from sqlalchemy import create_engine
+
+    data_dir = args.data_dir or Path(tempfile.gettempdir()) / "bench_streaming"
+    data_dir.mkdir(parents=True, exist_ok=True)
+    url = database_url("sqlite", data_dir, args.rows, "daily")
+    populate(create_engine(url), args.rows, "daily")
+    env = {"DATABASE_URL": url, "DATA_DIR": str(data_dir / f"derived-{args.rows}")}
+
+    print(f"uncached /, {args.rows} daily rows, median of {args.requests} requests (ms)")
+    print(f"{'mode':<10} {'ttfb':>8} {'stats':>8} {'chart':>8} {'total':>8}")
+    for streaming in (False, True):
+        results = run_mode(streaming, free_port(), env, args.requests)
+        medians = [statistics.median(results[name]) * 1000 for name in ("ttfb", "stats", "chart", "total")]
+        print(f"{'streamed' if streaming else 'buffered':<10} " + " ".join(f"{value:>8.1f}" for value in medians))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Run scripts from the project root, e.g. `python -m benchmarks.bench_markers`.
+"""
+from datetime import datetime, timedelta
+from typing import Callable, Tuple
+import time
+import numpy as np
+
+from app.db.series import PriceSeries
+
+GENESIS_PRICE_DATE = datetime(2010, 7, 18)
+
+def synthetic_series(n: int, step: timedelta = timedelta(days=1), seed: int = 42) -> PriceSeries:
+    """
+    Generates a geometric random walk of `n` prices spaced `step` apart,
+    starting on the first recorded Bitcoin price date.
+    """
+    rng = np.random.default_rng(seed)
+    scale = step / timedelta(days=1)
+    log_returns = rng.normal(0.0025 * scale, 0.04 * np.sqrt(scale), n)
+    prices = 0.08 * np.exp(np.cumsum(log_returns))
+    step_seconds = int(step.total_seconds())
+    dates = np.datetime64(GENESIS_PRICE_DATE, "s") + np.arange(n) * np.timedelta64(step_seconds, "s")
+    return PriceSeries(dates, prices)
+
+def best_of(fn: Callable, repeat: int = 5) -> Tuple[float, object]:
+    """Returns the best wall time in seconds over `repeat` runs, and the last result."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
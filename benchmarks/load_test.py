@@ -0,0 +1,77 @@
+"""
+Runs concurrent clients against a running server and reports latency
+percentiles per path.
+
+    python -m benchmarks.load_test http://127.0.0.1:8000 --clients 50 --requests 2000
+
+Each client loops over the paths in turn, so slow chart renders and cheap
+requests such as /health are interleaved like real traffic.
+"""
+from typing import Dict, List
+import argparse
+import asyncio
+import json
+import time
+import httpx
+import numpy as np
+
+DEFAULT_PATHS = [
+    "/health",
+    "/",
+    "/api/spiral?days=365&format=binary",
+    "/api/spiral?width={width}&format=binary",
+    "/?width={width}",
+]
+
+async def run_client(client: httpx.AsyncClient, paths: List[str], count: int, offset: int, latencies: Dict[str, List[float]], errors: Dict[str, int]):
+    for i in range(count):
+        template = paths[(offset + i) % len(paths)]
+        # Varying the viewport width defeats the page cache, forcing renders
+        path = template.format(width=400 + (offset * 131 + i * 17) % 1600)
+        start = time.perf_counter()
+        try:
+            response = await client.get(path)
+        except httpx.HTTPError:
+            response = None
+        elapsed = time.perf_counter() - start
+        if response is None or response.status_code != 200:
+            errors[template] = errors.get(template, 0) + 1
+        latencies.setdefault(template, []).append(elapsed)
+
+async def load_test(base_url: str, clients: int, requests: int, paths: List[str]) -> Dict:
+    latencies: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            run_client(client, paths, requests // clients, offset, latencies, errors)
+            for offset in range(clients)
+        ))
+        elapsed = time.perf_counter() - start
+
+    summary = lambda values: {
+        "count": len(values),
+        "p50_ms": round(float(np.percentile(values, 50)) * 1000, 1),
+        "p99_ms": round(float(np.percentile(values, 99)) * 1000, 1),
+    }
+    return {
+        "clients": clients,
+        "requests_per_second": round(sum(map(len, latencies.values())) / elapsed, 1),
+        "errors": sum(errors.values()),
+        "all": summary([v for values in latencies.values() for v in values]),
+        "paths": {path: {**summary(values), "errors": errors.get(path, 0)} for path, values in latencies.items()},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base_url")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--path", action="append", dest="paths", help="Path to request, may be repeated")
+    args = parser.parse_args()
+    result = asyncio.run(load_test(args.base_url, args.clients, args.requests, args.paths or DEFAULT_PATHS))
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
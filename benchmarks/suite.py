@@ -0,0 +1,281 @@
+"""
+Benchmark suite for regression tracking between commits.
+
+For each history size and spacing, writes a synthetic `BitcoinPrice`
+table into SQLite, on disk or in memory, then measures:
+
+- startup: the application lifespan, loading the price store,
+- page_first: the first `/` request, through an ASGI test client,
+- get_prices: the ORM query (skipped past `ORM_MAX_ROWS` rows),
+- get_price_series: the columnar query,
+- calculate_statistics and downsample_series on the full series,
+- create_logarithmic_spiral_chart on the downsampled series,
+- page_uncached, page_cached: `/` rendered for a new point budget, and
+  served from the page cache,
+- api_spiral: `/api/spiral` in the binary format.
+
+Each stage reports its best wall time and the peak traced memory of one
+more run, or for the single runs the growth of the peak RSS, which is
+only meaningful when the database is reused from `--data-dir`. Requests
+also report their payload size, identity and gzip encoded. Every case
+runs in its own process, so module state such as caches does not carry
+over. Results are printed as JSON, or written to `--output`:
+
+    python -m benchmarks.suite --rows 1000 10000 --output before.json
+    python -m benchmarks.suite --compare before.json after.json
+"""
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.common import best_of, synthetic_series
+
+DEFAULT_ROWS = (1_000, 10_000, 100_000, 1_000_000)
+STEPS = {"daily": timedelta(days=1), "hourly": timedelta(hours=1)}
+# Past this many rows the ORM query needs gigabytes of objects
+ORM_MAX_ROWS = 100_000
+INSERT_BATCH_SIZE = 50_000
+# Time ratio over which --compare flags a stage
+REGRESSION_THRESHOLD = 1.2
+
+def database_url(db: str, data_dir: Path, rows: int, step: str) -> str:
+    if db == "memory":
+        # A shared cache lets the sync and async engines see the same database
+        return f"sqlite:///file:prices-{rows}-{step}?mode=memory&cache=shared&uri=true"
+    return f"sqlite:///{data_dir / f'prices-{rows}-{step}.sqlite'}"
+
+def populate(engine, rows: int, step: str) -> float:
+    """
+    Writes `rows` synthetic prices into the `BitcoinPrice` table, unless it
+    already holds them, and returns the time taken.
+    """
+    from sqlalchemy import delete, func, insert, select
+    from app.db.models import Base, BitcoinPrice
+
+    Base.metadata.create_all(engine)
+    with engine.connect() as conn:
+        if conn.scalar(select(func.count()).select_from(BitcoinPrice)) == rows:
+            return 0.0
+
+    start = time.perf_counter()
+    series = synthetic_series(rows, STEPS[step])
+    dates, prices = series.datetimes(), series.prices.tolist()
+    with engine.begin() as conn:
+        conn.execute(delete(BitcoinPrice))
+        for offset in range(0, rows, INSERT_BATCH_SIZE):
+            batch = range(offset, min(offset + INSERT_BATCH_SIZE, rows))
+            conn.execute(insert(BitcoinPrice), [{"dateAdd": dates[i], "price": prices[i]} for i in batch])
+    return time.perf_counter() - start
+
+def measure(fn: Callable, repeat: int, **extra) -> Dict:
+    """Times `fn` over `repeat` runs, then traces the memory of one more."""
+    seconds, _ = best_of(fn, repeat)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": seconds, "peak_bytes": peak, **extra}
+
+def measure_once(fn: Callable, **extra) -> Dict:
+    """
+    Times a single run of `fn`, for stages that cannot be repeated. Tracing
+    would distort that one run, so memory is the growth of the peak RSS.
+    """
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - start
+    growth = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss) * 1024
+    return {"seconds": seconds, "rss_growth_bytes": growth, **extra}
+
+def run_case(rows: int, step: str, db: str, data_dir: Path, repeat: int) -> Dict:
+    """Runs every stage for one history. Must run in a fresh process."""
+    # The settings are read when the application modules are first imported
+    os.environ["DATABASE_URL"] = database_url(db, data_dir, rows, step)
+    os.environ["DATA_DIR"] = str(data_dir / f"derived-{rows}-{step}-{db}")
+    os.environ["PRERENDER_WORKERS"] = "0"
+    os.environ["PRICE_REFRESH_SECONDS"] = "3600"
+
+    from fastapi.testclient import TestClient
+    from app.db.crud import get_price_series, get_prices
+    from app.db.session import SessionLocal, engine
+    from app.main import app
+    from app.services.chart_generator import create_logarithmic_spiral_chart
+    from app.services.downsampling import downsample_series, point_budget
+    from app.services.statistics import calculate_statistics
+
+    # Keeps an in-memory database alive for the whole case
+    keepalive = engine.connect()
+    try:
+        populate_seconds = populate(engine, rows, step)
+        stages = {}
+
+        def repeated(fn, **extra):
+            return measure(fn, repeat, **extra)
+
+        def orm_query():
+            with SessionLocal() as session:
+                return get_prices(session)
+
+        def series_query():
+            with SessionLocal() as session:
+                return get_price_series(session)
+
+        # The single runs go first, before other stages raise the peak RSS
+        client = TestClient(app)
+        stages["startup"] = measure_once(client.__enter__)
+        try:
+            stages["page_first"] = request_stage(client, "/", measure_once)
+
+            if rows <= ORM_MAX_ROWS:
+                stages["get_prices"] = repeated(orm_query)
+            else:
+                stages["get_prices"] = {"skipped": f"over {ORM_MAX_ROWS} rows"}
+            stages["get_price_series"] = repeated(series_query)
+
+            series = series_query()
+            stats = calculate_statistics(series)
+            max_points = point_budget()
+            plotted = downsample_series(series, max_points, stats)
+            chart_html = create_logarithmic_spiral_chart(plotted, stats)
+            stages["calculate_statistics"] = repeated(lambda: calculate_statistics(series))
+            stages["downsample_series"] = repeated(lambda: downsample_series(series, max_points, stats), points=len(plotted))
+            stages["create_logarithmic_spiral_chart"] = repeated(
+                lambda: create_logarithmic_spiral_chart(plotted, stats), payload_bytes=len(chart_html.encode())
+            )
+
+            # Every run asks for a new point budget, so that nothing is cached
+            budgets = iter(range(max_points - 1, 0, -1))
+            stages["page_uncached"] = request_stage(client, lambda: f"/?points={next(budgets)}", repeated)
+            stages["page_cached"] = request_stage(client, "/", repeated)
+            stages["api_spiral"] = request_stage(client, "/api/spiral?format=binary", repeated)
+        finally:
+            client.__exit__(None, None, None)
+    finally:
+        keepalive.close()
+
+    return {
+        "rows": rows,
+        "step": step,
+        "db": db,
+        "populate_seconds": populate_seconds,
+        "max_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        "stages": stages,
+    }
+
+def request_stage(client, path, measure_fn: Callable) -> Dict:
+    """
+    Measures GET requests for `path`, a string or a callable returning a new
+    one per request, and records the identity and gzip payload sizes.
+    """
+    next_path = path if callable(path) else lambda: path
+
+    def fetch(accept_encoding: str):
+        response = client.get(next_path(), headers={"Accept-Encoding": accept_encoding})
+        response.raise_for_status()
+        return response
+
+    result = measure_fn(lambda: fetch("identity"))
+    result["payload_bytes"] = len(fetch("identity").content)
+    # httpx decodes the body, and streamed pages have no Content-Length: count the raw bytes sent
+    with client.stream("GET", next_path(), headers={"Accept-Encoding": "gzip"}) as response:
+        response.raise_for_status()
+        result["gzip_bytes"] = sum(len(chunk) for chunk in response.iter_raw())
+    return result
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_suite(rows: List[int], steps: List[str], db: str, data_dir: Path, repeat: int) -> Dict:
+    cases = []
+    for n in rows:
+        for step in steps:
+            print(f"Running {n} {step} rows on {db}...", file=sys.stderr)
+            process = subprocess.run(
+                [sys.executable, "-m", "benchmarks.suite", "--case", str(n), step,
+                 "--db", db, "--data-dir", str(data_dir), "--repeat", str(repeat)],
+                capture_output=True, text=True,
+            )
+            if process.returncode:
+                print(process.stderr, file=sys.stderr)
+                cases.append({"rows": n, "step": step, "db": db, "error": process.stderr.strip().splitlines()[-1:]})
+                continue
+            cases.append(json.loads(process.stdout.strip().splitlines()[-1]))
+    return {
+        "revision": git_revision(),
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "cases": cases,
+    }
+
+def compare(base: Dict, new: Dict) -> None:
+    """Prints the time ratio of every stage present in both results."""
+    base_cases = {(case["rows"], case["step"], case["db"]): case for case in base["cases"]}
+    print(f"{base.get('revision')} -> {new.get('revision')}")
+    print(f"{'case':<22} {'stage':<32} {'base ms':>10} {'new ms':>10} {'ratio':>7}")
+    for case in new["cases"]:
+        key = (case["rows"], case["step"], case["db"])
+        base_stages = base_cases.get(key, {}).get("stages", {})
+        for name, stage in case.get("stages", {}).items():
+            before = base_stages.get(name, {})
+            if "seconds" not in stage or "seconds" not in before:
+                continue
+            ratio = stage["seconds"] / before["seconds"] if before["seconds"] else float("inf")
+            flag = "  regression" if ratio > REGRESSION_THRESHOLD else ""
+            print(
+                f"{'%d %s %s' % key:<22} {name:<32} {before['seconds'] * 1000:>10.2f} "
+                f"{stage['seconds'] * 1000:>10.2f} {ratio:>7.2f}{flag}"
+            )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=list(DEFAULT_ROWS))
+    parser.add_argument("--steps", nargs="+", choices=sorted(STEPS), default=["daily", "hourly"])
+    parser.add_argument("--db", choices=("sqlite", "memory"), default="sqlite")
+    parser.add_argument("--data-dir", type=Path, help="where databases are kept between runs, a temporary directory by default")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--compare", nargs=2, type=Path, metavar=("BASE", "NEW"))
+    parser.add_argument("--case", nargs=2, metavar=("ROWS", "STEP"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        base, new = (json.loads(path.read_text()) for path in args.compare)
+        compare(base, new)
+        return
+
+    if args.case:
+        result = run_case(int(args.case[0]), args.case[1], args.db, args.data_dir, args.repeat)
+        print(json.dumps(result))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = (args.data_dir or Path(tmp)).resolve()
+        data_dir.mkdir(parents=True, exist_ok=True)
+        results = json.dumps(run_suite(args.rows, args.steps, args.db, data_dir, args.repeat), indent=2)
+    if args.output:
+        args.output.write_text(results + "\n")
+    else:
+        print(results)
+
+if __name__ == "__main__":
+    main()
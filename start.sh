@@ -24,6 +24,12 @@ if [ ! -f ".env" ]; then
     fi
 fi
 
+echo "Applying database migrations..."
+python -m app.db.migrations || exit 1
+
+echo "Building static assets..."
+python -m app.core.assets || exit 1
+
 echo "Starting Bitcoin Logarithmic Spiral API..."
 echo "Open http://localhost:8000 in your browser"
 echo "Press Ctrl+C to stop the server"